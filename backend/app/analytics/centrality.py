@@ -0,0 +1,239 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.core.config import ANALYTICS_CACHE_SIZE, BETWEENNESS_SAMPLES
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOLERANCE = 1e-8
+PAGERANK_MAX_ITERATIONS = 100
+# Betweenness sources are processed this many at a time, as the columns of a
+# dense (num_nodes x batch) block multiplied by the sparse adjacency matrix.
+BETWEENNESS_BATCH_SIZE = 16
+COMMUNITY_MAX_ITERATIONS = 30
+# Label propagation stops once fewer than this fraction of nodes would change label.
+COMMUNITY_MIN_CHANGE = 0.001
+# Weights used to rank key players, applied to metrics normalized to [0, 1].
+KEY_PLAYER_WEIGHTS = {"pagerank": 0.4, "betweenness": 0.4, "weighted_degree": 0.2}
+
+
+@dataclass(frozen=True)
+class NetworkMetrics:
+    """Per-subscriber metrics of a contact graph; all arrays are indexed like `phones`."""
+    phones: np.ndarray
+    degree: np.ndarray
+    weighted_degree: np.ndarray
+    pagerank: np.ndarray
+    betweenness: np.ndarray
+    community: np.ndarray
+    key_player_score: np.ndarray
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.phones)
+
+
+def contact_matrix(pairs: Dict[str, list]) -> Tuple[np.ndarray, sparse.csr_matrix]:
+    """
+    Builds the symmetric, weighted adjacency matrix of the contact graph from
+    per-pair aggregates (as returned by `graph_crud.get_contact_pairs`).
+    Self-contacts are dropped.
+    """
+    phones, endpoints = np.unique(
+        np.concatenate([np.asarray(pairs["source"], dtype=object), np.asarray(pairs["target"], dtype=object)]).astype(str),
+        return_inverse=True,
+    )
+    num_pairs = len(pairs["source"])
+    source, target = endpoints[:num_pairs], endpoints[num_pairs:]
+    weight = np.asarray(pairs["calls"], dtype=float) + np.asarray(pairs["sms"], dtype=float)
+    keep = source != target
+    source, target, weight = source[keep], target[keep], weight[keep]
+    n = len(phones)
+    matrix = sparse.coo_matrix(
+        (np.concatenate([weight, weight]), (np.concatenate([source, target]), np.concatenate([target, source]))),
+        shape=(n, n),
+    ).tocsr()
+    matrix.sum_duplicates()
+    return phones, matrix
+
+
+def pagerank(matrix: sparse.csr_matrix) -> np.ndarray:
+    """Weighted PageRank by power iteration; dangling nodes teleport uniformly."""
+    n = matrix.shape[0]
+    out_weight = np.asarray(matrix.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    inverse = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+    # Column-stochastic transition matrix, so one step is a single mat-vec.
+    transition = (sparse.diags(inverse) @ matrix).T.tocsr()
+    rank = np.full(n, 1.0 / n)
+    for _ in range(PAGERANK_MAX_ITERATIONS):
+        previous = rank
+        rank = PAGERANK_DAMPING * (transition @ rank + rank[dangling].sum() / n) + (1 - PAGERANK_DAMPING) / n
+        if np.abs(rank - previous).sum() < n * PAGERANK_TOLERANCE:
+            break
+    return rank
+
+
+def sampled_betweenness(matrix: sparse.csr_matrix, samples: int, seed: int = 0) -> np.ndarray:
+    """
+    Unweighted betweenness centrality estimated from `samples` random sources
+    (Brandes' algorithm), scaled to the full graph.
+    Each batch of sources runs its BFS and dependency accumulation level by
+    level as sparse-dense matrix products.
+    """
+    n = matrix.shape[0]
+    betweenness = np.zeros(n)
+    if n < 3:
+        return betweenness
+    # Unweighted, single precision: halves the memory traffic of the dense blocks.
+    adjacency = matrix.astype(np.float32)
+    adjacency.data[:] = 1.0
+    rng = np.random.default_rng(seed)
+    sources = rng.choice(n, size=min(samples, n), replace=False)
+
+    for start in range(0, len(sources), BETWEENNESS_BATCH_SIZE):
+        batch = sources[start:start + BETWEENNESS_BATCH_SIZE]
+        columns = np.arange(len(batch))
+        sigma = np.zeros((n, len(batch)), dtype=np.float32)
+        sigma[batch, columns] = 1.0
+        visited = sigma > 0
+        levels = [visited.copy()]
+        frontier = sigma.copy()
+        # Forward BFS: count shortest paths reaching each node, level by level.
+        while True:
+            reached = adjacency @ frontier
+            new = (reached > 0) & ~visited
+            if not new.any():
+                break
+            frontier = np.where(new, reached, np.float32(0))
+            sigma += frontier
+            visited |= new
+            levels.append(new)
+        # Backward pass: accumulate dependencies from the deepest level up.
+        delta = np.zeros((n, len(batch)), dtype=np.float32)
+        safe_sigma = np.where(sigma > 0, sigma, np.float32(1))
+        for depth in range(len(levels) - 1, 0, -1):
+            weights = np.where(levels[depth], (1 + delta) / safe_sigma, np.float32(0))
+            delta += np.where(levels[depth - 1], sigma * (adjacency @ weights), np.float32(0))
+        delta[batch, columns] = 0.0
+        betweenness += delta.sum(axis=1)
+
+    # Scale the sample up to all sources; each undirected path was counted from both ends.
+    return betweenness * (n / len(sources)) / 2.0
+
+
+def _row_argmax(matrix: sparse.csr_matrix) -> np.ndarray:
+    """
+    Column of the largest stored value in each row of a CSR matrix whose rows
+    are all non-empty. Vectorized equivalent of `matrix.argmax(axis=1)`, which
+    is much slower on large matrices.
+    """
+    row_max = np.maximum.reduceat(matrix.data, matrix.indptr[:-1])
+    entry_rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    positions = np.flatnonzero(matrix.data == row_max[entry_rows])
+    position_rows = entry_rows[positions]
+    first = np.r_[True, position_rows[1:] != position_rows[:-1]]
+    return matrix.indices[positions[first]]
+
+
+def label_propagation(matrix: sparse.csr_matrix, seed: int = 0) -> np.ndarray:
+    """
+    Community detection by weighted label propagation: every node repeatedly
+    takes the label carrying the most edge weight among its neighbours.
+    Each round updates a random half of the nodes, which keeps the vectorized
+    (synchronous) updates from oscillating. Communities are numbered by size.
+    """
+    n = matrix.shape[0]
+    labels = np.arange(n)
+    if n == 0:
+        return labels
+    rng = np.random.default_rng(seed)
+    coo = matrix.tocoo()
+    rows, cols, weights = coo.row, coo.col, coo.data
+    node_ids = np.arange(n)
+    for _ in range(COMMUNITY_MAX_ITERATIONS):
+        # Weight of each (node, neighbour label), with a small bias towards the
+        # current label and random noise to break ties; duplicates are summed
+        # when converting to CSR, then each row's heaviest label is taken.
+        label_weights = sparse.csr_matrix(
+            (
+                np.concatenate([weights + rng.random(len(weights)) * 1e-9, np.full(n, 1e-6)]),
+                (np.concatenate([rows, node_ids]), np.concatenate([labels[cols], labels])),
+            ),
+            shape=(n, n),
+        )
+        best = _row_argmax(label_weights)
+        changed = best != labels
+        if changed.mean() < COMMUNITY_MIN_CHANGE:
+            labels = best
+            break
+        labels = np.where(rng.random(n) < 0.5, best, labels)
+
+    _, community, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty(len(sizes), dtype=np.int64)
+    rank[np.argsort(-sizes, kind="stable")] = np.arange(len(sizes))
+    return rank[community]
+
+
+def _normalized(values: np.ndarray) -> np.ndarray:
+    peak = values.max() if len(values) else 0
+    return values / peak if peak > 0 else np.zeros_like(values, dtype=float)
+
+
+def compute_network_metrics(pairs: Dict[str, list], betweenness_samples: int = BETWEENNESS_SAMPLES) -> NetworkMetrics:
+    """Computes every per-subscriber metric of the contact graph described by `pairs`."""
+    if not pairs["source"]:
+        empty = np.empty(0)
+        return NetworkMetrics(np.empty(0, dtype=str), empty, empty, empty, empty, np.empty(0, dtype=np.int64), empty)
+
+    phones, matrix = contact_matrix(pairs)
+    degree = np.diff(matrix.indptr)
+    weighted_degree = np.asarray(matrix.sum(axis=1)).ravel()
+    rank = pagerank(matrix)
+    betweenness = sampled_betweenness(matrix, betweenness_samples)
+    community = label_propagation(matrix)
+    score = (
+        KEY_PLAYER_WEIGHTS["pagerank"] * _normalized(rank)
+        + KEY_PLAYER_WEIGHTS["betweenness"] * _normalized(betweenness)
+        + KEY_PLAYER_WEIGHTS["weighted_degree"] * _normalized(weighted_degree)
+    )
+    return NetworkMetrics(phones, degree, weighted_degree, rank, betweenness, community, score)
+
+
+class MetricsCache:
+    """
+    A small LRU cache of computed metrics, keyed by user, ListingSet combination
+    and filters. Entries involving a ListingSet are dropped when it is re-ingested.
+    """
+    def __init__(self, max_entries: int = ANALYTICS_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, NetworkMetrics]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[NetworkMetrics]:
+        with self._lock:
+            metrics = self._entries.get(key)
+            if metrics is not None:
+                self._entries.move_to_end(key)
+            return metrics
+
+    def put(self, key: Hashable, metrics: NetworkMetrics):
+        with self._lock:
+            self._entries[key] = metrics
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_listing_set(self, listing_set_id: str):
+        # Keys are (username, listing set ids, filters)
+        with self._lock:
+            for key in [key for key in self._entries if listing_set_id in key[1]]:
+                del self._entries[key]
+
+
+# A single metrics cache for the entire application.
+metrics_cache = MetricsCache()
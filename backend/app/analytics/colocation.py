@@ -0,0 +1,188 @@
+import numpy as np
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.analytics.timeline import EPOCH
+from app.core.config import COLOCATION_MAX_NEIGHBORS, SHARED_DEVICE_MAX_SUBSCRIBERS
+
+
+def window_pairs(
+    group: np.ndarray, time: np.ndarray, window: int, max_neighbors: int
+) -> Tuple[np.ndarray, np.ndarray, bool]:
+    """
+    Sliding-window self-join of events sorted by (group, time): every pair
+    (i, j), i < j, in the same group with time[j] - time[i] <= window.
+    Works one offset at a time (i against i + 1, then i + 2, ...), keeping only
+    the events whose window is still open, so the cost is proportional to the
+    number of matching pairs rather than to the square of the group sizes.
+    At most `max_neighbors` later events are compared with each event; the
+    third value is True if that cap cut some windows short.
+    """
+    left, right = [], []
+    candidates = np.arange(len(group) - 1)
+    offset = 1
+    while len(candidates) and offset <= max_neighbors:
+        partners = candidates + offset
+        # Sorted by time, so once an event's window closes it stays closed
+        open_window = (group[partners] == group[candidates]) & (time[partners] - time[candidates] <= window)
+        candidates = candidates[open_window]
+        left.append(candidates)
+        right.append(partners[open_window])
+        offset += 1
+        candidates = candidates[candidates + offset < len(group)]
+    # Windows still open past the cap
+    partners = candidates + offset
+    truncated = bool(((group[partners] == group[candidates]) & (time[partners] - time[candidates] <= window)).any())
+    if not left:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), False
+    return np.concatenate(left), np.concatenate(right), truncated
+
+
+def _aggregate_pairs(
+    phone_a: np.ndarray, phone_b: np.ndarray, num_phones: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Groups matches by unordered pair of phone ids (self-pairs dropped).
+    Returns the pair codes, the index of each kept match's pair, the
+    positions of the kept matches and the number of matches per pair.
+    """
+    keep = np.flatnonzero(phone_a != phone_b)
+    low = np.minimum(phone_a[keep], phone_b[keep])
+    high = np.maximum(phone_a[keep], phone_b[keep])
+    codes, pair_of_match, counts = np.unique(low * num_phones + high, return_inverse=True, return_counts=True)
+    return codes, pair_of_match, keep, counts
+
+
+def _ranked(order_keys: List[np.ndarray], limit: int) -> np.ndarray:
+    # np.lexsort sorts by the last key first
+    return np.lexsort(tuple(-key for key in reversed(order_keys)))[:limit]
+
+
+def _pair_filter(codes: np.ndarray, num_phones: int, phones: np.ndarray, phone_numbers: List[str]) -> np.ndarray:
+    """Mask of the pairs involving one of `phone_numbers` (all pairs if it is empty)."""
+    if not phone_numbers:
+        return np.ones(len(codes), dtype=bool)
+    wanted = np.isin(phones, phone_numbers)
+    return wanted[codes // num_phones] | wanted[codes % num_phones]
+
+
+def find_colocations(
+    events: Dict[str, list],
+    window_seconds: int,
+    min_events: int,
+    limit: int,
+    phone_numbers: Optional[List[str]] = None,
+    max_neighbors: int = COLOCATION_MAX_NEIGHBORS,
+) -> Dict[str, Any]:
+    """
+    Pairs of subscribers seen on the same tower within `window_seconds` of
+    each other, from per-event rows (as returned by
+    `graph_crud.get_tower_events`). Each matching pair of events is one
+    co-location; pairs with at least `min_events` of them are ranked by count,
+    then by the number of distinct towers involved.
+    """
+    if not events["tower"]:
+        return {"total_pairs": 0, "pairs": [], "truncated": False}
+
+    towers, tower_ids = np.unique(np.asarray(events["tower"], dtype=object).astype(str), return_inverse=True)
+    phones, phone_ids = np.unique(np.asarray(events["phone"], dtype=object).astype(str), return_inverse=True)
+    time = np.asarray(events["time"], dtype=np.int64)
+    # Sort-merge: events of each tower in time order
+    order = np.lexsort((time, tower_ids))
+    tower_ids, phone_ids, time = tower_ids[order], phone_ids[order], time[order]
+
+    left, right, truncated = window_pairs(tower_ids, time, window_seconds, max_neighbors)
+    num_phones = len(phones)
+    codes, pair_of_match, keep, counts = _aggregate_pairs(phone_ids[left], phone_ids[right], num_phones)
+    left, right = left[keep], right[keep]
+
+    # Per-pair evidence: distinct towers, first and last co-location
+    num_pairs = len(codes)
+    pair_towers = np.unique(pair_of_match * len(towers) + tower_ids[left])
+    distinct_towers = np.bincount(pair_towers // len(towers), minlength=num_pairs)
+    first_seen = np.full(num_pairs, np.iinfo(np.int64).max)
+    np.minimum.at(first_seen, pair_of_match, time[left])
+    last_seen = np.full(num_pairs, np.iinfo(np.int64).min)
+    np.maximum.at(last_seen, pair_of_match, time[right])
+
+    selected = np.flatnonzero((counts >= min_events) & _pair_filter(codes, num_phones, phones, phone_numbers))
+    ranked = selected[_ranked([counts[selected], distinct_towers[selected]], limit)]
+    pairs = [
+        {
+            "a": a,
+            "b": b,
+            "co_locations": co_locations,
+            "towers": n_towers,
+            "first_seen": EPOCH + timedelta(seconds=first),
+            "last_seen": EPOCH + timedelta(seconds=last),
+        }
+        for a, b, co_locations, n_towers, first, last in zip(
+            phones[codes[ranked] // num_phones].tolist(),
+            phones[codes[ranked] % num_phones].tolist(),
+            counts[ranked].tolist(),
+            distinct_towers[ranked].tolist(),
+            first_seen[ranked].tolist(),
+            last_seen[ranked].tolist(),
+        )
+    ]
+    return {"total_pairs": len(selected), "pairs": pairs, "truncated": truncated}
+
+
+def find_shared_devices(
+    usage: Dict[str, list],
+    limit: int,
+    phone_numbers: Optional[List[str]] = None,
+    max_subscribers: int = SHARED_DEVICE_MAX_SUBSCRIBERS,
+    max_devices_listed: int = 10,
+) -> Dict[str, Any]:
+    """
+    Pairs of subscribers who used the same device (IMEI), from per-(device,
+    subscriber) rows (as returned by `graph_crud.get_device_usage`), ranked by
+    the number of devices shared, then by the communications made on them.
+    Devices used by more than `max_subscribers` subscribers (placeholder or
+    cloned IMEIs) are left out and reported instead.
+    """
+    if not usage["imei"]:
+        return {"total_pairs": 0, "pairs": [], "skipped_devices": []}
+
+    devices, device_ids = np.unique(np.asarray(usage["imei"], dtype=object).astype(str), return_inverse=True)
+    phones, phone_ids = np.unique(np.asarray(usage["phone"], dtype=object).astype(str), return_inverse=True)
+    event_counts = np.asarray(usage["events"], dtype=np.int64)
+
+    subscribers_per_device = np.bincount(device_ids, minlength=len(devices))
+    crowded = subscribers_per_device > max_subscribers
+    keep = ~crowded[device_ids]
+    device_ids, phone_ids, event_counts = device_ids[keep], phone_ids[keep], event_counts[keep]
+    order = np.argsort(device_ids, kind="stable")
+    device_ids, phone_ids, event_counts = device_ids[order], phone_ids[order], event_counts[order]
+
+    # Every subscriber pair of each device: a window join with a zero-width window
+    left, right, _ = window_pairs(device_ids, np.zeros(len(device_ids), dtype=np.int64), 0, max_subscribers)
+    num_phones = len(phones)
+    codes, pair_of_match, keep, shared = _aggregate_pairs(phone_ids[left], phone_ids[right], num_phones)
+    left, right = left[keep], right[keep]
+    events = np.bincount(pair_of_match, weights=event_counts[left] + event_counts[right], minlength=len(codes)).astype(np.int64)
+
+    selected = np.flatnonzero(_pair_filter(codes, num_phones, phones, phone_numbers))
+    ranked = selected[_ranked([shared[selected], events[selected]], limit)]
+    # Devices of each ranked pair, grouped by sorting the matches by pair
+    match_order = np.argsort(pair_of_match, kind="stable")
+    match_starts = np.searchsorted(pair_of_match[match_order], np.arange(len(codes)))
+    phone_list = phones.tolist()
+    pairs = [
+        {
+            "a": phone_list[code // num_phones],
+            "b": phone_list[code % num_phones],
+            "shared_devices": n_shared,
+            "events": n_events,
+            "devices": devices[device_ids[left[match_order[start:start + min(n_shared, max_devices_listed)]]]].tolist(),
+        }
+        for code, n_shared, n_events, start in zip(
+            codes[ranked].tolist(), shared[ranked].tolist(), events[ranked].tolist(), match_starts[ranked].tolist()
+        )
+    ]
+    return {
+        "total_pairs": len(selected),
+        "pairs": pairs,
+        "skipped_devices": devices[np.flatnonzero(crowded)].tolist(),
+    }
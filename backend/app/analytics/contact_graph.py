@@ -0,0 +1,201 @@
+import numpy as np
+from datetime import datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.graph import ContactGraphFilters
+
+
+def filter_bounds(filters: ContactGraphFilters) -> Tuple[Optional[datetime], Optional[datetime], Optional[str]]:
+    """
+    Translates the event-level filters into query bounds: a [start, end) timestamp
+    range and a Communication type ("CALL", "SMS" or None for all).
+    """
+    date_range = filters.dateRange
+    start = datetime.combine(date_range.start, time.min) if date_range.start else None
+    # The end date is inclusive, so the range stops at midnight the day after
+    end = datetime.combine(date_range.end + timedelta(days=1), time.min) if date_range.end else None
+    event_type = {"calls": "CALL", "sms": "SMS"}.get(filters.interactionType)
+    return start, end, event_type
+
+
+# Link strength scoring, vectorized over all edges at once.
+# Weights and thresholds are the ones used by the frontend's
+# utils/link-classification.ts, so both sides classify links identically.
+
+def link_strength_scores(
+    interactions: np.ndarray,
+    total_duration: np.ndarray,
+    unique_days: np.ndarray,
+    time_spread: np.ndarray,
+) -> np.ndarray:
+    """Composite 0-100 strength score of each edge."""
+    interactions = interactions.astype(float)
+    unique_days = unique_days.astype(float)
+    average_duration = np.divide(total_duration, interactions, out=np.zeros_like(interactions), where=interactions > 0)
+
+    frequency_score = np.minimum(interactions / 50, 1)       # 50+ interactions = max score
+    duration_score = np.minimum(total_duration / 3600, 1)    # 1 hour total = max score
+    avg_duration_score = np.minimum(average_duration / 300, 1)  # 5 min avg = max score
+    consistency_score = np.where(
+        unique_days > 1,
+        np.minimum(interactions / np.maximum(unique_days, 1) / 5, 1),  # Up to 5 interactions per day
+        0,
+    )
+    temporal_score = np.where(
+        time_spread > 7,
+        np.minimum(unique_days / (np.maximum(time_spread, 1) / 7), 1),  # Regular contact over time
+        unique_days / 7,
+    )
+
+    composite = (
+        frequency_score * 0.3
+        + duration_score * 0.2
+        + avg_duration_score * 0.15
+        + consistency_score * 0.2
+        + temporal_score * 0.15
+    )
+    # Math.round semantics (half up), not NumPy's round-half-to-even
+    return np.floor(composite * 100 + 0.5).astype(int)
+
+
+def classify_links(scores: np.ndarray, interactions: np.ndarray, unique_days: np.ndarray) -> np.ndarray:
+    """'primary', 'secondary' or 'weak' for each edge."""
+    primary = (scores >= 70) | ((interactions >= 20) & (unique_days >= 5))
+    secondary = (scores >= 30) | ((interactions >= 5) & (unique_days >= 2))
+    return np.where(primary, "primary", np.where(secondary, "secondary", "weak"))
+
+
+def node_filter(phones: np.ndarray, node_interactions: np.ndarray, filters: ContactGraphFilters) -> np.ndarray:
+    """Mask of the subscribers kept by the node-level filters (`minInteractions`, `individuals`)."""
+    keep = node_interactions >= filters.minInteractions
+    if filters.individuals:
+        keep &= np.isin(phones, filters.individuals)
+    return keep
+
+
+def filter_pairs(pairs: Dict[str, list], filters: ContactGraphFilters) -> Dict[str, list]:
+    """
+    Keeps the per-pair aggregates whose two subscribers pass the node-level
+    filters, the same edges `build_contact_graph` returns.
+    """
+    if not pairs["source"] or (filters.minInteractions <= 0 and not filters.individuals):
+        return pairs
+
+    interactions = np.asarray(pairs["calls"], dtype=np.int64) + np.asarray(pairs["sms"], dtype=np.int64)
+    phones, endpoints = np.unique(
+        np.concatenate([np.asarray(pairs["source"]), np.asarray(pairs["target"])]),
+        return_inverse=True,
+    )
+    num_pairs = len(interactions)
+    source_ids, target_ids = endpoints[:num_pairs], endpoints[num_pairs:]
+    node_interactions = (
+        np.bincount(source_ids, weights=interactions, minlength=len(phones))
+        + np.bincount(target_ids, weights=interactions, minlength=len(phones))
+    )
+    keep = node_filter(phones, node_interactions, filters)
+    edge_indexes = np.flatnonzero(keep[source_ids] & keep[target_ids]).tolist()
+    return {key: [values[i] for i in edge_indexes] for key, values in pairs.items()}
+
+
+def build_contact_graph(pairs: Dict[str, list], filters: ContactGraphFilters) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Turns per-pair aggregates (as returned by `graph_crud.get_contact_pairs`)
+    into the nodes and edges of the contact graph, applying the node-level
+    filters (`minInteractions`, `individuals`).
+    """
+    if not pairs["source"]:
+        return {"nodes": [], "edges": []}
+
+    calls = np.asarray(pairs["calls"], dtype=np.int64)
+    sms = np.asarray(pairs["sms"], dtype=np.int64)
+    total_duration = np.asarray(pairs["total_duration"], dtype=np.int64)
+    unique_days = np.asarray(pairs["unique_days"], dtype=np.int64)
+    # A single day of contact counts as a spread of 1, as in the frontend
+    time_spread = np.asarray(pairs["time_spread"], dtype=np.int64)
+    time_spread = np.where(unique_days > 1, time_spread, 1)
+    interactions = calls + sms
+
+    # Integer ids for the subscribers, so per-node totals are plain bincounts.
+    phones, endpoints = np.unique(
+        np.concatenate([np.asarray(pairs["source"]), np.asarray(pairs["target"])]),
+        return_inverse=True,
+    )
+    num_pairs = len(calls)
+    source_ids, target_ids = endpoints[:num_pairs], endpoints[num_pairs:]
+    num_nodes = len(phones)
+
+    def per_node(weights: np.ndarray) -> np.ndarray:
+        return (
+            np.bincount(source_ids, weights=weights, minlength=num_nodes)
+            + np.bincount(target_ids, weights=weights, minlength=num_nodes)
+        ).astype(np.int64)
+
+    node_calls = per_node(calls)
+    node_sms = per_node(sms)
+    node_duration = per_node(total_duration)
+    node_degree = per_node(np.ones(num_pairs))
+    node_interactions = node_calls + node_sms
+
+    keep = node_filter(phones, node_interactions, filters)
+    edge_mask = keep[source_ids] & keep[target_ids]
+
+    scores = link_strength_scores(interactions, total_duration, unique_days, time_spread)
+    classifications = classify_links(scores, interactions, unique_days)
+    average_duration = np.divide(
+        total_duration, interactions, out=np.zeros(num_pairs), where=interactions > 0
+    )
+
+    node_indexes = np.flatnonzero(keep)
+    nodes = [
+        {
+            "id": phone,
+            "phoneNumber": phone,
+            "interactions": n_interactions,
+            "calls": n_calls,
+            "sms": n_sms,
+            "totalDuration": n_duration,
+            "degree": n_degree,
+        }
+        for phone, n_interactions, n_calls, n_sms, n_duration, n_degree in zip(
+            phones[node_indexes].tolist(),
+            node_interactions[node_indexes].tolist(),
+            node_calls[node_indexes].tolist(),
+            node_sms[node_indexes].tolist(),
+            node_duration[node_indexes].tolist(),
+            node_degree[node_indexes].tolist(),
+        )
+    ]
+
+    edge_indexes = np.flatnonzero(edge_mask)
+    sources = phones[source_ids[edge_indexes]].tolist()
+    targets = phones[target_ids[edge_indexes]].tolist()
+    edges = [
+        {
+            "id": f"{source}|{target}",
+            "source": source,
+            "target": target,
+            "interactions": e_interactions,
+            "callCount": e_calls,
+            "smsCount": e_sms,
+            "totalDuration": e_duration,
+            "averageDuration": e_average,
+            "uniqueDays": e_days,
+            "timeSpread": e_spread,
+            "strengthScore": e_score,
+            "classification": e_class,
+        }
+        for source, target, e_interactions, e_calls, e_sms, e_duration, e_average, e_days, e_spread, e_score, e_class in zip(
+            sources,
+            targets,
+            interactions[edge_indexes].tolist(),
+            calls[edge_indexes].tolist(),
+            sms[edge_indexes].tolist(),
+            total_duration[edge_indexes].tolist(),
+            average_duration[edge_indexes].tolist(),
+            unique_days[edge_indexes].tolist(),
+            time_spread[edge_indexes].tolist(),
+            scores[edge_indexes].tolist(),
+            classifications[edge_indexes].tolist(),
+        )
+    ]
+    return {"nodes": nodes, "edges": edges}
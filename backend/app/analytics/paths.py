@@ -0,0 +1,77 @@
+import time
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+# The deadline is checked every this many expanded nodes, not on every step.
+DEADLINE_CHECK_INTERVAL = 1024
+
+
+def bidirectional_bfs(
+    neighbors: Callable[[Hashable], Iterable[Hashable]],
+    start: Hashable,
+    end: Hashable,
+    max_hops: int,
+    timeout: float,
+) -> Optional[List[Hashable]]:
+    """
+    Finds one shortest path of at most `max_hops` edges between two nodes,
+    growing the smaller of the two search frontiers at each step.
+    `neighbors(node)` returns the nodes adjacent to `node`.
+    Returns the path as a list of nodes, or None if there is none.
+    Raises TimeoutError if the search takes longer than `timeout` seconds.
+    """
+    if start == end:
+        return [start]
+
+    deadline = time.monotonic() + timeout
+    # Parent pointers of each side double as their visited sets.
+    forward_parents: Dict[Hashable, Optional[Hashable]] = {start: None}
+    backward_parents: Dict[Hashable, Optional[Hashable]] = {end: None}
+    forward_frontier, backward_frontier = [start], [end]
+    expanded = 0
+
+    for _ in range(max_hops):
+        # Expand the smaller frontier; swap roles so the loop body is one-sided.
+        forward = len(forward_frontier) <= len(backward_frontier)
+        frontier = forward_frontier if forward else backward_frontier
+        parents = forward_parents if forward else backward_parents
+        other_parents = backward_parents if forward else forward_parents
+
+        next_frontier = []
+        meeting_point = None
+        for node in frontier:
+            expanded += 1
+            if expanded % DEADLINE_CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+                raise TimeoutError("Path search timed out")
+            for neighbor in neighbors(node):
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = node
+                if neighbor in other_parents:
+                    meeting_point = neighbor
+                    break
+                next_frontier.append(neighbor)
+            if meeting_point is not None:
+                break
+
+        if meeting_point is not None:
+            path = []
+            node = meeting_point
+            while node is not None:
+                path.append(node)
+                node = forward_parents[node]
+            path.reverse()
+            node = backward_parents[meeting_point]
+            while node is not None:
+                path.append(node)
+                node = backward_parents[node]
+            return path
+
+        if not next_frontier:
+            return None
+        if forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    return None
+
@@ -0,0 +1,283 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from neo4j import Session
+
+from app.core.config import GRAPH_SNAPSHOT_TTL_SECONDS
+
+# Node labels are stored as small integers in the snapshot.
+SUBSCRIBER, DEVICE, CELL_TOWER = 0, 1, 2
+LABELS = ("Subscriber", "Device", "CellTower")
+
+# Each query returns (source, target, weight) with the source a Subscriber
+# phone number. Weights count communications.
+FULL_LOAD_QUERIES = [
+    (SUBSCRIBER, """
+    MATCH (a:Subscriber)-[r:CONTACTED]->(b:Subscriber)
+    RETURN a.phoneNumber AS source, b.phoneNumber AS target, r.calls + r.sms AS weight
+    """),
+    (DEVICE, """
+    MATCH (s:Subscriber)-[:INITIATED]->(c:Communication)-[:USED_DEVICE]->(d:Device)
+    RETURN s.phoneNumber AS source, d.imei AS target, count(c) AS weight
+    """),
+    (CELL_TOWER, """
+    MATCH (s:Subscriber)-[:INITIATED]->(c:Communication)-[:ROUTED_THROUGH]->(t:CellTower)
+    RETURN s.phoneNumber AS source, t.name AS target, count(c) AS weight
+    """),
+]
+
+LISTING_SET_LOAD_QUERIES = [
+    (SUBSCRIBER, """
+    MATCH (c:Communication)-[:PART_OF]->(:ListingSet {id: $listing_set_id})
+    MATCH (s:Subscriber)-[:INITIATED]->(c)-[:IS_DIRECTED_TO]->(b:Subscriber)
+    RETURN s.phoneNumber AS source, b.phoneNumber AS target, count(c) AS weight
+    """),
+    (DEVICE, """
+    MATCH (c:Communication)-[:PART_OF]->(:ListingSet {id: $listing_set_id})
+    MATCH (s:Subscriber)-[:INITIATED]->(c)-[:USED_DEVICE]->(d:Device)
+    RETURN s.phoneNumber AS source, d.imei AS target, count(c) AS weight
+    """),
+    (CELL_TOWER, """
+    MATCH (c:Communication)-[:PART_OF]->(:ListingSet {id: $listing_set_id})
+    MATCH (s:Subscriber)-[:INITIATED]->(c)-[:ROUTED_THROUGH]->(t:CellTower)
+    RETURN s.phoneNumber AS source, t.name AS target, count(c) AS weight
+    """),
+]
+
+# (source phone number, target label, target key, weight)
+EdgeRow = Tuple[str, int, str, int]
+
+
+@dataclass(frozen=True)
+class CSRGraph:
+    """
+    An immutable, undirected snapshot of the communication graph in compressed
+    sparse row form. Node i's neighbours are indices[indptr[i]:indptr[i + 1]],
+    with the matching communication counts in weights.
+    """
+    indptr: np.ndarray                  # int64, num_nodes + 1
+    indices: np.ndarray                 # int32, 2 * num_edges (minus self-loops)
+    weights: np.ndarray                 # int64, same length as indices
+    labels: np.ndarray                  # int8 label code of each node
+    keys: List[str]                     # phoneNumber / imei / name of each node
+    index: Dict[Tuple[int, str], int]   # (label code, key) -> node id
+    # Each undirected edge once (source < target), kept to merge new data in.
+    edge_source: np.ndarray = field(repr=False)
+    edge_target: np.ndarray = field(repr=False)
+    edge_weight: np.ndarray = field(repr=False)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.keys)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_source)
+
+    def node_id(self, label: int, key: str) -> Optional[int]:
+        return self.index.get((label, key))
+
+    def subscriber_id(self, phone_number: str) -> Optional[int]:
+        return self.index.get((SUBSCRIBER, phone_number))
+
+    def neighbors(self, node: int) -> np.ndarray:
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def node_mask(self, nodes: Iterable[Tuple[int, str]]) -> np.ndarray:
+        """Boolean mask of the snapshot nodes among `nodes`, given as (label code, key)."""
+        mask = np.zeros(self.num_nodes, dtype=bool)
+        mask[[i for i in map(self.index.get, nodes) if i is not None]] = True
+        return mask
+
+    def subscriber_neighbors(self, node: int) -> List[int]:
+        """The neighbours of a node that are subscribers (the contact graph)."""
+        neighbors = self.neighbors(node)
+        return neighbors[self.labels[neighbors] == SUBSCRIBER].tolist()
+
+    def gather_neighbors(self, frontier: np.ndarray) -> np.ndarray:
+        """Concatenated neighbour lists of all the nodes in `frontier`, without a Python loop."""
+        starts = self.indptr[frontier]
+        lengths = self.indptr[frontier + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=self.indices.dtype)
+        # Position of each output slot within its node's slice, offset by the slice start.
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.indices[offsets + np.arange(total)]
+
+    def k_hop(
+        self, node: int, k: int, label: Optional[int] = None, allowed: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nodes within `k` hops of `node` (excluding it) and their hop distance.
+        If `label` is set, only nodes with that label are traversed and returned;
+        if `allowed` (a node mask) is set, only the nodes it selects.
+        """
+        distance = np.full(self.num_nodes, -1, dtype=np.int32)
+        distance[node] = 0
+        frontier = np.array([node], dtype=np.int64)
+        for hop in range(1, k + 1):
+            reached = np.unique(self.gather_neighbors(frontier))
+            reached = reached[distance[reached] < 0]
+            if label is not None:
+                reached = reached[self.labels[reached] == label]
+            if allowed is not None:
+                reached = reached[allowed[reached]]
+            if len(reached) == 0:
+                break
+            distance[reached] = hop
+            frontier = reached
+        found = np.flatnonzero(distance > 0)
+        return found, distance[found]
+
+    def merge(self, rows: Iterable[EdgeRow]) -> "CSRGraph":
+        """
+        Returns a new snapshot with the weights of `rows` added to this one.
+        Negative weights take a previous contribution back out; edges left
+        with no weight are dropped.
+        """
+        keys = list(self.keys)
+        labels = self.labels.tolist()
+        index = dict(self.index)
+
+        def node_for(label: int, key: str) -> int:
+            node = index.get((label, key))
+            if node is None:
+                node = index[(label, key)] = len(keys)
+                keys.append(key)
+                labels.append(label)
+            return node
+
+        new_source, new_target, new_weight = [], [], []
+        for source, target_label, target, weight in rows:
+            if source is None or target is None:
+                continue
+            new_source.append(node_for(SUBSCRIBER, source))
+            new_target.append(node_for(target_label, target))
+            new_weight.append(weight)
+
+        return build_csr(
+            keys,
+            np.asarray(labels, dtype=np.int8),
+            index,
+            np.concatenate([self.edge_source, np.asarray(new_source, dtype=np.int64)]),
+            np.concatenate([self.edge_target, np.asarray(new_target, dtype=np.int64)]),
+            np.concatenate([self.edge_weight, np.asarray(new_weight, dtype=np.int64)]),
+        )
+
+
+def build_csr(
+    keys: List[str],
+    labels: np.ndarray,
+    index: Dict[Tuple[int, str], int],
+    source: np.ndarray,
+    target: np.ndarray,
+    weight: np.ndarray,
+) -> CSRGraph:
+    """Coalesces an edge list (summing duplicate and reversed pairs) into a symmetric CSR graph."""
+    num_nodes = len(keys)
+    base = max(num_nodes, 1)
+    low, high = np.minimum(source, target), np.maximum(source, target)
+    pairs, inverse = np.unique(low * base + high, return_inverse=True)
+    edge_weight = np.bincount(inverse, weights=weight, minlength=len(pairs)).astype(np.int64)
+    keep = edge_weight != 0
+    pairs, edge_weight = pairs[keep], edge_weight[keep]
+    edge_source, edge_target = pairs // base, pairs % base
+
+    # Both directions of every edge, except self-loops which are stored once.
+    not_loop = edge_source != edge_target
+    rows = np.concatenate([edge_source, edge_target[not_loop]])
+    cols = np.concatenate([edge_target, edge_source[not_loop]])
+    vals = np.concatenate([edge_weight, edge_weight[not_loop]])
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_nodes), out=indptr[1:])
+
+    return CSRGraph(
+        indptr=indptr,
+        indices=cols[order].astype(np.int32),
+        weights=vals[order],
+        labels=labels,
+        keys=keys,
+        index=index,
+        edge_source=edge_source,
+        edge_target=edge_target,
+        edge_weight=edge_weight,
+    )
+
+
+EMPTY_GRAPH = build_csr([], np.empty(0, dtype=np.int8), {}, *(np.empty(0, dtype=np.int64),) * 3)
+
+
+def _fetch_rows(db: Session, queries, **params) -> Iterable[EdgeRow]:
+    for target_label, query in queries:
+        for record in db.run(query, **params):
+            yield record["source"], target_label, record["target"], record["weight"]
+
+
+class GraphSnapshotCache:
+    """
+    Holds the current snapshot of the communication graph for this process.
+    The first use loads it in full; when a ListingSet finishes ingesting, only
+    its communications are fetched and merged in, replacing whatever was
+    merged for that set before. A full reload also happens once the snapshot
+    is older than `ttl` seconds, to pick up changes made by other processes.
+    """
+    def __init__(self, ttl: float = GRAPH_SNAPSHOT_TTL_SECONDS):
+        self.ttl = ttl
+        self._graph: Optional[CSRGraph] = None
+        self._loaded_at = 0.0
+        # Rows merged in per ListingSet since the last full load
+        self._merged: Dict[str, List[EdgeRow]] = {}
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[CSRGraph]:
+        """The snapshot if it is loaded and fresh, without touching the database."""
+        graph = self._graph
+        if graph is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return graph
+        return None
+
+    def get(self, db: Session) -> CSRGraph:
+        graph = self.current()
+        if graph is not None:
+            return graph
+        with self._lock:
+            if self._graph is None or time.monotonic() - self._loaded_at >= self.ttl:
+                self._graph = EMPTY_GRAPH.merge(_fetch_rows(db, FULL_LOAD_QUERIES))
+                self._loaded_at = time.monotonic()
+                self._merged = {}
+            return self._graph
+
+    def refresh_listing_set(self, db: Session, listing_set_id: str, started_at: float):
+        """
+        Merges the communications of a newly ingested ListingSet into the
+        snapshot. `started_at` is the time.monotonic() at which its ingestion
+        started: a snapshot loaded since may already hold part of the set, so
+        it is dropped instead.
+        """
+        with self._lock:
+            if self._graph is None:
+                # Nothing loaded yet: the next full load will include this set.
+                return
+            previous = self._merged.get(listing_set_id)
+            if previous is None and self._loaded_at >= started_at:
+                self._graph = None
+                self._merged = {}
+                return
+            rows = list(_fetch_rows(db, LISTING_SET_LOAD_QUERIES, listing_set_id=listing_set_id))
+            # Take out what an earlier refresh of the same set added before adding it again
+            removed = [(source, label, target, -weight) for source, label, target, weight in previous or ()]
+            self._graph = self._graph.merge(removed + rows)
+            self._merged[listing_set_id] = rows
+
+    def invalidate(self):
+        self._graph = None
+        self._merged = {}
+
+
+# A single graph snapshot for the entire application.
+graph_snapshot = GraphSnapshotCache()
@@ -0,0 +1,76 @@
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+BUCKET_SECONDS = {"minute": 60, "hour": 3600, "day": 86400}
+EPOCH = datetime(1970, 1, 1)
+
+
+def bucket_range(start: datetime, end: datetime, granularity: str) -> range:
+    """Indexes (bucket numbers since the epoch) of the buckets overlapping [start, end)."""
+    size = BUCKET_SECONDS[granularity]
+    first = int((start - EPOCH).total_seconds()) // size
+    last = -(-int((end - EPOCH).total_seconds()) // size)
+    return range(first, last)
+
+
+def bucket_starts(buckets: range, granularity: str) -> List[datetime]:
+    size = BUCKET_SECONDS[granularity]
+    return [EPOCH + timedelta(seconds=bucket * size) for bucket in buckets]
+
+
+def _series(calls: np.ndarray, sms: np.ndarray, key: str = "") -> Dict[str, Any]:
+    return {"key": key, "calls": calls.tolist(), "sms": sms.tolist(), "total": int(calls.sum() + sms.sum())}
+
+
+def build_timeline(counts: Dict[str, list], buckets: range, group_by: str, limit: int) -> Dict[str, Any]:
+    """
+    Turns per-(pair, type, bucket) counts (as returned by
+    `graph_crud.get_timeline_counts`) into dense count arrays: the overall
+    totals, and for `group_by` "subscriber" or "pair" the `limit` most active
+    series. Work and output are proportional to rows and buckets, not events.
+    """
+    num_buckets = len(buckets)
+    bucket = np.asarray(counts["bucket"], dtype=np.int64) - buckets.start
+    count = np.asarray(counts["count"], dtype=np.int64)
+    is_call = np.asarray(counts["type"], dtype=object) == "CALL"
+    is_sms = np.asarray(counts["type"], dtype=object) == "SMS"
+
+    totals = _series(
+        np.bincount(bucket, weights=count * is_call, minlength=num_buckets).astype(np.int64),
+        np.bincount(bucket, weights=count * is_sms, minlength=num_buckets).astype(np.int64),
+    )
+    timeline = {"totals": totals, "series": [], "total_series": 0}
+    if group_by == "total" or not len(count):
+        return timeline
+
+    source = np.asarray(counts["source"], dtype=object)
+    target = np.asarray(counts["target"], dtype=object)
+    if group_by == "pair":
+        keys = source + "|" + target
+    else:
+        # An event counts towards the activity of both of its subscribers
+        # (once for a self-contact).
+        other = source != target
+        keys = np.concatenate([source, target[other]])
+        bucket = np.concatenate([bucket, bucket[other]])
+        count = np.concatenate([count, count[other]])
+        is_call = np.concatenate([is_call, is_call[other]])
+        is_sms = np.concatenate([is_sms, is_sms[other]])
+
+    names, series_ids = np.unique(keys.astype(str), return_inverse=True)
+    series_totals = np.bincount(series_ids, weights=count, minlength=len(names))
+    top = np.argsort(-series_totals, kind="stable")[:limit]
+    # Rank of each kept series; -1 for the rest, whose rows are dropped.
+    rank = np.full(len(names), -1, dtype=np.int64)
+    rank[top] = np.arange(len(top))
+    row_rank = rank[series_ids]
+    keep = row_rank >= 0
+    cells = row_rank[keep] * num_buckets + bucket[keep]
+    shape = (len(top), num_buckets)
+    calls = np.bincount(cells, weights=(count * is_call)[keep], minlength=shape[0] * shape[1]).astype(np.int64).reshape(shape)
+    sms = np.bincount(cells, weights=(count * is_sms)[keep], minlength=shape[0] * shape[1]).astype(np.int64).reshape(shape)
+
+    timeline["series"] = [_series(calls[i], sms[i], name) for i, name in enumerate(names[top].tolist())]
+    timeline["total_series"] = len(names)
+    return timeline
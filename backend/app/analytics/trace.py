@@ -0,0 +1,46 @@
+import numpy as np
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from app.analytics.timeline import EPOCH
+
+
+def compress_trace(visits: Dict[str, list], max_gap_seconds: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Compresses a subscriber's time-ordered tower visits (as returned by
+    `graph_crud.get_tower_visits`) into stops: each run of consecutive events
+    at the same tower becomes one stop with its first and last event time.
+    If `max_gap_seconds` is set, a run is also split wherever two of its
+    events are further apart than that.
+    """
+    if not visits["timestamp"]:
+        return []
+
+    times = np.asarray(visits["timestamp"], dtype="datetime64[s]").astype(np.int64)
+    towers = np.asarray(visits["tower"], dtype=object)
+    # A stop starts at the first event and wherever the tower changes.
+    starts = np.r_[True, towers[1:] != towers[:-1]]
+    if max_gap_seconds is not None:
+        starts[1:] |= np.diff(times) > max_gap_seconds
+    first = np.flatnonzero(starts)
+    last = np.r_[first[1:] - 1, len(times) - 1]
+
+    return [
+        {
+            "tower": tower,
+            "longitude": longitude,
+            "latitude": latitude,
+            "arrived": EPOCH + timedelta(seconds=arrived),
+            "departed": EPOCH + timedelta(seconds=departed),
+            "dwell_seconds": departed - arrived,
+            "events": events,
+        }
+        for tower, longitude, latitude, arrived, departed, events in zip(
+            towers[first].tolist(),
+            [visits["longitude"][i] for i in first],
+            [visits["latitude"][i] for i in first],
+            times[first].tolist(),
+            times[last].tolist(),
+            (last - first + 1).tolist(),
+        )
+    ]
@@ -1,7 +1,218 @@
-# This is a simple in-memory set to store the JTI of logged-out tokens.
-# ---
-# IMPORTANT: In a real-world, multi-process production environment,
-# you would replace this with a shared, persistent cache like Redis.
-# This in-memory solution will be reset every time the server restarts.
-# ---
-BLOCKLIST = set()
\ No newline at end of file
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+from app.core.config import REVOCATION_BACKEND, REVOCATION_DB_PATH, REVOCATION_SYNC_SECONDS
+
+# Revoked tokens (by JTI) are kept until the token would have expired anyway.
+# Stores are pluggable: anything implementing `RevocationStore` can be returned
+# by `create_revocation_store`.
+
+# Expected number of live revocations, and the false positive rate the Bloom
+# filter is sized for. More entries only make the filter less selective.
+BLOOM_CAPACITY = 100_000
+BLOOM_ERROR_RATE = 0.01
+# Expired revocations are deleted (and the filter rebuilt) this often, in seconds.
+PURGE_INTERVAL = 300.0
+
+
+class RevocationStore(ABC):
+    """
+    Interface of the token revocation backends. `revoke`, `is_revoked` and
+    `purge_expired` may block on I/O: async code calls them through
+    `run_in_threadpool`, and only calls `is_revoked` when `may_be_revoked`,
+    which never blocks, cannot rule the token out.
+    """
+
+    @abstractmethod
+    def revoke(self, jti: str, expires_at: float):
+        """Revokes a token until `expires_at` (its `exp` claim, a UNIX timestamp)."""
+
+    @abstractmethod
+    def is_revoked(self, jti: str) -> bool:
+        """Whether the token is revoked."""
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Forgets revocations of tokens that have expired; returns how many were removed."""
+
+    def may_be_revoked(self, jti: str) -> bool:
+        """False only if the token is certainly not revoked. Never blocks."""
+        return True
+
+
+class MemoryRevocationStore(RevocationStore):
+    """Revocations held by this process only. Suitable for a single worker."""
+
+    def __init__(self):
+        self._expiry: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._next_purge = time.monotonic() + PURGE_INTERVAL
+
+    def revoke(self, jti: str, expires_at: float):
+        with self._lock:
+            self._expiry[jti] = expires_at
+
+    def is_revoked(self, jti: str) -> bool:
+        if time.monotonic() > self._next_purge:
+            self.purge_expired()
+        expires_at = self._expiry.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def may_be_revoked(self, jti: str) -> bool:
+        # Everything is in memory: the exact answer is just as cheap.
+        return self.is_revoked(jti)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            self._next_purge = time.monotonic() + PURGE_INTERVAL
+            expired = [jti for jti, expires_at in self._expiry.items() if expires_at <= now]
+            for jti in expired:
+                del self._expiry[jti]
+            return len(expired)
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter over strings: no false negatives, few false positives."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.num_bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        # Double hashing: k positions from two 64-bit halves of one digest.
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    jti TEXT NOT NULL UNIQUE,
+    expires_at REAL NOT NULL
+)
+"""
+_EXPIRY_INDEX = "CREATE INDEX IF NOT EXISTS revoked_tokens_expires_at ON revoked_tokens (expires_at)"
+
+
+class SQLiteRevocationStore(RevocationStore):
+    """
+    Revocations in a local SQLite database, shared by every worker process on
+    the host. Each process keeps a Bloom filter of the revoked JTIs in front of
+    it, so checking a token that was not revoked (almost every request) does
+    not touch the database. The filter picks up revocations made by other
+    processes at most `sync_interval` seconds late: once a sync is due,
+    `may_be_revoked` answers True so that the next check, run off the event
+    loop, syncs.
+    """
+
+    def __init__(self, db_path: str, sync_interval: float = REVOCATION_SYNC_SECONDS):
+        self.db_path = db_path
+        self.sync_interval = sync_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._bloom: Optional[BloomFilter] = None
+        self._last_seq = 0
+        self._next_sync = 0.0
+        self._next_purge = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Callers must hold self._lock.
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+            self._conn.execute(_EXPIRY_INDEX)
+        return self._conn
+
+    def _rebuild_filter(self, conn: sqlite3.Connection):
+        # Callers must hold self._lock.
+        rows = conn.execute("SELECT seq, jti FROM revoked_tokens WHERE expires_at > ?", (time.time(),)).fetchall()
+        bloom = BloomFilter(max(BLOOM_CAPACITY, 2 * len(rows)), BLOOM_ERROR_RATE)
+        for _, jti in rows:
+            bloom.add(jti)
+        last_seq = conn.execute("SELECT coalesce(max(seq), 0) FROM revoked_tokens").fetchone()[0]
+        self._bloom, self._last_seq = bloom, last_seq
+
+    def _sync(self):
+        """Adds revocations made since the last sync to the filter; purges now and then."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_sync:
+                return
+            conn = self._connection()
+            if self._bloom is None or now >= self._next_purge:
+                conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (time.time(),))
+                self._rebuild_filter(conn)
+                self._next_purge = now + PURGE_INTERVAL
+            else:
+                for seq, jti in conn.execute(
+                    "SELECT seq, jti FROM revoked_tokens WHERE seq > ? ORDER BY seq", (self._last_seq,)
+                ):
+                    self._bloom.add(jti)
+                    self._last_seq = seq
+            self._next_sync = now + self.sync_interval
+
+    def revoke(self, jti: str, expires_at: float):
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)", (jti, expires_at)
+            )
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+    def may_be_revoked(self, jti: str) -> bool:
+        bloom = self._bloom
+        if bloom is None or time.monotonic() >= self._next_sync:
+            return True
+        return jti in bloom
+
+    def is_revoked(self, jti: str) -> bool:
+        if time.monotonic() >= self._next_sync:
+            self._sync()
+        if jti not in self._bloom:
+            return False
+        # Possibly a false positive: confirm with the database.
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT 1 FROM revoked_tokens WHERE jti = ? AND expires_at > ?", (jti, time.time())
+            ).fetchone()
+        return row is not None
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            conn = self._connection()
+            removed = conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (time.time(),)).rowcount
+            self._rebuild_filter(conn)
+            self._next_purge = time.monotonic() + PURGE_INTERVAL
+            return removed
+
+
+def create_revocation_store(backend: str = REVOCATION_BACKEND) -> RevocationStore:
+    if backend == "sqlite":
+        return SQLiteRevocationStore(REVOCATION_DB_PATH)
+    if backend == "memory":
+        return MemoryRevocationStore()
+    raise ValueError(f"Unknown revocation backend: {backend}")
+
+
+# A single revocation store for the entire application.
+revocation_store = create_revocation_store()
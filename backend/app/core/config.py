@@ -8,12 +8,94 @@ load_dotenv()
 NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USER = os.getenv("NEO4J_USER")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+# Connection pool of each driver: size, seconds to wait for a free connection,
+# and seconds after which a connection is retired
+NEO4J_MAX_CONNECTION_POOL_SIZE = int(os.getenv("NEO4J_MAX_CONNECTION_POOL_SIZE", 100))
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", 60))
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", 3600))
 
 
 # JWT Configuration
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+# Password hashing: bcrypt work factor, threads dedicated to hashing, and how many
+# checks may wait for them before logins are turned away with a 503
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", max(1, (os.cpu_count() or 1) // 2)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))
+# Decoded tokens and user records are cached in memory for this long. Changes made
+# through this process invalidate them at once; other processes see them after the TTL.
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", 60))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 1024))
+# Revoked (logged out) tokens: "sqlite" shares them between the workers of a host,
+# "memory" keeps them in the process. Workers see each other's revocations within
+# REVOCATION_SYNC_SECONDS.
+REVOCATION_BACKEND = os.getenv("REVOCATION_BACKEND", "sqlite")
+REVOCATION_DB_PATH = os.getenv("REVOCATION_DB_PATH", "data/revocations.sqlite3")
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", 1))
+
+
+# Ingestion Configuration
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 1000))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))
+# Processes used to parse CSV files, in one pool shared by all the ingestion workers;
+# 1 parses in the ingestion workers themselves
+INGEST_PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", max(1, (os.cpu_count() or 1) - 1)))
+# Local, persistent storage for the ingestion job queue and the uploaded files it refers to
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "data/jobs.sqlite3")
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", "data/spool")
+
+# Export Configuration
+# Communications per Parquet row group when exporting a ListingSet; each is sent as soon as it is written
+EXPORT_ROW_GROUP_SIZE = int(os.getenv("EXPORT_ROW_GROUP_SIZE", 50000))
+
+# Visualization Configuration
+# Default caps on the size of the graphs returned by /workbench/visualize,
+# and the largest caps a request may ask for
+VISUALIZE_MAX_NODES = int(os.getenv("VISUALIZE_MAX_NODES", 5000))
+VISUALIZE_MAX_EDGES = int(os.getenv("VISUALIZE_MAX_EDGES", 20000))
+VISUALIZE_NODE_LIMIT = int(os.getenv("VISUALIZE_NODE_LIMIT", 50000))
+VISUALIZE_EDGE_LIMIT = int(os.getenv("VISUALIZE_EDGE_LIMIT", 200000))
+
+# Result Cache Configuration
+# Serialized responses of the search, path and visualization endpoints kept in memory,
+# and optionally on disk (shared by the workers of a host) once evicted from memory
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR") or None
+RESULT_CACHE_DISK_MAX_BYTES = int(os.getenv("RESULT_CACHE_DISK_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+
+# Path Search Configuration
+SHORTEST_PATH_MAX_HOPS = int(os.getenv("SHORTEST_PATH_MAX_HOPS", 15))
+SHORTEST_PATH_TIMEOUT_SECONDS = float(os.getenv("SHORTEST_PATH_TIMEOUT_SECONDS", 5))
+# In-memory graph snapshot: it is merged incrementally after each ingestion in
+# this process, and fully reloaded after this many seconds to see other processes' imports
+GRAPH_SNAPSHOT_TTL_SECONDS = float(os.getenv("GRAPH_SNAPSHOT_TTL_SECONDS", 900))
+
+# Neighbourhood Expansion Configuration
+# Neighbours kept per expanded node, so supernodes (busy cell towers) stay cheap to expand
+NEIGHBORHOOD_FAN_OUT = int(os.getenv("NEIGHBORHOOD_FAN_OUT", 25))
+NEIGHBORHOOD_MAX_NODES = int(os.getenv("NEIGHBORHOOD_MAX_NODES", 2000))
+
+# Timeline Configuration
+# Largest number of time buckets a /graph/timeline request may span
+TIMELINE_MAX_BUCKETS = int(os.getenv("TIMELINE_MAX_BUCKETS", 10000))
+
+# Cell Tower Search Configuration
+# Largest number of towers a bounding-box or radius search may return
+TOWER_SEARCH_MAX_RESULTS = int(os.getenv("TOWER_SEARCH_MAX_RESULTS", 5000))
+
+# Co-location and Shared-Device Detection Configuration
+# Later events on the same tower compared with each event; bounds the work on busy towers
+COLOCATION_MAX_NEIGHBORS = int(os.getenv("COLOCATION_MAX_NEIGHBORS", 64))
+# Devices used by more subscribers than this (placeholder or cloned IMEIs) are not paired
+SHARED_DEVICE_MAX_SUBSCRIBERS = int(os.getenv("SHARED_DEVICE_MAX_SUBSCRIBERS", 50))
+
+# Network Analytics Configuration
+# Random sources used to estimate betweenness centrality
+BETWEENNESS_SAMPLES = int(os.getenv("BETWEENNESS_SAMPLES", 64))
+# Number of computed metric sets (one per user / ListingSet combination / filters) kept in memory
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", 32))
 
 print("Configuration loaded:")
 print(f"NEO4J_URI: {'Loaded' if NEO4J_URI else 'Not Found'}")
@@ -0,0 +1,113 @@
+import orjson
+from fastapi.responses import Response
+from neo4j import time as neo4j_time
+from neo4j.graph import Node as Neo4jNode, Relationship, Path
+from neo4j.spatial import Point, WGS84Point
+from typing import Any, Dict, Iterable, List
+
+# JSON is written straight to bytes with orjson. Driver values it doesn't know
+# (temporal and spatial types) go through this hook, which orjson only calls
+# for those values, instead of a Python pass over every property of every element.
+def _default(value: Any) -> Any:
+    if isinstance(value, (neo4j_time.DateTime, neo4j_time.Date, neo4j_time.Time)):
+        return value.to_native()
+    if isinstance(value, neo4j_time.Duration):
+        return value.iso_format()
+    if isinstance(value, WGS84Point):
+        return {"longitude": value.longitude, "latitude": value.latitude}
+    if isinstance(value, Point):
+        return {"srid": value.srid, "coordinates": list(value)}
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(data: Any) -> bytes:
+    """Serializes data that may contain Neo4j driver values to JSON bytes."""
+    return orjson.dumps(data, default=_default)
+
+
+class GraphSerializer:
+    """
+    Collects driver nodes and relationships, each exactly once, and writes them
+    out in the shape of the `Graph` model (`nodes` and `edges`).
+    A relationship that appears in many paths is only serialized once.
+    Elements listed in `known_node_ids` / `known_edge_ids` are skipped, so only
+    the delta with what a client already has is written.
+    """
+    def __init__(self, known_node_ids: Iterable[str] = (), known_edge_ids: Iterable[str] = ()):
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+        self._edges: Dict[str, Dict[str, Any]] = {}
+        self._known_nodes = set(known_node_ids)
+        self._known_edges = set(known_edge_ids)
+
+    def __len__(self) -> int:
+        return len(self._nodes) + len(self._edges)
+
+    @property
+    def node_count(self) -> int:
+        return len(self._nodes)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._edges)
+
+    def add_node(self, node: Neo4jNode):
+        element_id = node.element_id
+        if element_id not in self._nodes and element_id not in self._known_nodes:
+            self._nodes[element_id] = {
+                "id": element_id,
+                "label": next(iter(node.labels), None),
+                "properties": dict(node),
+            }
+
+    def add_relationship(self, edge: Relationship):
+        element_id = edge.element_id
+        if element_id not in self._edges and element_id not in self._known_edges:
+            start_node, end_node = edge.start_node, edge.end_node
+            self.add_node(start_node)
+            self.add_node(end_node)
+            self._edges[element_id] = {
+                "id": element_id,
+                "source": start_node.element_id,
+                "target": end_node.element_id,
+                "label": edge.type,
+                "properties": dict(edge),
+            }
+
+    def add_path(self, path: Path):
+        for node in path.nodes:
+            self.add_node(node)
+        for edge in path.relationships:
+            self.add_relationship(edge)
+
+    def add_paths(self, paths: Iterable[Path]):
+        for path in paths:
+            if path is not None:
+                self.add_path(path)
+
+    def truncate(self, node_count: int, edge_count: int):
+        """Drops the most recently added elements, keeping the first `node_count` nodes and `edge_count` edges."""
+        while len(self._nodes) > node_count:
+            self._nodes.popitem()
+        while len(self._edges) > edge_count:
+            self._edges.popitem()
+
+    def to_dict(self, **extra: Any) -> Dict[str, Any]:
+        return {"nodes": list(self._nodes.values()), "edges": list(self._edges.values()), **extra}
+
+    def to_json(self, **extra: Any) -> bytes:
+        """Serializes the graph to JSON bytes; `extra` adds top-level fields (e.g. a cursor)."""
+        return dumps(self.to_dict(**extra))
+
+    def to_response(self, **extra: Any) -> Response:
+        """
+        Wraps the JSON in a response. Routes keep their `response_model` for the
+        API docs, but FastAPI does not re-validate a returned Response.
+        """
+        return Response(content=self.to_json(**extra), media_type="application/json")
+
+
+def serialize_paths(records: List, key: str = "p") -> GraphSerializer:
+    """Builds a serializer from records holding one path each under `key`."""
+    serializer = GraphSerializer()
+    serializer.add_paths(record.get(key) for record in records)
+    return serializer
@@ -0,0 +1,277 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from app.core.config import JOB_DB_PATH, INGEST_WORKERS
+from app.models.jobs import IngestionJob
+
+# How long an idle worker sleeps before checking the queue again (in seconds).
+# Workers are also woken up immediately whenever a job is enqueued.
+POLL_INTERVAL = 5.0
+# The database is shared by every server process on the host. A process holds
+# the jobs it runs by refreshing their heartbeat this often (in seconds); a
+# running job whose heartbeat is older than LEASE_TIMEOUT was left by a process
+# that died, and is claimed again.
+HEARTBEAT_INTERVAL = 10.0
+LEASE_TIMEOUT = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    listing_set_id TEXT NOT NULL,
+    owner_username TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total_rows INTEGER NOT NULL DEFAULT 0,
+    processed_rows INTEGER NOT NULL DEFAULT 0,
+    ingested INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    duplicates INTEGER NOT NULL DEFAULT 0,
+    errors TEXT NOT NULL DEFAULT '[]',
+    worker_id TEXT,
+    heartbeat_at REAL,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+)
+"""
+
+class JobInterrupted(Exception):
+    """Raised by a handler that stops a job between batches because the queue is stopping."""
+
+
+class JobLeaseLost(JobInterrupted):
+    """Raised when a job this process was running has been claimed by another process."""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobQueue:
+    """
+    A persistent, local queue of ingestion jobs backed by SQLite, and the pool
+    of worker threads that runs them.
+    Jobs survive server restarts: anything still queued is picked up again
+    when the workers start, and jobs whose process died while running them
+    resume, in whichever process claims them, after the last batch they committed.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._heartbeat: Optional[threading.Thread] = None
+        self._heartbeat_stop = threading.Event()
+        self._stopping = False
+        self.worker_id = ""
+        self._handler: Optional[Callable[[IngestionJob], Optional[str]]] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Callers must hold self._lock.
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+        return self._conn
+
+    def _execute(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._connection().execute(query, params).fetchall()
+
+    # --- Worker pool ---
+
+    def start(self, handler: Callable[[IngestionJob], Optional[str]], num_workers: int = INGEST_WORKERS):
+        """
+        Starts the worker threads. `handler` is called with each claimed job and
+        may report progress through `update_progress`; the job is marked with
+        the status it returns ("completed" if it returns None) and as failed if
+        it raises. Between batches, a handler should check `stopping` and raise
+        JobInterrupted if it is set: the job is then queued again and resumes
+        from its last progress report.
+        """
+        self._handler = handler
+        self._stopping = False
+        # Identifies this process's claims; set here rather than at import, which
+        # may happen before the server forks its workers.
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._heartbeat_stop.clear()
+        self._heartbeat = threading.Thread(target=self._beat, name="ingestion-heartbeat", daemon=True)
+        self._heartbeat.start()
+        for i in range(num_workers):
+            worker = threading.Thread(target=self._work, name=f"ingestion-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping
+
+    def stop(self):
+        """
+        Asks the workers to exit, and waits for them. Running jobs are
+        interrupted after their current batch and left queued.
+        """
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        # Only once the workers are done: their jobs must not look abandoned meanwhile.
+        self._heartbeat_stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _claim_next(self) -> Optional[IngestionJob]:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Queued jobs, and running jobs whose process stopped sending heartbeats:
+                # those were cut off mid-file and resume from their counters.
+                now = time.time()
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' "
+                    "OR (status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now - LEASE_TIMEOUT,),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                started_at = _now()
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker_id = ?, heartbeat_at = ?, "
+                    "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                    (self.worker_id, now, started_at, row["id"]),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        job = self._to_model(row)
+        job.status = "running"
+        job.started_at = job.started_at or datetime.fromisoformat(started_at)
+        return job
+
+    def _beat(self):
+        while not self._heartbeat_stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                self._execute(
+                    "UPDATE jobs SET heartbeat_at = ? WHERE worker_id = ? AND status = 'running'",
+                    (time.time(), self.worker_id),
+                )
+            except sqlite3.Error as e:
+                print(f"Ingestion heartbeat failed: {e}")
+
+    def _work(self):
+        while not self._stopping:
+            job = self._claim_next()
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=POLL_INTERVAL)
+                continue
+            try:
+                self._finish(job.id, self._handler(job) or "completed")
+            except JobLeaseLost:
+                print(f"Ingestion job {job.id} was claimed by another process; leaving it to them")
+            except JobInterrupted:
+                self._release(job.id)
+                print(f"Ingestion job {job.id} interrupted; it will resume on the next start")
+            except Exception as e:
+                print(f"Ingestion job {job.id} failed: {e}")
+                self._finish(job.id, "failed", error=str(e))
+
+    def _release(self, job_id: str):
+        """Queues a job this process was running again, keeping its counters."""
+        self._execute(
+            "UPDATE jobs SET status = 'queued', worker_id = NULL, heartbeat_at = NULL "
+            "WHERE id = ? AND worker_id = ?",
+            (job_id, self.worker_id),
+        )
+
+    def _finish(self, job_id: str, status: str, error: Optional[str] = None):
+        # Only while this process still holds the job.
+        if error is not None:
+            job = self.get(job_id)
+            errors = (job.errors if job else []) + [error]
+            self._execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, errors = ? WHERE id = ? AND worker_id = ?",
+                (status, _now(), json.dumps(errors), job_id, self.worker_id),
+            )
+        else:
+            self._execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND worker_id = ?",
+                (status, _now(), job_id, self.worker_id),
+            )
+
+    # --- Job records ---
+
+    def enqueue(self, listing_set_id: str, owner_username: str, file_path: str, total_rows: int = 0) -> IngestionJob:
+        """Adds a new ingestion job to the queue and wakes up an idle worker."""
+        job_id = str(uuid.uuid4())
+        self._execute(
+            "INSERT INTO jobs (id, listing_set_id, owner_username, file_path, status, total_rows, created_at) "
+            "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+            (job_id, listing_set_id, owner_username, file_path, total_rows, _now()),
+        )
+        with self._wakeup:
+            self._wakeup.notify()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return self._to_model(rows[0]) if rows else None
+
+    def get_file_path(self, job_id: str) -> Optional[str]:
+        rows = self._execute("SELECT file_path FROM jobs WHERE id = ?", (job_id,))
+        return rows[0]["file_path"] if rows else None
+
+    def update_progress(
+        self, job_id: str, ingested: int, skipped: int, failed: int, duplicates: int, errors: List[str]
+    ):
+        """
+        Stores the running counters of a job. `processed_rows` doubles as the
+        resume point of the job if the server stops while it runs.
+        Raises JobLeaseLost if another process has claimed the job since: the
+        handler must then stop without touching it.
+        """
+        with self._lock:
+            updated = self._connection().execute(
+                "UPDATE jobs SET processed_rows = ?, ingested = ?, skipped = ?, failed = ?, duplicates = ?, errors = ?, "
+                "heartbeat_at = ? WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (
+                    ingested + skipped + failed + duplicates, ingested, skipped, failed, duplicates,
+                    json.dumps(errors), time.time(), job_id, self.worker_id,
+                ),
+            ).rowcount
+        if not updated:
+            raise JobLeaseLost(job_id)
+
+    @staticmethod
+    def _to_model(row: sqlite3.Row) -> IngestionJob:
+        data = dict(row)
+        for column in ("file_path", "worker_id", "heartbeat_at"):
+            data.pop(column)
+        data["errors"] = json.loads(data["errors"])
+        return IngestionJob.model_validate(data)
+
+
+# A single job queue for the entire application, like the database driver.
+job_queue = JobQueue(JOB_DB_PATH)
@@ -0,0 +1,37 @@
+import threading
+from collections import deque
+from typing import Any, Dict
+
+
+class LatencyStats:
+    """
+    Counts and times events by outcome, keeping the most recent `window`
+    durations to report percentiles.
+    """
+    def __init__(self, window: int = 1000):
+        self._recent = deque(maxlen=window)
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str, seconds: float):
+        with self._lock:
+            self._recent.append(seconds)
+            self._counts[outcome] = self._counts.get(outcome, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._recent)
+            counts = dict(self._counts)
+
+        def percentile(p: float) -> float:
+            return recent[min(len(recent) - 1, int(p * len(recent)))] * 1000 if recent else 0.0
+
+        return {
+            "counts": counts,
+            "recent": len(recent),
+            "mean_ms": sum(recent) / len(recent) * 1000 if recent else 0.0,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": recent[-1] * 1000 if recent else 0.0,
+        }
@@ -0,0 +1,70 @@
+import io
+from typing import Any, Dict, List
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Columns of an exported ListingSet. The listing columns keep the names of the
+# import format, so an export can be imported again as it is.
+EXPORT_SCHEMA = pa.schema([
+    ("caller_num", pa.string()),
+    ("callee_num", pa.string()),
+    ("timestamp", pa.timestamp("s")),
+    ("type", pa.string()),
+    ("duration_str", pa.string()),
+    ("duration_seconds", pa.int64()),
+    ("imei", pa.string()),
+    ("tower_name", pa.string()),
+    ("tower_long", pa.string()),
+    ("tower_lat", pa.string()),
+    ("tower_longitude", pa.float64()),
+    ("tower_latitude", pa.float64()),
+])
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    A write-only file that hands what was written to it back in chunks.
+    The Parquet footer records file offsets, so `tell` keeps counting from the
+    start of the file even though drained bytes are no longer held.
+    """
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ParquetStreamWriter:
+    """
+    Encodes rows to a Parquet file incrementally: each `write` adds one row
+    group and returns the bytes to send, `close` returns the footer. Memory
+    stays proportional to a row group, not to the file.
+    """
+    def __init__(self, schema: pa.Schema = EXPORT_SCHEMA):
+        self.schema = schema
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(self._sink, schema, compression="zstd")
+
+    def write(self, columns: Dict[str, List[Any]]) -> bytes:
+        self._writer.write_table(pa.table(columns, schema=self.schema))
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.core.config import RESULT_CACHE_DIR, RESULT_CACHE_DISK_MAX_BYTES, RESULT_CACHE_MAX_BYTES
+
+# Tag of entries computed from the whole graph rather than from given ListingSets.
+GLOBAL = "*"
+
+
+def cache_key(*parts: Any) -> str:
+    """
+    A stable key (also used as the ETag) for an endpoint, its parameters and
+    the data versions they were computed from.
+    """
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Caches serialized JSON responses, keyed by `cache_key`. The in-memory tier
+    is an LRU bounded by the total size of the bodies; with `disk_dir` set,
+    entries evicted from memory move to files there, which are pruned oldest
+    first beyond `disk_max_bytes`.
+    Keys include the data version of what they were computed from, so stale
+    entries are never served; `invalidate_tag` frees them early.
+    """
+    def __init__(self, max_bytes: int, disk_dir: Optional[str] = None, disk_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[str, Tuple[bytes, Set[str]]]" = OrderedDict()
+        self._size = 0
+        self._disk_size: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    body = f.read()
+            except FileNotFoundError:
+                pass
+            else:
+                with self._lock:
+                    self.disk_hits += 1
+                return body
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, body: bytes, tags: Iterable[str]):
+        if len(body) > self.max_bytes:
+            return
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[0])
+            self._entries[key] = (body, set(tags))
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                old_key, (old_body, _) = self._entries.popitem(last=False)
+                self._size -= len(old_body)
+                evicted.append((old_key, old_body))
+        if self.disk_dir:
+            for old_key, old_body in evicted:
+                self._write_to_disk(old_key, old_body)
+
+    def _write_to_disk(self, key: str, body: bytes):
+        path = self._disk_path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(body)
+        # Readers in other workers see either no file or the whole file.
+        os.replace(temp_path, path)
+        with self._lock:
+            if self._disk_size is None:
+                self._disk_size = sum(entry.stat().st_size for entry in os.scandir(self.disk_dir))
+            else:
+                self._disk_size += len(body)
+            over_budget = self._disk_size > self.disk_max_bytes
+        if over_budget:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        files = sorted(
+            (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+            for entry in os.scandir(self.disk_dir) if entry.name.endswith(".json")
+        )
+        total = sum(size for _, size, _ in files)
+        # Prune down to 80% of the budget, so this doesn't run on every write.
+        for _, size, path in files:
+            if total <= self.disk_max_bytes * 0.8:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._disk_size = total
+
+    def invalidate_tag(self, tag: str):
+        """Drops the in-memory entries computed from ListingSet `tag` or from the whole graph."""
+        with self._lock:
+            for key in [key for key, (_, tags) in self._entries.items() if tag in tags or GLOBAL in tags]:
+                self._size -= len(self._entries.pop(key)[0])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+
+# A single result cache for the entire application.
+result_cache = ResultCache(RESULT_CACHE_MAX_BYTES, RESULT_CACHE_DIR, RESULT_CACHE_DISK_MAX_BYTES)
+
+
+async def cached_response(
+    request: Request,
+    key: str,
+    tags: Iterable[str],
+    produce: Callable[[], Awaitable[Response]],
+) -> Response:
+    """
+    Serves a JSON response from the result cache, computing it with `produce`
+    on a miss. The key doubles as a strong ETag: a client sending it back in
+    If-None-Match gets a 304 without the query being run or the body sent.
+    """
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    body = result_cache.get(key)
+    if body is None:
+        response = await produce()
+        if response.status_code != 200:
+            return response
+        body = response.body
+        result_cache.put(key, body, tags)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,11 +1,43 @@
+import asyncio
+import threading
 import uuid # <-- Import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Callable, Optional, Tuple, TypeVar
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from app.core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.config import (
+    SECRET_KEY,
+    ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_MAX_PENDING,
+)
+
+# Hashes made with fewer rounds than BCRYPT_ROUNDS count as deprecated and are
+# replaced on the next successful login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+
+# bcrypt is deliberately slow, so password work runs on its own small pool
+# rather than on the threadpool shared by every sync endpoint. The bcrypt
+# module releases the GIL while hashing.
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password")
+# Bounds the work queued on the pool; beyond it, callers are turned away.
+_password_slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+
+T = TypeVar("T")
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when too much password work is already queued."""
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -13,6 +45,31 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+async def _run_on_password_pool(func: Callable[..., T], *args: Any) -> T:
+    """
+    Runs `func` on the password pool, without blocking the event loop.
+    Raises PasswordPoolBusy if PASSWORD_HASH_MAX_PENDING calls are already pending.
+    """
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordPoolBusy()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+    finally:
+        _password_slots.release()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password on the password pool. Returns whether it matched and,
+    if the stored hash is deprecated, a new hash to store in its place.
+    Raises PasswordPoolBusy if the pool is saturated.
+    """
+    return await _run_on_password_pool(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    """Hashes a password on the password pool. Raises PasswordPoolBusy if the pool is saturated."""
+    return await _run_on_password_pool(pwd_context.hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -25,4 +82,4 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         "jti": str(uuid.uuid4()) # <-- Add a unique ID to the token
     })
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
@@ -0,0 +1,584 @@
+from neo4j import AsyncManagedTransaction, AsyncSession, unit_of_work
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+
+from app.core.graph_serializer import GraphSerializer
+
+# All reads run in managed read transactions, which the driver routes to
+# readers and retries on transient errors. Transaction functions start from a
+# clean slate (a new serializer, ...) so that a retry does not see the partial
+# results of a failed attempt.
+
+async def _fetch_all(tx: AsyncManagedTransaction, query: str, params: Dict[str, Any]) -> List:
+    result = await tx.run(query, params)
+    return [record async for record in result]
+
+async def read_records(db: AsyncSession, query: str, **params: Any) -> List:
+    """Runs a read query in a managed transaction and returns all its records."""
+    return await db.execute_read(_fetch_all, query, params)
+
+
+async def _get_listing_sets_subgraph(
+    tx: AsyncManagedTransaction,
+    username: str,
+    listing_set_ids: List[str],
+    max_nodes: int,
+    max_edges: int,
+) -> Tuple[GraphSerializer, bool]:
+    # The OWNS check is the core of the security model: only communications
+    # that are PART_OF sets the current user OWNS are returned.
+    # Each Communication comes back as one row holding its (at most four)
+    # one-hop paths, so the result grows linearly with the number of events.
+    query = """
+    MATCH (:User {username: $username})-[:OWNS]->(ls:ListingSet)
+    WHERE ls.id IN $listing_set_ids
+    MATCH (c:Communication)-[:PART_OF]->(ls)
+    WITH DISTINCT c LIMIT $max_communications
+    RETURN [p = (c)<-[:INITIATED]-(:Subscriber) | p]
+         + [p = (c)-[:IS_DIRECTED_TO|USED_DEVICE|ROUTED_THROUGH]->() | p] AS paths
+    """
+    serializer = GraphSerializer()
+    # Every Communication adds at least one edge, so there is no need to fetch
+    # more of them than the edge budget.
+    result = await tx.run(
+        query,
+        username=username,
+        listing_set_ids=listing_set_ids,
+        max_communications=max_edges + 1,
+    )
+    truncated = False
+    async for record in result:
+        node_count, edge_count = serializer.node_count, serializer.edge_count
+        serializer.add_paths(record["paths"])
+        if serializer.node_count > max_nodes or serializer.edge_count > max_edges:
+            # Leave out the whole Communication that went over a cap, so that
+            # no edge is returned without its endpoints.
+            serializer.truncate(node_count, edge_count)
+            truncated = True
+            break
+    # Tell the server to drop whatever we did not read.
+    await result.consume()
+    return serializer, truncated
+
+async def get_listing_sets_subgraph(
+    db: AsyncSession,
+    username: str,
+    listing_set_ids: List[str],
+    max_nodes: int,
+    max_edges: int,
+) -> Tuple[GraphSerializer, bool]:
+    """
+    Retrieves the communication-centred subgraph of the user's ListingSets:
+    every Communication with its caller, callee, device and tower, each node
+    and relationship exactly once.
+    Returns the collected graph and whether it was truncated at `max_nodes`
+    or `max_edges`.
+    """
+    return await db.execute_read(_get_listing_sets_subgraph, username, listing_set_ids, max_nodes, max_edges)
+
+
+async def get_contact_pairs(
+    db: AsyncSession,
+    username: str,
+    listing_set_ids: List[str],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+) -> Dict[str, list]:
+    """
+    Aggregates the communications of the user's ListingSets per unordered pair
+    of subscribers, optionally restricted to [start, end) and to one event
+    type ("CALL" or "SMS").
+    Returns the result as columns (one list per field), ready for NumPy.
+    """
+    query = """
+    MATCH (:User {username: $username})-[:OWNS]->(ls:ListingSet)
+    WHERE ls.id IN $listing_set_ids
+    MATCH (c:Communication)-[:PART_OF]->(ls)
+    WHERE ($start IS NULL OR c.timestamp >= $start)
+      AND ($end IS NULL OR c.timestamp < $end)
+      AND ($event_type IS NULL OR c.type = $event_type)
+    // A communication can be PART_OF several of the sets: count it once
+    WITH DISTINCT c
+    MATCH (a:Subscriber)-[:INITIATED]->(c)-[:IS_DIRECTED_TO]->(b:Subscriber)
+    WITH CASE WHEN a.phoneNumber <= b.phoneNumber THEN a.phoneNumber ELSE b.phoneNumber END AS source,
+         CASE WHEN a.phoneNumber <= b.phoneNumber THEN b.phoneNumber ELSE a.phoneNumber END AS target,
+         c
+    RETURN source, target,
+           count(CASE WHEN c.type = 'CALL' THEN 1 END) AS calls,
+           count(CASE WHEN c.type = 'SMS' THEN 1 END) AS sms,
+           sum(coalesce(c.durationSeconds, toIntegerOrNull(c.duration), 0)) AS total_duration,
+           count(DISTINCT date(c.timestamp)) AS unique_days,
+           duration.inDays(date(min(c.timestamp)), date(max(c.timestamp))).days AS time_spread
+    """
+    records = await read_records(
+        db,
+        query,
+        username=username,
+        listing_set_ids=listing_set_ids,
+        start=start,
+        end=end,
+        event_type=event_type,
+    )
+    keys = ["source", "target", "calls", "sms", "total_duration", "unique_days", "time_spread"]
+    columns = {key: [] for key in keys}
+    for record in records:
+        for key in keys:
+            columns[key].append(record[key])
+    return columns
+
+
+async def find_shortest_paths(
+    db: AsyncSession,
+    start_phone: str,
+    end_phone: str,
+    relationship_types: List[str],
+    max_hops: int,
+    k: int,
+    timeout: float,
+) -> List:
+    """
+    Finds shortest paths of at most `max_hops` hops between two subscribers,
+    following only `relationship_types`, in either direction.
+    Returns one path if `k` is 1, otherwise up to `k` of the equally short ones.
+    The query is aborted by the server after `timeout` seconds.
+    """
+    # Relationship types and hop limits cannot be query parameters. Callers
+    # must only pass values checked against a whitelist.
+    pattern = f"[:{'|'.join(relationship_types)}*..{int(max_hops)}]"
+    if k == 1:
+        text = f"""
+        MATCH (a:Subscriber {{phoneNumber: $start_phone}}), (b:Subscriber {{phoneNumber: $end_phone}})
+        MATCH p = shortestPath((a)-{pattern}-(b))
+        RETURN p
+        """
+    else:
+        text = f"""
+        MATCH (a:Subscriber {{phoneNumber: $start_phone}}), (b:Subscriber {{phoneNumber: $end_phone}})
+        MATCH p = allShortestPaths((a)-{pattern}-(b))
+        RETURN p LIMIT $k
+        """
+    # The timeout applies to the transaction; it is a client error, so not retried.
+    fetch = unit_of_work(timeout=timeout)(_fetch_all)
+    return await db.execute_read(fetch, text, {"start_phone": start_phone, "end_phone": end_phone, "k": k})
+
+
+async def get_listing_set_nodes(db: AsyncSession, username: str) -> Dict[str, list]:
+    """
+    The subscribers, devices and towers of the communications in the user's
+    ListingSets, as columns: their label and key (phoneNumber, imei or name).
+    """
+    query = """
+    MATCH (:User {username: $username})-[:OWNS]->(:ListingSet)<-[:PART_OF]-(c:Communication)
+    MATCH (c)-[:INITIATED|IS_DIRECTED_TO|USED_DEVICE|ROUTED_THROUGH]-(n)
+    RETURN DISTINCT labels(n)[0] AS label, coalesce(n.phoneNumber, n.imei, n.name) AS key
+    """
+    records = await read_records(db, query, username=username)
+    columns = {"label": [], "key": []}
+    for record in records:
+        columns["label"].append(record["label"])
+        columns["key"].append(record["key"])
+    return columns
+
+
+async def get_contact_path(db: AsyncSession, phone_numbers: List[str]) -> List:
+    """
+    Returns the CONTACTED edges (in either direction) between each consecutive
+    pair of `phone_numbers`, as one-hop path records.
+    """
+    query = """
+    UNWIND range(0, size($phone_numbers) - 2) AS i
+    MATCH p = (:Subscriber {phoneNumber: $phone_numbers[i]})-[:CONTACTED]-(:Subscriber {phoneNumber: $phone_numbers[i + 1]})
+    RETURN p
+    """
+    return await read_records(db, query, phone_numbers=phone_numbers)
+
+
+# Neighbourhoods only cover the communication graph of the caller's ListingSets.
+# Only communications are PART_OF a ListingSet, and every relationship but
+# CONTACTED has one at an end; CONTACTED edges list the sets they were built from.
+IN_LISTING_SETS = """(
+    EXISTS { (n)-[:PART_OF]->(ls:ListingSet) WHERE ls.id IN $listing_set_ids }
+    OR EXISTS { (m)-[:PART_OF]->(ls:ListingSet) WHERE ls.id IN $listing_set_ids }
+    OR (type(r) = 'CONTACTED' AND any(id IN r.listingSetIds WHERE id IN $listing_set_ids))
+)"""
+
+OWNED_LISTING_SET_IDS_QUERY = """
+MATCH (:User {username: $username})-[:OWNS]->(ls:ListingSet)
+WHERE $listing_set_ids IS NULL OR ls.id IN $listing_set_ids
+RETURN collect(ls.id) AS ids
+"""
+
+# The start node must be a node of the communication graph that appears in
+# the caller's ListingSets: never a User or a ListingSet, whatever id is passed.
+START_IN_LISTING_SETS = """
+WHERE (n:Subscriber OR n:Device OR n:CellTower OR n:Communication)
+  AND (EXISTS { (n)-[:PART_OF]->(ls:ListingSet) WHERE ls.id IN $listing_set_ids }
+       OR EXISTS { (n)-[:INITIATED|IS_DIRECTED_TO|USED_DEVICE|ROUTED_THROUGH]-(:Communication)-[:PART_OF]->(ls:ListingSet)
+                   WHERE ls.id IN $listing_set_ids })
+RETURN n
+"""
+START_BY_ID_QUERY = "MATCH (n) WHERE elementId(n) = $node_id WITH n" + START_IN_LISTING_SETS
+START_BY_PHONE_QUERY = "MATCH (n:Subscriber {phoneNumber: $phone_number}) WITH n" + START_IN_LISTING_SETS
+
+async def _get_neighborhood(
+    tx: AsyncManagedTransaction,
+    query: str,
+    username: str,
+    listing_set_ids: Optional[List[str]],
+    phone_number: Optional[str],
+    node_id: Optional[str],
+    depth: int,
+    fan_out: int,
+    max_nodes: int,
+    known_node_ids: List[str],
+    known_edge_ids: List[str],
+) -> Optional[Tuple[GraphSerializer, Dict[str, int], bool]]:
+    result = await tx.run(OWNED_LISTING_SET_IDS_QUERY, username=username, listing_set_ids=listing_set_ids)
+    listing_set_ids = (await result.single())["ids"]
+    if node_id is not None:
+        result = await tx.run(START_BY_ID_QUERY, node_id=node_id, listing_set_ids=listing_set_ids)
+    else:
+        result = await tx.run(START_BY_PHONE_QUERY, phone_number=phone_number, listing_set_ids=listing_set_ids)
+    start = await result.single()
+    if start is None:
+        return None
+
+    serializer = GraphSerializer(known_node_ids, known_edge_ids)
+    serializer.add_node(start["n"])
+    capped: Dict[str, int] = {}
+    start_id = start["n"].element_id
+    visited = {start_id}
+    frontier = [start_id]
+    for _ in range(depth):
+        result = await tx.run(query, frontier=frontier, fan_out=fan_out, listing_set_ids=listing_set_ids)
+        next_frontier = []
+        async for record in result:
+            if serializer.node_count >= max_nodes:
+                await result.consume()
+                return serializer, capped, True
+            if record["degree"] > fan_out:
+                capped[record["node_id"]] = record["degree"]
+            serializer.add_relationship(record["r"])
+            neighbor_id = record["m"].element_id
+            if neighbor_id not in visited:
+                visited.add(neighbor_id)
+                next_frontier.append(neighbor_id)
+        if not next_frontier:
+            break
+        frontier = next_frontier
+    return serializer, capped, False
+
+async def get_neighborhood(
+    db: AsyncSession,
+    username: str,
+    listing_set_ids: Optional[List[str]],
+    phone_number: Optional[str],
+    node_id: Optional[str],
+    relationship_types: List[str],
+    depth: int,
+    fan_out: int,
+    rank: bool,
+    max_nodes: int,
+    known_node_ids: List[str] = (),
+    known_edge_ids: List[str] = (),
+) -> Optional[Tuple[GraphSerializer, Dict[str, int], bool]]:
+    """
+    Expands the neighbourhood of a node (by element id) or of a subscriber
+    (by phone number) level by level, up to `depth` hops, following only
+    `relationship_types` in either direction and only relationships of the
+    user's ListingSets (`listing_set_ids` of them, or all if None), which the
+    start node must appear in. Each expanded node contributes
+    at most `fan_out` neighbours: the strongest (CONTACTED weight, then most
+    recent Communication) if `rank`, otherwise the first ones the store
+    returns, without reading the rest.
+    Elements in `known_node_ids` / `known_edge_ids` are traversed but left out
+    of the returned graph.
+    Returns None if there is no such start node; otherwise the graph, the
+    degree of every expanded node that had more than `fan_out` neighbours, and
+    whether the expansion stopped at `max_nodes` new nodes.
+    """
+    # Relationship types cannot be query parameters. Callers must only pass
+    # values checked against a whitelist.
+    types = "|".join(relationship_types)
+    order = "ORDER BY coalesce(r.calls + r.sms, 0) DESC, m.timestamp IS NULL, m.timestamp DESC" if rank else ""
+    query = f"""
+    UNWIND $frontier AS node_id
+    MATCH (n) WHERE elementId(n) = node_id
+    WITH n, COUNT {{ MATCH (n)-[r:{types}]-(m) WHERE {IN_LISTING_SETS} }} AS degree
+    CALL {{
+        WITH n
+        MATCH (n)-[r:{types}]-(m)
+        WHERE {IN_LISTING_SETS}
+        WITH r, m {order}
+        LIMIT $fan_out
+        RETURN r, m
+    }}
+    RETURN elementId(n) AS node_id, degree, r, m
+    """
+    return await db.execute_read(
+        _get_neighborhood,
+        query,
+        username,
+        listing_set_ids,
+        phone_number,
+        node_id,
+        depth,
+        fan_out,
+        max_nodes,
+        known_node_ids,
+        known_edge_ids,
+    )
+
+
+async def get_timeline_counts(
+    db: AsyncSession,
+    username: str,
+    listing_set_ids: List[str],
+    start: datetime,
+    end: datetime,
+    bucket_seconds: int,
+    phone_numbers: Optional[List[str]] = None,
+) -> Dict[str, list]:
+    """
+    Counts the communications of the user's ListingSets in [start, end) per
+    unordered pair of subscribers, type and time bucket (number of
+    `bucket_seconds` intervals since the epoch), optionally only those
+    involving `phone_numbers`.
+    Returns the result as columns (one list per field), ready for NumPy.
+    """
+    # The timestamp range is served by the communication_timestamp index;
+    # aggregating on the server keeps the transfer to one row per pair and bucket.
+    query = """
+    MATCH (:User {username: $username})-[:OWNS]->(ls:ListingSet)
+    WHERE ls.id IN $listing_set_ids
+    MATCH (c:Communication)-[:PART_OF]->(ls)
+    WHERE c.timestamp >= $start AND c.timestamp < $end
+    WITH DISTINCT c
+    MATCH (a:Subscriber)-[:INITIATED]->(c)-[:IS_DIRECTED_TO]->(b:Subscriber)
+    WHERE $phone_numbers IS NULL OR a.phoneNumber IN $phone_numbers OR b.phoneNumber IN $phone_numbers
+    WITH CASE WHEN a.phoneNumber <= b.phoneNumber THEN a.phoneNumber ELSE b.phoneNumber END AS source,
+         CASE WHEN a.phoneNumber <= b.phoneNumber THEN b.phoneNumber ELSE a.phoneNumber END AS target,
+         c.type AS type,
+         duration.inSeconds(localdatetime({year: 1970}), c.timestamp).seconds / $bucket_seconds AS bucket
+    RETURN source, target, type, bucket, count(*) AS count
+    """
+    records = await read_records(
+        db,
+        query,
+        username=username,
+        listing_set_ids=listing_set_ids,
+        start=start,
+        end=end,
+        bucket_seconds=bucket_seconds,
+        phone_numbers=phone_numbers or None,
+    )
+    keys = ["source", "target", "type", "bucket", "count"]
+    columns = {key: [] for key in keys}
+    for record in records:
+        for key in keys:
+            columns[key].append(record[key])
+    return columns
+
+
+# Towers without coordinates have no location and are never matched by these
+# searches; both predicates are served by the cell_tower_location point index.
+# Towers are found through the CellTower point index, then counted over the
+# communications of the user's ListingSets only; towers none of them used are
+# left out, so a search does not reveal other users' data.
+TOWERS_IN_BBOX_QUERY = """
+MATCH (:User {username: $username})-[:OWNS]->(ls:ListingSet)
+WHERE ls.id IN $listing_set_ids
+WITH collect(ls) AS listing_sets
+MATCH (t:CellTower)
+WHERE point.withinBBox(t.location, point({longitude: $min_lon, latitude: $min_lat}),
+                                   point({longitude: $max_lon, latitude: $max_lat}))
+WITH t, COUNT { MATCH (t)<-[:ROUTED_THROUGH]-(c:Communication) WHERE EXISTS { (c)-[:PART_OF]->(ls) WHERE ls IN listing_sets } } AS communications
+WHERE communications > 0
+RETURN t.name AS name, t.location.longitude AS longitude, t.location.latitude AS latitude, communications
+ORDER BY communications DESC
+LIMIT $limit
+"""
+
+TOWERS_NEAR_QUERY = """
+MATCH (:User {username: $username})-[:OWNS]->(ls:ListingSet)
+WHERE ls.id IN $listing_set_ids
+WITH collect(ls) AS listing_sets
+MATCH (t:CellTower)
+WHERE point.distance(t.location, point({longitude: $longitude, latitude: $latitude})) <= $radius
+WITH t, point.distance(t.location, point({longitude: $longitude, latitude: $latitude})) AS distance,
+     COUNT { MATCH (t)<-[:ROUTED_THROUGH]-(c:Communication) WHERE EXISTS { (c)-[:PART_OF]->(ls) WHERE ls IN listing_sets } } AS communications
+WHERE communications > 0
+RETURN t.name AS name, t.location.longitude AS longitude, t.location.latitude AS latitude,
+       communications, distance
+ORDER BY distance
+LIMIT $limit
+"""
+
+async def find_towers_in_bbox(
+    db: AsyncSession,
+    username: str,
+    listing_set_ids: List[str],
+    min_lon: float,
+    min_lat: float,
+    max_lon: float,
+    max_lat: float,
+    limit: int,
+) -> List[Dict[str, Any]]:
+    """
+    The busiest cell towers (at most `limit`) of the user's ListingSets inside
+    a bounding box. A box with min_lon > max_lon crosses the antimeridian.
+    """
+    records = await read_records(
+        db,
+        TOWERS_IN_BBOX_QUERY,
+        username=username,
+        listing_set_ids=listing_set_ids,
+        min_lon=min_lon,
+        min_lat=min_lat,
+        max_lon=max_lon,
+        max_lat=max_lat,
+        limit=limit,
+    )
+    return [record.data() for record in records]
+
+
+async def find_towers_near(
+    db: AsyncSession,
+    username: str,
+    listing_set_ids: List[str],
+    longitude: float,
+    latitude: float,
+    radius: float,
+    limit: int,
+) -> List[Dict[str, Any]]:
+    """
+    The cell towers (at most `limit`) of the user's ListingSets within
+    `radius` metres of a point, nearest first.
+    """
+    records = await read_records(
+        db,
+        TOWERS_NEAR_QUERY,
+        username=username,
+        listing_set_ids=listing_set_ids,
+        longitude=longitude,
+        latitude=latitude,
+        radius=radius,
+        limit=limit,
+    )
+    return [record.data() for record in records]
+
+
+async def get_tower_visits(
+    db: AsyncSession,
+    username: str,
+    listing_set_ids: List[str],
+    phone_number: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Dict[str, list]:
+    """
+    The tower of every communication initiated by a subscriber in the user's
+    ListingSets, optionally restricted to [start, end), in time order.
+    Returns the result as columns (one list per field), ready for NumPy.
+    """
+    # Starts from the subscriber (unique phoneNumber) rather than the
+    # ListingSets, so only this subscriber's events are read.
+    query = """
+    MATCH (:User {username: $username})-[:OWNS]->(ls:ListingSet)
+    WHERE ls.id IN $listing_set_ids
+    WITH collect(ls) AS listing_sets
+    MATCH (:Subscriber {phoneNumber: $phone_number})-[:INITIATED]->(c:Communication)-[:ROUTED_THROUGH]->(t:CellTower)
+    WHERE ($start IS NULL OR c.timestamp >= $start)
+      AND ($end IS NULL OR c.timestamp < $end)
+      AND EXISTS { MATCH (c)-[:PART_OF]->(ls) WHERE ls IN listing_sets }
+    RETURN c.timestamp AS timestamp, t.name AS tower,
+           t.location.longitude AS longitude, t.location.latitude AS latitude
+    ORDER BY timestamp
+    """
+    records = await read_records(
+        db,
+        query,
+        username=username,
+        listing_set_ids=listing_set_ids,
+        phone_number=phone_number,
+        start=start,
+        end=end,
+    )
+    columns = {"timestamp": [], "tower": [], "longitude": [], "latitude": []}
+    for record in records:
+        columns["timestamp"].append(record["timestamp"].to_native())
+        columns["tower"].append(record["tower"])
+        columns["longitude"].append(record["longitude"])
+        columns["latitude"].append(record["latitude"])
+    return columns
+
+
+async def get_tower_events(
+    db: AsyncSession,
+    username: str,
+    listing_set_ids: List[str],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Dict[str, list]:
+    """
+    The tower, caller and time (seconds since the epoch) of every
+    communication of the user's ListingSets, optionally restricted to
+    [start, end), for co-location detection.
+    Returns the result as columns (one list per field), ready for NumPy.
+    """
+    # Unordered: the events are sorted by tower and time in NumPy, which is
+    # much cheaper than sorting tens of millions of rows on the server.
+    query = """
+    MATCH (:User {username: $username})-[:OWNS]->(ls:ListingSet)
+    WHERE ls.id IN $listing_set_ids
+    MATCH (c:Communication)-[:PART_OF]->(ls)
+    WHERE ($start IS NULL OR c.timestamp >= $start)
+      AND ($end IS NULL OR c.timestamp < $end)
+    WITH DISTINCT c
+    MATCH (s:Subscriber)-[:INITIATED]->(c)-[:ROUTED_THROUGH]->(t:CellTower)
+    RETURN t.name AS tower, s.phoneNumber AS phone,
+           duration.inSeconds(localdatetime({year: 1970}), c.timestamp).seconds AS time
+    """
+    records = await read_records(
+        db, query, username=username, listing_set_ids=listing_set_ids, start=start, end=end
+    )
+    keys = ["tower", "phone", "time"]
+    columns = {key: [] for key in keys}
+    for record in records:
+        for key in keys:
+            columns[key].append(record[key])
+    return columns
+
+
+async def get_device_usage(
+    db: AsyncSession,
+    username: str,
+    listing_set_ids: List[str],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Dict[str, list]:
+    """
+    Counts the communications of the user's ListingSets per device (IMEI) and
+    calling subscriber, optionally restricted to [start, end).
+    Returns the result as columns (one list per field), ready for NumPy.
+    """
+    query = """
+    MATCH (:User {username: $username})-[:OWNS]->(ls:ListingSet)
+    WHERE ls.id IN $listing_set_ids
+    MATCH (c:Communication)-[:PART_OF]->(ls)
+    WHERE ($start IS NULL OR c.timestamp >= $start)
+      AND ($end IS NULL OR c.timestamp < $end)
+    WITH DISTINCT c
+    MATCH (s:Subscriber)-[:INITIATED]->(c)-[:USED_DEVICE]->(d:Device)
+    RETURN d.imei AS imei, s.phoneNumber AS phone, count(c) AS events
+    """
+    records = await read_records(
+        db, query, username=username, listing_set_ids=listing_set_ids, start=start, end=end
+    )
+    keys = ["imei", "phone", "events"]
+    columns = {key: [] for key in keys}
+    for record in records:
+        for key in keys:
+            columns[key].append(record[key])
+    return columns
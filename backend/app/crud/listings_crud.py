@@ -1,18 +1,27 @@
-from neo4j import Session
-from typing import List
+from neo4j import AsyncManagedTransaction, AsyncSession, ManagedTransaction, Session
+from typing import Dict, List, Optional
 import uuid
 from datetime import datetime, timezone
 
 from app.models.listings import ListingSet, ListingSetCreate
 
-def create_listing_set(db: Session, listing_set: ListingSetCreate, owner_username: str) -> ListingSet:
-    """
-    Creates a new ListingSet node and links it to the owner.
-    """
-    new_id = str(uuid.uuid4())
-    # Use a native Python datetime object from the start
-    created_at = datetime.now(timezone.utc)
+def _to_listing_set(node) -> ListingSet:
+    # Convert the Neo4j node (which is like a dict) into a standard Python dict
+    data = dict(node)
+    # Manually convert the special Neo4j DateTime to a native Python datetime
+    data['createdAt'] = data['createdAt'].to_native()
+    # Now, validate the clean Python dictionary
+    return ListingSet.model_validate(data)
 
+
+async def _create_listing_set(
+    tx: AsyncManagedTransaction,
+    listing_set_id: str,
+    listing_set: ListingSetCreate,
+    owner_username: str,
+    created_at: datetime,
+    file_hash: Optional[str],
+) -> ListingSet:
     query = """
     MATCH (u:User {username: $owner_username})
     CREATE (ls:ListingSet {
@@ -20,45 +29,111 @@ def create_listing_set(db: Session, listing_set: ListingSetCreate, owner_usernam
         name: $name,
         description: $description,
         owner_username: $owner_username,
-        createdAt: $created_at
+        createdAt: $created_at,
+        status: 'pending',
+        progress: 0.0,
+        fileHash: $file_hash
     })
     CREATE (u)-[:OWNS]->(ls)
     RETURN ls
     """
-    result = db.run(
+    result = await tx.run(
         query,
         owner_username=owner_username,
-        id=new_id,
+        id=listing_set_id,
         name=listing_set.name,
         description=listing_set.description,
         created_at=created_at,
+        file_hash=file_hash,
     )
-    record = result.single()["ls"]
+    return _to_listing_set((await result.single())["ls"])
 
-    # --- THIS IS THE FIX ---
-    # Convert the Neo4j record (which is like a dict) into a standard Python dict
-    data = dict(record)
-    # Manually convert the special Neo4j DateTime to a native Python datetime
-    data['createdAt'] = data['createdAt'].to_native()
-    # Now, validate the clean Python dictionary
-    return ListingSet.model_validate(data)
-    # -----------------------
+async def create_listing_set(
+    db: AsyncSession, listing_set: ListingSetCreate, owner_username: str, file_hash: Optional[str] = None
+) -> ListingSet:
+    """
+    Creates a new ListingSet node and links it to the owner.
+    `file_hash` identifies the file imported into it, to detect re-uploads.
+    """
+    # Generated outside the transaction function, so a retry creates the same set
+    new_id = str(uuid.uuid4())
+    # Use a native Python datetime object from the start
+    created_at = datetime.now(timezone.utc)
+    return await db.execute_write(_create_listing_set, new_id, listing_set, owner_username, created_at, file_hash)
 
 
-def get_user_listing_sets(db: Session, owner_username: str) -> List[ListingSet]:
+async def _get_user_listing_sets(tx: AsyncManagedTransaction, owner_username: str) -> List[ListingSet]:
+    query = """
+    MATCH (:User {username: $owner_username})-[:OWNS]->(ls:ListingSet)
+    RETURN ls ORDER BY ls.createdAt DESC
+    """
+    result = await tx.run(query, owner_username=owner_username)
+    return [_to_listing_set(record["ls"]) async for record in result]
+
+async def get_user_listing_sets(db: AsyncSession, owner_username: str) -> List[ListingSet]:
     """
     Retrieves all ListingSets owned by a specific user.
     """
+    return await db.execute_read(_get_user_listing_sets, owner_username)
+
+
+async def _get_listing_set_by_file_hash(
+    tx: AsyncManagedTransaction, owner_username: str, file_hash: str
+) -> Optional[ListingSet]:
+    query = """
+    MATCH (:User {username: $owner_username})-[:OWNS]->(ls:ListingSet {fileHash: $file_hash})
+    RETURN ls ORDER BY ls.createdAt DESC LIMIT 1
+    """
+    record = await (await tx.run(query, owner_username=owner_username, file_hash=file_hash)).single()
+    return _to_listing_set(record["ls"]) if record else None
+
+async def get_listing_set_by_file_hash(db: AsyncSession, owner_username: str, file_hash: str) -> Optional[ListingSet]:
+    """
+    The most recent of the user's ListingSets imported from a file with this
+    hash, if any.
+    """
+    return await db.execute_read(_get_listing_set_by_file_hash, owner_username, file_hash)
+
+
+async def _get_data_versions(tx: AsyncManagedTransaction, owner_username: str, listing_set_ids: List[str]) -> Dict[str, int]:
     query = """
     MATCH (:User {username: $owner_username})-[:OWNS]->(ls:ListingSet)
-    RETURN ls ORDER BY ls.createdAt DESC
+    WHERE ls.id IN $listing_set_ids
+    RETURN ls.id AS id, coalesce(ls.dataVersion, 0) AS version
+    """
+    result = await tx.run(query, owner_username=owner_username, listing_set_ids=listing_set_ids)
+    return {record["id"]: record["version"] async for record in result}
+
+async def get_data_versions(db: AsyncSession, owner_username: str, listing_set_ids: List[str]) -> Dict[str, int]:
+    """
+    The data version of each of the user's ListingSets among `listing_set_ids`.
+    A version changes whenever data is ingested into the set.
+    """
+    return await db.execute_read(_get_data_versions, owner_username, listing_set_ids)
+
+
+async def _get_global_data_version(tx: AsyncManagedTransaction) -> int:
+    # ListingSets are never deleted, so this only grows: on creation and on ingestion.
+    query = "MATCH (ls:ListingSet) RETURN count(ls) + sum(coalesce(ls.dataVersion, 0)) AS version"
+    return (await (await tx.run(query)).single())["version"]
+
+async def get_global_data_version(db: AsyncSession) -> int:
+    """A version of the whole graph, which changes whenever any ListingSet is created or ingested."""
+    return await db.execute_read(_get_global_data_version)
+
+
+def _update_listing_set_status(tx: ManagedTransaction, listing_set_id: str, status: str, progress: float):
+    query = """
+    MATCH (ls:ListingSet {id: $listing_set_id})
+    SET ls.status = $status, ls.progress = $progress,
+        ls.dataVersion = coalesce(ls.dataVersion, 0) + 1
+    """
+    tx.run(query, listing_set_id=listing_set_id, status=status, progress=progress).consume()
+
+def update_listing_set_status(db: Session, listing_set_id: str, status: str, progress: float) -> None:
+    """
+    Records the ingestion status and progress (in percent) of a ListingSet.
+    Each call also bumps its data version, as data was written since the last one.
+    Called by the ingestion workers, which use blocking sessions.
     """
-    result = db.run(query, owner_username=owner_username)
-    
-    # We need to apply the same fix here for listing existing sets
-    listing_sets = []
-    for record in result:
-        data = dict(record["ls"])
-        data['createdAt'] = data['createdAt'].to_native()
-        listing_sets.append(ListingSet.model_validate(data))
-    return listing_sets
\ No newline at end of file
+    db.execute_write(_update_listing_set_status, listing_set_id, status, progress)
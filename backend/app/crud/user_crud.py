@@ -1,28 +1,37 @@
-from neo4j import Session
+from neo4j import AsyncManagedTransaction, AsyncSession
 from typing import Optional, List
 from app.models.user import UserInDB, UserCreate
-from app.core.security import get_password_hash
+from app.core.security import hash_password_async
 from app.models.user import UserUpdate 
 
-def get_user(db: Session, username: str) -> Optional[UserInDB]:
-    """
-    Retrieves a single user from the database by their username.
-    """
+# Each function runs its query in a managed transaction (`execute_read` or
+# `execute_write`), which the driver routes to a reader or the leader and
+# retries on transient errors; the `_`-prefixed transaction functions must
+# therefore be safe to run more than once.
+
+def _to_user(node) -> UserInDB:
+    user_data = dict(node)
+    # The password in the DB is already hashed, so we name it correctly for the model
+    user_data["hashed_password"] = user_data.pop("password")
+    return UserInDB(**user_data)
+
+
+async def _get_user(tx: AsyncManagedTransaction, username: str) -> Optional[UserInDB]:
     query = "MATCH (u:User {username: $username}) RETURN u"
-    result = db.run(query, username=username)
-    record = result.single()
+    result = await tx.run(query, username=username)
+    record = await result.single()
     if record and record["u"]:
-        user_data = dict(record["u"])
-        # The password in the DB is already hashed, so we name it correctly for the model
-        user_data["hashed_password"] = user_data.pop("password")
-        return UserInDB(**user_data)
+        return _to_user(record["u"])
     return None
 
-def create_user(db: Session, user: UserCreate) -> UserInDB:
+async def get_user(db: AsyncSession, username: str) -> Optional[UserInDB]:
     """
-    Creates a new User node in the database.
+    Retrieves a single user from the database by their username.
     """
-    hashed_password = get_password_hash(user.password)
+    return await db.execute_read(_get_user, username)
+
+
+async def _create_user(tx: AsyncManagedTransaction, user: UserCreate, hashed_password: str) -> UserInDB:
     query = """
     CREATE (u:User {
         username: $username,
@@ -33,7 +42,7 @@ def create_user(db: Session, user: UserCreate) -> UserInDB:
     })
     RETURN u
     """
-    result = db.run(
+    result = await tx.run(
         query,
         username=user.username,
         full_name=user.full_name,
@@ -41,66 +50,78 @@ def create_user(db: Session, user: UserCreate) -> UserInDB:
         role=user.role,
         is_active=user.is_active,
     )
-    record = result.single()["u"]
-    
-    user_data = dict(record)
-    user_data["hashed_password"] = user_data.pop("password")
-    return UserInDB(**user_data)
+    return _to_user((await result.single())["u"])
 
-def get_all_users(db: Session) -> List[UserInDB]:
+async def create_user(db: AsyncSession, user: UserCreate) -> UserInDB:
     """
-    Retrieves all users from the database.
+    Creates a new User node in the database.
     """
-    query = "MATCH (u:User) RETURN u"
-    result = db.run(query)
-    users = []
-    for record in result:
-        user_data = dict(record["u"])
-        user_data["hashed_password"] = user_data.pop("password")
-        users.append(UserInDB(**user_data))
-    return users
+    # Hash outside the transaction, so a retry doesn't hash again.
+    hashed_password = await hash_password_async(user.password)
+    return await db.execute_write(_create_user, user, hashed_password)
+
 
+async def _get_all_users(tx: AsyncManagedTransaction) -> List[UserInDB]:
+    result = await tx.run("MATCH (u:User) RETURN u")
+    return [_to_user(record["u"]) async for record in result]
 
-def update_user(db: Session, username: str, user_update: UserUpdate) -> Optional[UserInDB]:
+async def get_all_users(db: AsyncSession) -> List[UserInDB]:
     """
-    Updates a user's data in the database.
+    Retrieves all users from the database.
     """
-    # .model_dump(exclude_unset=True) is crucial. It creates a dict with only the
-    # fields that were actually provided in the request, so we don't accidentally
-    # overwrite existing values with None.
-    update_data = user_update.model_dump(exclude_unset=True)
+    return await db.execute_read(_get_all_users)
 
-    if not update_data:
-        # If no data was provided, just fetch the user and return them
-        return get_user(db, username)
 
+async def _update_user(tx: AsyncManagedTransaction, username: str, update_data: dict) -> Optional[UserInDB]:
     # The SET clause dynamically updates the properties based on the provided data.
     query = """
     MATCH (u:User {username: $username})
     SET u += $update_data
     RETURN u
     """
-    result = db.run(query, username=username, update_data=update_data)
-    record = result.single()
+    result = await tx.run(query, username=username, update_data=update_data)
+    record = await result.single()
     if record and record["u"]:
-        user_data = dict(record["u"])
-        user_data["hashed_password"] = user_data.pop("password")
-        return UserInDB(**user_data)
+        return _to_user(record["u"])
     return None
 
+async def update_user(db: AsyncSession, username: str, user_update: UserUpdate) -> Optional[UserInDB]:
+    """
+    Updates a user's data in the database.
+    """
+    # .model_dump(exclude_unset=True) is crucial. It creates a dict with only the
+    # fields that were actually provided in the request, so we don't accidentally
+    # overwrite existing values with None.
+    update_data = user_update.model_dump(exclude_unset=True)
+
+    if not update_data:
+        # If no data was provided, just fetch the user and return them
+        return await get_user(db, username)
+
+    return await db.execute_write(_update_user, username, update_data)
 
-def delete_user(db: Session, username: str) -> bool:
+
+async def _delete_user(tx: AsyncManagedTransaction, username: str) -> bool:
+    # We use DETACH DELETE to also remove any relationships the user might have (like :OWNS).
+    query = "MATCH (u:User {username: $username}) DETACH DELETE u"
+    result = await tx.run(query, username=username)
+    summary = await result.consume()
+    return summary.counters.nodes_deleted > 0
+
+async def delete_user(db: AsyncSession, username: str) -> bool:
     """
     Deletes a user from the database.
     Returns True if a user was deleted, False otherwise.
     """
-    # We use DETACH DELETE to also remove any relationships the user might have (like :OWNS).
-    query = "MATCH (u:User {username: $username}) DETACH DELETE u"
-    result = db.run(query, username=username)
+    return await db.execute_write(_delete_user, username)
 
-    # --- THIS IS THE FIX ---
-    # Call .consume() to get the ResultSummary object
-    summary = result.consume()
-    # The summary object has the counters attribute
-    return summary.counters.nodes_deleted > 0
-    # -----------------------
\ No newline at end of file
+
+async def _update_password_hash(tx: AsyncManagedTransaction, username: str, hashed_password: str):
+    query = "MATCH (u:User {username: $username}) SET u.password = $hashed_password"
+    await (await tx.run(query, username=username, hashed_password=hashed_password)).consume()
+
+async def update_password_hash(db: AsyncSession, username: str, hashed_password: str):
+    """
+    Replaces a user's stored password hash (e.g. with one using the current work factor).
+    """
+    await db.execute_write(_update_password_hash, username, hashed_password)
@@ -1,40 +1,97 @@
-from neo4j import GraphDatabase, Session
-from app.core.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+from neo4j import READ_ACCESS, WRITE_ACCESS, AsyncGraphDatabase, AsyncSession, GraphDatabase, Session
+from app.core.config import (
+    NEO4J_URI,
+    NEO4J_USER,
+    NEO4J_PASSWORD,
+    NEO4J_MAX_CONNECTION_POOL_SIZE,
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+    NEO4J_MAX_CONNECTION_LIFETIME,
+)
 
 class GraphDB:
     """
     Manages the connection to the Neo4j database.
-    This class holds the driver instance and provides methods to get a session.
+    This class holds the driver instances and provides methods to get a session:
+    async sessions for the API's route handlers, blocking sessions for the
+    ingestion workers, startup code and scripts.
+    Read sessions send their auto-commit queries to cluster readers, and write
+    sessions to the leader. Queries should nonetheless go through
+    `execute_read` / `execute_write`, which route the same way and also retry
+    on transient errors (leader switches, deadlocks).
     """
     def __init__(self):
-        # The driver is the main entry point to the database.
-        # It is thread-safe and should be created once per application.
-        self.driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+        pool_config = dict(
+            auth=(NEO4J_USER, NEO4J_PASSWORD),
+            max_connection_pool_size=NEO4J_MAX_CONNECTION_POOL_SIZE,
+            connection_acquisition_timeout=NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+            max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+        )
+        # The drivers are the main entry points to the database.
+        # They are safe to share and should be created once per application.
+        self.driver = GraphDatabase.driver(NEO4J_URI, **pool_config)
+        # Each in-flight query of an async route holds a pooled connection, not a thread.
+        self.async_driver = AsyncGraphDatabase.driver(NEO4J_URI, **pool_config)
+        # Shared by all the async sessions, so a read that follows a write in
+        # another session (e.g. the next request) waits for a reader to have it.
+        self.bookmark_manager = AsyncGraphDatabase.bookmark_manager()
 
     def close(self):
-        """Closes the driver connection."""
+        """Closes the blocking driver's connections."""
         if self.driver:
             self.driver.close()
 
+    async def close_async(self):
+        """Closes the async driver's connections."""
+        if self.async_driver:
+            await self.async_driver.close()
+
     def get_session(self) -> Session:
-        """Returns a new Neo4j session."""
+        """Returns a new blocking Neo4j session."""
         return self.driver.session()
 
+    def get_read_session(self) -> Session:
+        return self.driver.session(default_access_mode=READ_ACCESS)
+
+    def get_write_session(self) -> Session:
+        return self.driver.session(default_access_mode=WRITE_ACCESS)
+
+    def get_async_session(self, access_mode: str = WRITE_ACCESS) -> AsyncSession:
+        """Returns a new async Neo4j session, causally chained to the other async sessions."""
+        return self.async_driver.session(default_access_mode=access_mode, bookmark_manager=self.bookmark_manager)
+
+    def get_async_read_session(self) -> AsyncSession:
+        return self.get_async_session(READ_ACCESS)
+
+    def get_async_write_session(self) -> AsyncSession:
+        return self.get_async_session(WRITE_ACCESS)
+
 # Create a single instance of the GraphDB class for the entire application.
 db = GraphDB()
 
-# This is a FastAPI dependency.
-# It will be called for each request that needs a database session.
-# It ensures that the session is properly closed after the request is handled.
-def get_db_session():
-    """
-    FastAPI dependency to get a database session.
-    Yields a session to the request and closes it afterwards.
-    """
+# These are FastAPI dependencies.
+# They are called for each request that needs a database session.
+# They ensure that the session is properly closed after the request is handled.
+async def _async_session(access_mode: str):
     session = None
     try:
-        session = db.get_session()
+        session = db.get_async_session(access_mode)
         yield session
     finally:
         if session:
-            session.close()
\ No newline at end of file
+            await session.close()
+
+async def get_read_db_session():
+    """
+    FastAPI dependency to get an async database session for a read-only route.
+    Yields a session to the request and closes it afterwards.
+    """
+    async for session in _async_session(READ_ACCESS):
+        yield session
+
+async def get_write_db_session():
+    """
+    FastAPI dependency to get an async database session for a route that writes.
+    Yields a session to the request and closes it afterwards.
+    """
+    async for session in _async_session(WRITE_ACCESS):
+        yield session
@@ -0,0 +1,166 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+from neo4j import Session
+
+# Versioned schema migrations, applied in order at startup.
+# Each migration is (version, description, statements). Statements must be
+# idempotent (IF NOT EXISTS) so a partially applied migration can be re-run.
+# Never edit a migration that has shipped: append a new one instead.
+SCHEMA_MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (
+        1,
+        "Uniqueness constraints on MERGE and lookup keys, Communication.timestamp index",
+        [
+            "CREATE CONSTRAINT subscriber_phone_number IF NOT EXISTS "
+            "FOR (s:Subscriber) REQUIRE s.phoneNumber IS UNIQUE",
+            "CREATE CONSTRAINT device_imei IF NOT EXISTS "
+            "FOR (d:Device) REQUIRE d.imei IS UNIQUE",
+            "CREATE CONSTRAINT cell_tower_name IF NOT EXISTS "
+            "FOR (t:CellTower) REQUIRE t.name IS UNIQUE",
+            "CREATE CONSTRAINT user_username IF NOT EXISTS "
+            "FOR (u:User) REQUIRE u.username IS UNIQUE",
+            "CREATE CONSTRAINT listing_set_id IF NOT EXISTS "
+            "FOR (ls:ListingSet) REQUIRE ls.id IS UNIQUE",
+            "CREATE RANGE INDEX communication_timestamp IF NOT EXISTS "
+            "FOR (c:Communication) ON (c.timestamp)",
+        ],
+    ),
+    (
+        2,
+        "CellTower.location point index, backfilled from the coordinate strings",
+        [
+            "CREATE POINT INDEX cell_tower_location IF NOT EXISTS "
+            "FOR (t:CellTower) ON (t.location)",
+            # Only plain numeric strings are backfilled here; towers with other
+            # formats get their point the next time ingestion touches them.
+            "MATCH (t:CellTower) WHERE t.location IS NULL "
+            "WITH t, toFloatOrNull(t.longitude) AS x, toFloatOrNull(t.latitude) AS y "
+            "WHERE x >= -180 AND x <= 180 AND y >= -90 AND y <= 90 "
+            "CALL { WITH t, x, y SET t.location = point({longitude: x, latitude: y}) } "
+            "IN TRANSACTIONS OF 10000 ROWS",
+        ],
+    ),
+    (
+        3,
+        "Communication.key natural-key index, backfilled for existing communications",
+        [
+            # Not a uniqueness constraint: data ingested before keys existed may
+            # hold duplicates, which would make creating the constraint fail.
+            "CREATE RANGE INDEX communication_key IF NOT EXISTS "
+            "FOR (c:Communication) ON (c.key)",
+            # Same format as scripts.ingest_data.natural_key
+            "MATCH (c:Communication) WHERE c.key IS NULL "
+            "CALL { WITH c "
+            "MATCH (a:Subscriber)-[:INITIATED]->(c)-[:IS_DIRECTED_TO]->(b:Subscriber) "
+            "MATCH (c)-[:USED_DEVICE]->(d:Device) "
+            "SET c.key = a.phoneNumber + '|' + b.phoneNumber + '|' + toString(c.timestamp) + '|' "
+            "+ coalesce(c.duration, '') + '|' + d.imei "
+            "} IN TRANSACTIONS OF 10000 ROWS",
+            "CREATE RANGE INDEX listing_set_file_hash IF NOT EXISTS "
+            "FOR (ls:ListingSet) ON (ls.fileHash)",
+        ],
+    ),
+    (
+        4,
+        "Communication.key for the communications migration 3 left without one",
+        [
+            # Migration 3 skipped communications without a device, whose key
+            # then stayed null; give every communication a key so that key
+            # order (used to page /graph/full) covers them all.
+            "MATCH (c:Communication) WHERE c.key IS NULL "
+            "CALL { WITH c "
+            "OPTIONAL MATCH (a:Subscriber)-[:INITIATED]->(c) "
+            "OPTIONAL MATCH (c)-[:IS_DIRECTED_TO]->(b:Subscriber) "
+            "OPTIONAL MATCH (c)-[:USED_DEVICE]->(d:Device) "
+            "WITH c, head(collect(a.phoneNumber)) AS caller, head(collect(b.phoneNumber)) AS callee, "
+            "head(collect(d.imei)) AS imei "
+            "SET c.key = coalesce(caller, '') + '|' + coalesce(callee, '') + '|' "
+            "+ coalesce(toString(c.timestamp), '') + '|' + coalesce(c.duration, '') + '|' + coalesce(imei, '') "
+            "} IN TRANSACTIONS OF 10000 ROWS",
+        ],
+    ),
+]
+
+# Every constraint and index the application relies on, by name.
+EXPECTED_CONSTRAINTS = [
+    "subscriber_phone_number",
+    "device_imei",
+    "cell_tower_name",
+    "user_username",
+    "listing_set_id",
+]
+EXPECTED_INDEXES = [
+    "communication_timestamp",
+    "cell_tower_location",
+    "communication_key",
+    "listing_set_file_hash",
+]
+
+
+def get_schema_version(session: Session) -> int:
+    """Returns the version of the last migration applied to the database (0 if none)."""
+    query = "MATCH (m:SchemaMigration) RETURN max(m.version) AS version"
+    record = session.run(query).single()
+    return record["version"] or 0
+
+
+def apply_migrations(session: Session) -> int:
+    """
+    Applies every migration newer than the database's schema version and
+    returns the resulting version. A migration is only recorded once all of
+    its statements have succeeded.
+    """
+    current_version = get_schema_version(session)
+    for version, description, statements in SCHEMA_MIGRATIONS:
+        if version <= current_version:
+            continue
+        print(f"Applying schema migration {version}: {description}")
+        for statement in statements:
+            # Schema statements cannot share a transaction with data writes,
+            # so each one runs in its own auto-commit transaction.
+            session.run(statement).consume()
+        session.run(
+            "MERGE (m:SchemaMigration {version: $version}) "
+            "SET m.description = $description, m.appliedAt = $applied_at",
+            version=version,
+            description=description,
+            applied_at=datetime.now(timezone.utc),
+        ).consume()
+        current_version = version
+    return current_version
+
+
+def verify_schema(session: Session) -> Dict[str, List[str]]:
+    """
+    Checks that every expected constraint exists and every expected index is
+    online. Returns the names of the missing ones, by kind.
+    """
+    constraints = {record["name"] for record in session.run("SHOW CONSTRAINTS YIELD name")}
+    online_indexes = {
+        record["name"]
+        for record in session.run("SHOW INDEXES YIELD name, state")
+        if record["state"] == "ONLINE"
+    }
+    return {
+        "constraints": [name for name in EXPECTED_CONSTRAINTS if name not in constraints],
+        "indexes": [name for name in EXPECTED_INDEXES if name not in online_indexes],
+    }
+
+
+def bootstrap_schema(session: Session) -> Dict[str, List[str]]:
+    """
+    Brings the database schema up to date and reports anything still missing,
+    e.g. a uniqueness constraint that could not be created because existing
+    data violates it, or an index that is still populating.
+    """
+    try:
+        version = apply_migrations(session)
+        print(f"Database schema is at version {version}.")
+    except Exception as e:
+        print(f"❌ Schema migration failed: {e}")
+
+    missing = verify_schema(session)
+    for kind, names in missing.items():
+        for name in names:
+            print(f"⚠️ Missing or offline {kind[:-1]}: {name}")
+    return missing
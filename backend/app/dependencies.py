@@ -1,16 +1,43 @@
+import time
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from typing import Annotated
+from neo4j import AsyncSession
+from typing import Annotated, Optional
 
-from app.core.config import SECRET_KEY, ALGORITHM
-from app.core.blocklist import BLOCKLIST
+from app.core.cache import TTLCache
+from app.core.config import SECRET_KEY, ALGORITHM, AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS
+from app.core.blocklist import revocation_store
+from app.crud import user_crud
 from app.models.user import TokenData
-from app.models.user import User
+from app.models.user import User, UserInDB
 # This tells FastAPI where to look for the token ("tokenUrl" is relative to the root)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
-def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
+# Decoded token payloads, keyed by the raw token; an entry never outlives the token.
+token_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS)
+# UserInDB records, keyed by username. Routers that change or delete a user
+# must call `invalidate_user`.
+user_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS)
+
+
+async def get_cached_user(db: AsyncSession, username: str) -> Optional[UserInDB]:
+    """`user_crud.get_user` behind the user cache. Missing users are not cached."""
+    user = user_cache.get(username)
+    if user is None:
+        user = await user_crud.get_user(db, username)
+        if user is not None:
+            user_cache.put(username, user)
+    return user
+
+def invalidate_user(username: str):
+    user_cache.invalidate(username)
+
+def auth_cache_stats() -> dict:
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     """
     Decodes the JWT token, validates it, and returns the payload (user data).
     This function serves as a dependency for protected routes.
@@ -22,16 +49,22 @@ def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     )
     
     try:
-        # 1. Decode the token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        # 1. Decode the token, unless it was decoded recently
+        payload = token_cache.get(token)
+        if payload is None:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            if payload.get("exp") is not None:
+                token_cache.put(token, payload, ttl=payload["exp"] - time.time())
         username: str = payload.get("sub")
         jti: str = payload.get("jti") # Get the unique token ID
 
         if username is None or jti is None:
             raise credentials_exception
         
-        # 2. Check if the token has been blocklisted (logged out)
-        if jti in BLOCKLIST:
+        # 2. Check if the token has been blocklisted (logged out). The store
+        # may hit its database, so only a token it cannot rule out in memory
+        # is checked, on the threadpool.
+        if revocation_store.may_be_revoked(jti) and await run_in_threadpool(revocation_store.is_revoked, jti):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Token has been revoked (logged out)",
@@ -51,7 +84,7 @@ def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     return payload
 
 
-def get_current_admin_user(
+async def get_current_admin_user(
     current_user: Annotated[dict, Depends(get_current_user)]
 ) -> dict:
     """
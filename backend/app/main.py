@@ -1,8 +1,12 @@
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import graph as graph_router
 from app.routers import auth as auth_router # <-- IMPORT NEW ROUTER
 from app.db.graph_db import db
+from app.db.schema import bootstrap_schema
+from app.core.jobs import job_queue
+from scripts.ingest_data import shutdown_parse_pool
 from app.routers import users as users_router
 from app.routers import workbench as workbench_router
 # <-- IMPORT NEW ROUTER
@@ -32,11 +36,27 @@ app.include_router(workbench_router.router, prefix="/api/v1/workbench", tags=["W
 app.include_router(graph_router.router, prefix="/api/v1/graph", tags=["Graph"])
 
 # -------------------------------
-@app.on_event("startup")
-def on_startup():
-    """Create initial admin user on startup if they don't exist."""
+# The startup and shutdown work below uses the blocking driver, SQLite and
+# thread joins: the async handlers run it on the threadpool, off the event loop.
+def bootstrap_database_schema():
     with db.get_session() as session:
-        admin_user = user_crud.get_user(session, "admin")
+        bootstrap_schema(session)
+
+def start_background_work():
+    job_queue.start(workbench_router.process_and_ingest_data)
+
+def stop_background_work():
+    """Waits for the ingestion workers and the parse pool to finish, then closes the blocking driver."""
+    job_queue.stop()
+    shutdown_parse_pool()
+    db.close()
+
+@app.on_event("startup")
+async def on_startup():
+    """Bring the database schema up to date and create the initial admin user if they don't exist."""
+    await run_in_threadpool(bootstrap_database_schema)
+    async with db.get_async_session() as session:
+        admin_user = await user_crud.get_user(session, "admin")
         if not admin_user:
             print("Creating initial admin user...")
             initial_admin = UserCreate(
@@ -45,12 +65,15 @@ def on_startup():
                 full_name="Default Admin",
                 role="admin"
             )
-            user_crud.create_user(session, initial_admin)
+            await user_crud.create_user(session, initial_admin)
             print("Initial admin user created.")
-            
+    await run_in_threadpool(start_background_work)
+    print("Ingestion workers started.")
+
 @app.on_event("shutdown")
-def shutdown_event():
-    db.close()
+async def shutdown_event():
+    await run_in_threadpool(stop_background_work)
+    await db.close_async()
     print("Database connection closed.")
 
 @app.get("/")
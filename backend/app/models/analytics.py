@@ -0,0 +1,75 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+class NodeMetrics(BaseModel):
+    """Centrality metrics of a subscriber in the contact graph."""
+    phoneNumber: str
+    degree: int                 # Number of distinct contacts
+    weightedDegree: float       # Number of interactions
+    pagerank: float
+    betweenness: float          # Estimated from a sample of sources
+    community: int              # Community id; 0 is the largest community
+    keyPlayerScore: float       # Composite 0-1 score used to rank key players
+
+class CentralityResult(BaseModel):
+    total_nodes: int
+    nodes: List[NodeMetrics]
+
+class Community(BaseModel):
+    id: int
+    size: int
+    members: List[str]          # Phone numbers, most central first (possibly capped)
+
+class CommunitiesResult(BaseModel):
+    total_communities: int
+    communities: List[Community]
+
+class KeyPlayer(NodeMetrics):
+    rank: int
+
+class KeyPlayersResult(BaseModel):
+    total_nodes: int
+    players: List[KeyPlayer]
+
+
+class CoLocationRequest(BaseModel):
+    listing_set_ids: List[str]
+    window_minutes: int = Field(15, ge=1, le=1440)     # Max time between two events on the same tower
+    start: Optional[datetime] = None                   # Inclusive; empty means unbounded
+    end: Optional[datetime] = None                     # Exclusive; empty means unbounded
+    phone_numbers: List[str] = []                      # If set, only pairs involving these subscribers
+    min_events: int = Field(2, ge=1)                   # Co-locations needed for a pair to be reported
+    limit: int = Field(100, ge=1, le=10000)
+
+class CoLocationPair(BaseModel):
+    a: str
+    b: str
+    co_locations: int           # Pairs of events on the same tower within the window
+    towers: int                 # Distinct towers they were seen together on
+    first_seen: datetime
+    last_seen: datetime
+
+class CoLocationResult(BaseModel):
+    total_pairs: int
+    pairs: List[CoLocationPair]
+    truncated: bool             # True if busy towers had more events in a window than were compared
+
+class SharedDeviceRequest(BaseModel):
+    listing_set_ids: List[str]
+    start: Optional[datetime] = None                   # Inclusive; empty means unbounded
+    end: Optional[datetime] = None                     # Exclusive; empty means unbounded
+    phone_numbers: List[str] = []                      # If set, only pairs involving these subscribers
+    limit: int = Field(100, ge=1, le=10000)
+
+class SharedDevicePair(BaseModel):
+    a: str
+    b: str
+    shared_devices: int
+    events: int                 # Communications of either subscriber on the shared devices
+    devices: List[str]          # IMEIs (possibly capped)
+
+class SharedDevicesResult(BaseModel):
+    total_pairs: int
+    pairs: List[SharedDevicePair]
+    skipped_devices: List[str]  # IMEIs used by too many subscribers to be meaningful
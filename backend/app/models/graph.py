@@ -1,5 +1,7 @@
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import List, Dict, Any, Optional, Literal
+from datetime import date, datetime
+from enum import Enum
 
 # Pydantic model for a graph node
 class Node(BaseModel):
@@ -18,4 +20,179 @@ class Edge(BaseModel):
 # Pydantic model for the entire graph structure
 class Graph(BaseModel):
     nodes: List[Node]
-    edges: List[Edge]
\ No newline at end of file
+    edges: List[Edge]
+
+# Pydantic model for one page of a paginated graph
+class GraphPage(Graph):
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to get the next page; None on the last page
+
+# Pydantic model for a graph that may have been cut off at a size cap
+class BoundedGraph(Graph):
+    truncated: bool = False  # True if the node or edge cap was reached
+
+# A node reached by a k-hop traversal of the in-memory snapshot
+class ReachedNode(BaseModel):
+    key: str            # phoneNumber, imei or tower name
+    label: str
+    distance: int       # Number of hops from the start node
+
+class KHopResult(BaseModel):
+    phone_number: str
+    nodes: List[ReachedNode]
+
+# --- Neighbourhood expansion ---
+
+# Relationship types that traversals may follow
+class RelationshipType(str, Enum):
+    CONTACTED = "CONTACTED"
+    INITIATED = "INITIATED"
+    IS_DIRECTED_TO = "IS_DIRECTED_TO"
+    USED_DEVICE = "USED_DEVICE"
+    ROUTED_THROUGH = "ROUTED_THROUGH"
+
+class NeighborhoodRequest(BaseModel):
+    # Start from a subscriber, or from any node already on screen (its `id`)
+    phone_number: Optional[str] = None
+    node_id: Optional[str] = None
+    # Restrict to these of the user's ListingSets; None means all of them
+    listing_set_ids: Optional[List[str]] = None
+    depth: int = Field(1, ge=1, le=4)
+    relationship_types: List[RelationshipType] = Field(default_factory=lambda: list(RelationshipType), min_length=1)
+    fan_out: Optional[int] = Field(None, ge=1, le=1000)     # Neighbours kept per expanded node; None uses the server default
+    # "rank": strongest / most recent neighbours. "first": the first ones the
+    # store returns, in no meaningful order (cheapest; not a random sample).
+    strategy: Literal["rank", "first"] = "rank"
+    max_nodes: Optional[int] = Field(None, ge=1)            # Cap on the number of new nodes; None uses the server default
+    # Elements the client already has: they are traversed but not returned again
+    known_node_ids: List[str] = []
+    known_edge_ids: List[str] = []
+
+    @model_validator(mode="after")
+    def one_start(self):
+        if (self.phone_number is None) == (self.node_id is None):
+            raise ValueError("Exactly one of phone_number and node_id must be given")
+        return self
+
+class NeighborhoodGraph(BoundedGraph):
+    # Expanded nodes with more neighbours than the fan-out cap -> their full degree
+    capped: Dict[str, int] = {}
+
+# --- Aggregated contact graph ---
+
+class DateRange(BaseModel):
+    start: Optional[date] = None  # Inclusive; empty means unbounded
+    end: Optional[date] = None    # Inclusive; empty means unbounded
+
+    @field_validator("start", "end", mode="before")
+    @classmethod
+    def empty_as_none(cls, value):
+        # The frontend sends "" for an unset date input
+        return value or None
+
+# Mirrors the `Filters` interface of the frontend
+class ContactGraphFilters(BaseModel):
+    interactionType: Literal["all", "calls", "sms"] = "all"
+    dateRange: DateRange = DateRange()
+    individuals: List[str] = []   # If set, only these phone numbers are kept
+    minInteractions: int = 0      # Minimum number of interactions of a subscriber
+
+class ContactGraphRequest(BaseModel):
+    listing_set_ids: List[str]
+    filters: ContactGraphFilters = ContactGraphFilters()
+
+# A subscriber with its interaction totals over the selected events
+class ContactNode(BaseModel):
+    id: str
+    phoneNumber: str
+    interactions: int
+    calls: int
+    sms: int
+    totalDuration: int            # In seconds
+    degree: int                   # Number of distinct contacts
+
+# An undirected subscriber-to-subscriber edge with its link strength metrics
+class ContactEdge(BaseModel):
+    id: str
+    source: str
+    target: str
+    interactions: int
+    callCount: int
+    smsCount: int
+    totalDuration: int            # In seconds
+    averageDuration: float
+    uniqueDays: int
+    timeSpread: int               # Days between the first and last interaction
+    strengthScore: int            # Composite score 0-100
+    classification: Literal["primary", "secondary", "weak"]
+
+class ContactGraph(BaseModel):
+    nodes: List[ContactNode]
+    edges: List[ContactEdge]
+
+
+# --- Activity timeline ---
+
+class TimelineRequest(BaseModel):
+    listing_set_ids: List[str]
+    start: datetime                                    # Inclusive
+    end: datetime                                      # Exclusive
+    granularity: Literal["minute", "hour", "day"] = "hour"
+    group_by: Literal["total", "subscriber", "pair"] = "total"
+    phone_numbers: List[str] = []                      # If set, only events involving these subscribers
+    limit: int = Field(50, ge=1, le=1000)              # Series returned, most active first
+
+    @model_validator(mode="after")
+    def ordered_range(self):
+        if self.end <= self.start:
+            raise ValueError("end must be after start")
+        return self
+
+# Counts per bucket; bucket i covers [bucket_starts[i], bucket_starts[i] + granularity)
+class TimelineSeries(BaseModel):
+    key: str                      # Phone number, or "a|b" for a pair
+    calls: List[int]
+    sms: List[int]
+    total: int
+
+class Timeline(BaseModel):
+    granularity: str
+    bucket_starts: List[datetime]
+    totals: TimelineSeries
+    series: List[TimelineSeries]  # Empty when grouping by "total"
+    total_series: int             # Number of series before the limit
+
+
+# --- Cell towers and movement traces ---
+
+class Tower(BaseModel):
+    name: str
+    longitude: Optional[float] = None
+    latitude: Optional[float] = None
+    communications: int           # Events of the selected ListingSets routed through the tower
+    distance: Optional[float] = None  # In metres from the search centre, for radius searches
+
+class TowerList(BaseModel):
+    towers: List[Tower]
+    truncated: bool               # True if more towers matched than were returned
+
+class TraceRequest(BaseModel):
+    phone_number: str
+    listing_set_ids: List[str]
+    start: Optional[datetime] = None                   # Inclusive; empty means unbounded
+    end: Optional[datetime] = None                     # Exclusive; empty means unbounded
+    max_gap_minutes: Optional[int] = Field(None, ge=1) # Split a stop when its events are further apart
+
+# Consecutive events of the subscriber at the same tower
+class TraceStop(BaseModel):
+    tower: str
+    longitude: Optional[float] = None
+    latitude: Optional[float] = None
+    arrived: datetime             # First event at the tower
+    departed: datetime            # Last event at the tower
+    dwell_seconds: int
+    events: int
+
+class MovementTrace(BaseModel):
+    phone_number: str
+    stops: List[TraceStop]
+    total_events: int
@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+class IngestionJob(BaseModel):
+    """An ingestion job as it is stored in the local job queue."""
+    id: str
+    listing_set_id: str
+    owner_username: str
+    status: str                  # "queued", "running", "completed", "partial" (some rows failed) or "failed"
+    total_rows: int = 0          # Estimated from the spooled file before ingestion starts
+    processed_rows: int = 0
+    ingested: int = 0
+    skipped: int = 0
+    failed: int = 0
+    duplicates: int = 0          # Rows already in the database, not created again
+    errors: List[str] = []
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class JobStatus(IngestionJob):
+    """Model for the job status API response, with derived progress metrics."""
+    percent_complete: float
+    rows_per_second: float
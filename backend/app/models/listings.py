@@ -14,6 +14,9 @@ class ListingSet(ListingSetBase):
     id: str
     owner_username: str
     createdAt: datetime
+    status: str = "pending"      # Ingestion status: "pending", "running", "completed", "partial" (some rows failed) or "failed"
+    progress: float = 0.0        # Ingestion progress, in percent
+    fileHash: Optional[str] = None  # SHA-256 of the imported file
 
     class Config:
         from_attributes = True # Allows creating model from ORM objects
\ No newline at end of file
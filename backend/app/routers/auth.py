@@ -1,55 +1,111 @@
+import time
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Annotated
-from neo4j import Session
+from neo4j import AsyncSession
 
-from app.core.security import verify_password, create_access_token
+from app.core.metrics import LatencyStats
+from app.core.security import PasswordPoolBusy, create_access_token, verify_password_async
+from app.crud import user_crud
 from app.models.user import Token
-from app.dependencies import get_current_user
-from app.db.graph_db import get_db_session
-from app.core.blocklist import BLOCKLIST
-from app.crud import user_crud # <-- IMPORT THE CRUD MODULE
+from app.dependencies import (
+    auth_cache_stats,
+    get_cached_user,
+    get_current_admin_user,
+    get_current_user,
+    invalidate_user,
+    oauth2_scheme,
+    token_cache,
+)
+from app.db.graph_db import get_write_db_session
+from app.core.blocklist import revocation_store
 
 router = APIRouter()
 
+# Latency of /token calls, by outcome ("success", "failure" or "rejected")
+login_latency = LatencyStats()
+
 @router.post("/token", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db_session) # <-- ADD DB DEPENDENCY
+    # A write session: logging in may rehash the stored password
+    db: AsyncSession = Depends(get_write_db_session)
 ):
     """
     Provides a JWT token for a valid username and password.
+    The password check runs on the dedicated password pool, so it never blocks
+    the event loop.
     """
-    # 1. Find the user in the Neo4j database
-    user = user_crud.get_user(db, username=form_data.username)
-    if not user or not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    # 2. Verify the provided password against the stored hash
-    if not verify_password(form_data.password, user.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
+    started = time.perf_counter()
+    outcome = "failure"
+    try:
+        # 1. Find the user in the Neo4j database
+        user = await get_cached_user(db, form_data.username)
+        if not user or not user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect username or password",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        # 2. Verify the provided password against the stored hash
+        try:
+            valid, new_hash = await verify_password_async(form_data.password, user.hashed_password)
+        except PasswordPoolBusy:
+            outcome = "rejected"
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent logins, please retry",
+                headers={"Retry-After": "1"},
+            )
+        if not valid:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect username or password",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        # The stored hash uses an outdated work factor: replace it while we have the password
+        if new_hash is not None:
+            await user_crud.update_password_hash(db, user.username, new_hash)
+            invalidate_user(user.username)
+
+        # 3. Create the JWT
+        access_token = create_access_token(
+            data={"sub": user.username, "role": user.role}
         )
-        
-    # 3. Create the JWT
-    access_token = create_access_token(
-        data={"sub": user.username, "role": user.role}
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+        outcome = "success"
+        return {"access_token": access_token, "token_type": "bearer"}
+    finally:
+        login_latency.record(outcome, time.perf_counter() - started)
 
 
 @router.post("/logout")
-def logout(current_user: Annotated[dict, Depends(get_current_user)]):
+async def logout(
+    current_user: Annotated[dict, Depends(get_current_user)],
+    token: Annotated[str, Depends(oauth2_scheme)],
+):
     """
     Adds the current user's token JTI to the blocklist.
     """
     jti = current_user.get("jti")
-    BLOCKLIST.add(jti)
-    return {"message": "Successfully logged out"}
\ No newline at end of file
+    await run_in_threadpool(revocation_store.revoke, jti, current_user["exp"])
+    token_cache.invalidate(token)
+    return {"message": "Successfully logged out"}
+
+
+@router.get("/cache-stats")
+async def read_auth_cache_stats(admin_user: Annotated[dict, Depends(get_current_admin_user)]):
+    """
+    (Admin only) Hit/miss counters of the token and user caches.
+    """
+    return auth_cache_stats()
+
+
+@router.get("/login-stats")
+async def read_login_stats(admin_user: Annotated[dict, Depends(get_current_admin_user)]):
+    """
+    (Admin only) Login counts by outcome and recent login latency percentiles.
+    """
+    return login_latency.stats()
\ No newline at end of file
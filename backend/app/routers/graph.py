@@ -1,98 +1,745 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from neo4j import Session, time as neo4j_time
-from typing import List, Dict, Any
+import base64
+import numpy as np
+import orjson
+from enum import Enum
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from neo4j import AsyncSession
+from neo4j.exceptions import Neo4jError
+from typing import AsyncIterator, List, Optional, Tuple
 
-from app.db.graph_db import get_db_session
-from app.models.graph import Graph, Node, Edge
+from app.analytics.centrality import NetworkMetrics, compute_network_metrics, metrics_cache
+from app.analytics.colocation import find_colocations, find_shared_devices
+from app.analytics.contact_graph import filter_bounds, filter_pairs
+from app.analytics.paths import bidirectional_bfs
+from app.analytics.snapshot import CSRGraph, graph_snapshot, LABELS
+from app.analytics.timeline import BUCKET_SECONDS, bucket_range, bucket_starts, build_timeline
+from app.analytics.trace import compress_trace
+from app.core.cache import TTLCache
+from app.core.config import (
+    ANALYTICS_CACHE_SIZE,
+    GRAPH_SNAPSHOT_TTL_SECONDS,
+    NEIGHBORHOOD_FAN_OUT,
+    NEIGHBORHOOD_MAX_NODES,
+    SHORTEST_PATH_MAX_HOPS,
+    SHORTEST_PATH_TIMEOUT_SECONDS,
+    TIMELINE_MAX_BUCKETS,
+    TOWER_SEARCH_MAX_RESULTS,
+)
+from app.core.graph_serializer import GraphSerializer, dumps, serialize_paths
+from app.core.result_cache import GLOBAL, cache_key, cached_response
+from app.crud import graph_crud, listings_crud
+from app.dependencies import get_current_user
+from app.db.graph_db import get_read_db_session, db as graph_db
+from app.models.analytics import (
+    CentralityResult,
+    CoLocationRequest,
+    CoLocationResult,
+    CommunitiesResult,
+    KeyPlayersResult,
+    SharedDeviceRequest,
+    SharedDevicesResult,
+)
+from app.models.graph import (
+    Graph,
+    GraphPage,
+    KHopResult,
+    ContactGraphRequest,
+    NeighborhoodGraph,
+    NeighborhoodRequest,
+    RelationshipType,
+    MovementTrace,
+    Timeline,
+    TimelineRequest,
+    TowerList,
+    TraceRequest,
+)
 
 router = APIRouter()
 
-# --- Helper Functions (Unchanged) ---
-def convert_properties(props: Dict[str, Any]) -> Dict[str, Any]:
-    converted = {}
-    for key, value in props.items():
-        if isinstance(value, neo4j_time.DateTime):
-            converted[key] = value.to_native().isoformat()
-        else:
-            converted[key] = value
-    return converted
+FULL_GRAPH_PAGE_SIZE = 200
+MAX_FULL_GRAPH_PAGE_SIZE = 2000
+# Number of NDJSON lines written to the response at once when streaming.
+STREAM_CHUNK_LINES = 500
+
+# Pages are keyed on (Communication.key, elementId): the communication_key range
+# index serves the key order, and the element id breaks ties between legacy
+# communications that share a key. A page carries its communications, every
+# relationship touching them and the nodes at the other end (returned, so the
+# driver hydrates their labels and properties).
+# Both the pages and the stream only hold the communications of the caller's
+# ListingSets, with their subscribers, devices and towers: never User or
+# ListingSet nodes, nor CONTACTED edges, whose totals span every user's data.
+FULL_GRAPH_PAGE_QUERY = """
+MATCH (c:Communication)
+WHERE c.key >= $key AND (c.key > $key OR elementId(c) > $element_id)
+  AND EXISTS { (c)-[:PART_OF]->(:ListingSet)<-[:OWNS]-(:User {username: $username}) }
+WITH c ORDER BY c.key, elementId(c) LIMIT $limit
+OPTIONAL MATCH (c)-[r:INITIATED|IS_DIRECTED_TO|USED_DEVICE|ROUTED_THROUGH]-(n)
+RETURN c, r, n
+"""
+
+STREAM_NODES_QUERY = """
+MATCH (:User {username: $username})-[:OWNS]->(:ListingSet)<-[:PART_OF]-(c:Communication)
+WITH DISTINCT c
+CALL {
+    WITH c
+    RETURN c AS n
+    UNION
+    WITH c
+    MATCH (c)-[:INITIATED|IS_DIRECTED_TO|USED_DEVICE|ROUTED_THROUGH]-(n)
+    RETURN n
+}
+WITH DISTINCT n
+RETURN elementId(n) AS id, labels(n)[0] AS label, properties(n) AS properties
+"""
+
+STREAM_EDGES_QUERY = """
+MATCH (:User {username: $username})-[:OWNS]->(:ListingSet)<-[:PART_OF]-(c:Communication)
+WITH DISTINCT c
+MATCH (c)-[r:INITIATED|IS_DIRECTED_TO|USED_DEVICE|ROUTED_THROUGH]-()
+RETURN elementId(r) AS id, elementId(startNode(r)) AS source, elementId(endNode(r)) AS target,
+       type(r) AS label, properties(r) AS properties
+"""
+
+# --- Helper Functions ---
+def format_graph_response(records: List) -> Response:
+    """Serializes path records (under "p") to a `Graph` JSON response, each element once."""
+    return serialize_paths(records).to_response()
+
+def encode_page_cursor(key: str, element_id: str) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([key, element_id])).decode()
+
+def decode_page_cursor(cursor: Optional[str]) -> Tuple[str, str]:
+    """The (key, element id) of the last communication of the previous page; ("", "") for the first page."""
+    if not cursor:
+        return "", ""
+    try:
+        key, element_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):  # Includes bad base64 and JSON
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(key, str) or not isinstance(element_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key, element_id
 
-def format_graph_response(records: List) -> Graph:
-    nodes = []
-    edges = []
-    node_ids = set()
+def format_graph_page(records: List, limit: int) -> Response:
+    """Serializes a page of the full graph from (c, r, n) records, one per communication relationship."""
+    serializer = GraphSerializer()
+    communications = {}
     for record in records:
-        path = record.get("p")
-        if path is None:
-            continue
-        for node in path.nodes:
-            if node.element_id not in node_ids:
-                nodes.append(Node(
-                    id=node.element_id,
-                    label=list(node.labels)[0],
-                    properties=convert_properties(dict(node))
-                ))
-                node_ids.add(node.element_id)
-        for edge in path.relationships:
-            edges.append(Edge(
-                id=edge.element_id,
-                source=edge.start_node.element_id,
-                target=edge.end_node.element_id,
-                label=edge.type,
-                properties=convert_properties(dict(edge))
-            ))
-    return Graph(nodes=nodes, edges=edges)
+        communication = record["c"]
+        communications[communication.element_id] = communication["key"]
+        serializer.add_node(communication)
+        if record["r"] is not None:
+            serializer.add_node(record["n"])
+            serializer.add_relationship(record["r"])
+    next_cursor = None
+    if len(communications) == limit:
+        # The last communication in (key, element id) order
+        element_id, key = max(communications.items(), key=lambda item: (item[1], item[0]))
+        next_cursor = encode_page_cursor(key, element_id)
+    return serializer.to_response(next_cursor=next_cursor)
+
+async def stream_full_graph(username: str) -> AsyncIterator[bytes]:
+    """
+    Yields the user's graph as NDJSON: one {"type": "node", ...} line per node,
+    then one {"type": "edge", ...} line per relationship, written as the
+    driver fetches the records.
+    The generator outlives the request's dependencies, so it opens its own
+    session. Lines already sent can't be taken back, so unlike the other
+    reads this one runs as auto-commit queries on a read session, without retries.
+    """
+    async with graph_db.get_async_read_session() as session:
+        lines = []
+        for kind, query in (("node", STREAM_NODES_QUERY), ("edge", STREAM_EDGES_QUERY)):
+            result = await session.run(query, username=username)
+            async for record in result:
+                lines.append(dumps({"type": kind, **record.data()}))
+                if len(lines) >= STREAM_CHUNK_LINES:
+                    yield b"\n".join(lines) + b"\n"
+                    lines = []
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+
+def _load_graph_snapshot() -> CSRGraph:
+    with graph_db.get_read_session() as session:
+        return graph_snapshot.get(session)
+
+async def get_graph_snapshot() -> CSRGraph:
+    """The current graph snapshot. (Re)loading it runs on the threadpool, off the event loop."""
+    return graph_snapshot.current() or await run_in_threadpool(_load_graph_snapshot)
+
+# The snapshot holds every user's data. Each user only sees the nodes of their
+# own ListingSets: their (label code, key) pairs are cached per user and data version.
+visible_nodes_cache = TTLCache(ANALYTICS_CACHE_SIZE, GRAPH_SNAPSHOT_TTL_SECONDS)
+
+async def get_visible_nodes(session: AsyncSession, username: str, snapshot: CSRGraph) -> np.ndarray:
+    """Mask of the snapshot nodes that appear in the user's ListingSets."""
+    version = await listings_crud.get_global_data_version(session)
+    key = (username, version)
+    nodes = visible_nodes_cache.get(key)
+    if nodes is None:
+        columns = await graph_crud.get_listing_set_nodes(session, username)
+        nodes = [(LABELS.index(label), node_key) for label, node_key in zip(columns["label"], columns["key"])]
+        visible_nodes_cache.put(key, nodes)
+    return await run_in_threadpool(snapshot.node_mask, nodes)
 
 # --- API Endpoints ---
 
-@router.get("/full", response_model=Graph)
-def get_full_graph(session: Session = Depends(get_db_session)):
-    """Retrieves the entire graph from the database."""
-    query = "MATCH p = ()-[r]->() RETURN p"
-    result = session.run(query)
-    records = list(result)
-    if not records:
-        return Graph(nodes=[], edges=[])
-    return format_graph_response(records)
+@router.get("/full", response_model=GraphPage)
+async def get_full_graph(
+    limit: int = Query(FULL_GRAPH_PAGE_SIZE, ge=1, le=MAX_FULL_GRAPH_PAGE_SIZE, description="Maximum number of communications per page."),
+    cursor: Optional[str] = Query(None, description="The next_cursor of the previous page."),
+    stream: bool = Query(False, description="Stream the entire graph as NDJSON instead of returning a page."),
+    current_user: dict = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session)
+):
+    """
+    Retrieves the communications of the user's ListingSets with their
+    subscribers, devices and towers, one page of communications at a time, or
+    all of them as an NDJSON stream.
+    """
+    username = current_user["sub"]
+    if stream:
+        return StreamingResponse(stream_full_graph(username), media_type="application/x-ndjson")
+    key, element_id = decode_page_cursor(cursor)
+    records = await graph_crud.read_records(
+        session, FULL_GRAPH_PAGE_QUERY, username=username, key=key, element_id=element_id, limit=limit
+    )
+    return format_graph_page(records, limit)
 
 # --- NEW ENDPOINT 1: Search for a Subscriber ---
 @router.get("/search", response_model=Graph)
-def search_subscriber(
+async def search_subscriber(
+    request: Request,
     phone_number: str = Query(..., description="The phone number of the subscriber to search for."),
-    session: Session = Depends(get_db_session)
+    session: AsyncSession = Depends(get_read_db_session)
 ):
     """
     Finds a subscriber by their phone number and returns their immediate network (1-hop neighborhood).
+    Results are cached until new data is ingested, and carry an ETag.
     """
     # This query finds the subscriber and any node connected to them by one relationship.
     query = """
     MATCH p = (s:Subscriber {phoneNumber: $phone_number})-[*0..1]-(neighbor)
     RETURN p
     """
-    result = session.run(query, phone_number=phone_number)
-    records = list(result)
-    if not records:
-        raise HTTPException(status_code=404, detail="Subscriber not found")
-    return format_graph_response(records)
+
+    async def produce() -> Response:
+        records = await graph_crud.read_records(session, query, phone_number=phone_number)
+        if not records:
+            raise HTTPException(status_code=404, detail="Subscriber not found")
+        return format_graph_response(records)
+
+    version = await listings_crud.get_global_data_version(session)
+    return await cached_response(request, cache_key("search", phone_number, version), [GLOBAL], produce)
 
 # --- NEW ENDPOINT 2: Find Shortest Path ---
+class PathMode(str, Enum):
+    CYPHER = "cypher"  # Shortest path search in the database
+    BFS = "bfs"        # Bidirectional BFS over the in-memory graph snapshot
+
 @router.get("/shortest-path", response_model=Graph)
-def get_shortest_path(
+async def get_shortest_path(
+    request: Request,
     start_phone: str = Query(..., description="Phone number of the starting subscriber."),
     end_phone: str = Query(..., description="Phone number of the ending subscriber."),
-    session: Session = Depends(get_db_session)
+    max_hops: int = Query(6, ge=1, le=SHORTEST_PATH_MAX_HOPS, description="Maximum number of relationships in the path."),
+    relationship_types: List[RelationshipType] = Query([RelationshipType.CONTACTED], description="Relationship types the path may follow."),
+    k: int = Query(1, ge=1, le=100, description="Number of equally short paths to return."),
+    mode: PathMode = Query(PathMode.CYPHER, description="Where to run the search."),
+    timeout: float = Query(SHORTEST_PATH_TIMEOUT_SECONDS, gt=0, le=SHORTEST_PATH_TIMEOUT_SECONDS, description="Time budget of the search, in seconds."),
+    current_user: dict = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session)
 ):
     """
     Calculates the shortest path between two subscribers in the communication network.
+    By default only the aggregated CONTACTED edges are followed, so paths cannot
+    fan out through Device and CellTower hubs. The BFS mode always uses CONTACTED
+    edges between subscribers of the user's ListingSets, and returns a single path.
+    Results are cached until new data is ingested, and carry an ETag.
     """
-    # This query uses a built-in Neo4j algorithm to find the shortest path.
-    query = """
-    MATCH (a:Subscriber {phoneNumber: $start_phone}), (b:Subscriber {phoneNumber: $end_phone})
-    MATCH p = allShortestPaths((a)-[*]-(b))
-    RETURN p
-    """
-    result = session.run(query, start_phone=start_phone, end_phone=end_phone)
-    records = list(result)
+    username = current_user["sub"]
+    relationship_types = sorted(dict.fromkeys(r.value for r in relationship_types))
+    version = await listings_crud.get_global_data_version(session)
+    key = cache_key(
+        "shortest-path", username, start_phone, end_phone, max_hops, relationship_types, k, mode.value, version
+    )
+    return await cached_response(
+        request,
+        key,
+        [GLOBAL],
+        lambda: find_shortest_path(
+            session, username, start_phone, end_phone, max_hops, relationship_types, k, mode, timeout
+        ),
+    )
+
+async def find_shortest_path(
+    session: AsyncSession,
+    username: str,
+    start_phone: str,
+    end_phone: str,
+    max_hops: int,
+    relationship_types: List[str],
+    k: int,
+    mode: PathMode,
+    timeout: float,
+) -> Response:
+    try:
+        if mode == PathMode.BFS:
+            snapshot = await get_graph_snapshot()
+            visible = await get_visible_nodes(session, username, snapshot)
+            start_id, end_id = snapshot.subscriber_id(start_phone), snapshot.subscriber_id(end_phone)
+
+            def neighbors(node: int) -> List[int]:
+                return [neighbor for neighbor in snapshot.subscriber_neighbors(node) if visible[neighbor]]
+
+            path = None
+            if start_id is not None and end_id is not None and visible[start_id] and visible[end_id]:
+                path = await run_in_threadpool(bidirectional_bfs, neighbors, start_id, end_id, max_hops, timeout)
+            records = await graph_crud.get_contact_path(session, [snapshot.keys[i] for i in path]) if path else []
+        else:
+            records = await graph_crud.find_shortest_paths(
+                session,
+                start_phone=start_phone,
+                end_phone=end_phone,
+                relationship_types=relationship_types,
+                max_hops=max_hops,
+                k=k,
+                timeout=timeout,
+            )
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="Path search timed out")
+    except Neo4jError as e:
+        if "TransactionTimedOut" in (e.code or ""):
+            raise HTTPException(status_code=504, detail="Path search timed out")
+        raise
     if not records:
         raise HTTPException(status_code=404, detail="No path found between the specified subscribers")
-    return format_graph_response(records)
\ No newline at end of file
+    return format_graph_response(records)
+
+
+# --- NEW ENDPOINT 3: k-hop reachability from the in-memory snapshot ---
+class SnapshotLabel(str, Enum):
+    SUBSCRIBER = "Subscriber"
+    DEVICE = "Device"
+    CELL_TOWER = "CellTower"
+
+@router.get("/k-hop", response_model=KHopResult)
+async def get_k_hop(
+    phone_number: str = Query(..., description="The phone number of the subscriber to start from."),
+    k: int = Query(2, ge=1, le=6, description="Maximum number of hops."),
+    label: Optional[SnapshotLabel] = Query(None, description="Only traverse and return nodes with this label."),
+    current_user: dict = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session)
+):
+    """
+    Lists every Subscriber, Device and CellTower of the user's ListingSets
+    within k hops of a subscriber, with its distance, only going through such
+    nodes. Served from the in-memory graph snapshot.
+    """
+    snapshot = await get_graph_snapshot()
+    visible = await get_visible_nodes(session, current_user["sub"], snapshot)
+    node = snapshot.subscriber_id(phone_number)
+    if node is None or not visible[node]:
+        raise HTTPException(status_code=404, detail="Subscriber not found")
+    label_code = LABELS.index(label.value) if label else None
+    found, distances = await run_in_threadpool(snapshot.k_hop, node, k, label_code, visible)
+    nodes = [
+        {"key": snapshot.keys[i], "label": LABELS[label_id], "distance": distance}
+        for i, label_id, distance in zip(found.tolist(), snapshot.labels[found].tolist(), distances.tolist())
+    ]
+    return Response(content=dumps({"phone_number": phone_number, "nodes": nodes}), media_type="application/json")
+
+
+# --- NEW ENDPOINT 4: Neighbourhood expansion with per-node fan-out caps ---
+@router.post("/neighborhood", response_model=NeighborhoodGraph)
+async def get_neighborhood(
+    request: NeighborhoodRequest,
+    current_user: dict = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session)
+):
+    """
+    Returns the multi-hop neighbourhood of a subscriber, device, tower or
+    communication within the user's ListingSets, keeping at most `fan_out` neighbours per expanded node so that
+    supernodes such as busy cell towers don't flood the result. `capped` lists
+    the nodes that had more neighbours, with their full degree.
+    For "expand this node" calls, pass the ids already displayed in
+    `known_node_ids` / `known_edge_ids`: only new elements are returned.
+    """
+    neighborhood = await graph_crud.get_neighborhood(
+        session,
+        username=current_user["sub"],
+        listing_set_ids=request.listing_set_ids,
+        phone_number=request.phone_number,
+        node_id=request.node_id,
+        relationship_types=[r.value for r in dict.fromkeys(request.relationship_types)],
+        depth=request.depth,
+        fan_out=request.fan_out or NEIGHBORHOOD_FAN_OUT,
+        rank=request.strategy == "rank",
+        max_nodes=request.max_nodes or NEIGHBORHOOD_MAX_NODES,
+        known_node_ids=request.known_node_ids,
+        known_edge_ids=request.known_edge_ids,
+    )
+    if neighborhood is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    serializer, capped, truncated = neighborhood
+    return serializer.to_response(truncated=truncated, capped=capped)
+
+
+# --- NEW ENDPOINT 5: Activity timeline ---
+@router.post("/timeline", response_model=Timeline)
+async def get_timeline(
+    request: Request,
+    timeline_request: TimelineRequest,
+    current_user: dict = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session)
+):
+    """
+    Counts the calls and SMS of the user's ListingSets per minute, hour or day
+    over a date range: in total, or per subscriber or pair of subscribers.
+    The response holds one count per bucket and series, however many
+    communications fall in them.
+    """
+    # Stored timestamps are local times without a zone
+    start = timeline_request.start.replace(tzinfo=None)
+    end = timeline_request.end.replace(tzinfo=None)
+    granularity = timeline_request.granularity
+    buckets = bucket_range(start, end, granularity)
+    if len(buckets) > TIMELINE_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"The range spans {len(buckets)} {granularity}s; the maximum is {TIMELINE_MAX_BUCKETS}",
+        )
+    username = current_user["sub"]
+    listing_set_ids = sorted(set(timeline_request.listing_set_ids))
+    phone_numbers = sorted(set(timeline_request.phone_numbers))
+
+    async def produce() -> Response:
+        counts = await graph_crud.get_timeline_counts(
+            session,
+            username=username,
+            listing_set_ids=listing_set_ids,
+            start=start,
+            end=end,
+            bucket_seconds=BUCKET_SECONDS[granularity],
+            phone_numbers=phone_numbers,
+        )
+        timeline = await run_in_threadpool(
+            build_timeline, counts, buckets, timeline_request.group_by, timeline_request.limit
+        )
+        timeline = {"granularity": granularity, "bucket_starts": bucket_starts(buckets, granularity), **timeline}
+        return Response(content=dumps(timeline), media_type="application/json")
+
+    versions = await listings_crud.get_data_versions(session, username, listing_set_ids)
+    key = cache_key(
+        "timeline", username, start, end, granularity, timeline_request.group_by,
+        phone_numbers, timeline_request.limit, sorted(versions.items()),
+    )
+    return await cached_response(request, key, listing_set_ids, produce)
+
+
+# --- NEW ENDPOINT 6: Cell tower search and movement traces ---
+def tower_list_response(towers: List[dict], limit: int) -> Response:
+    # One extra tower is fetched to tell whether the result was cut off
+    body = {"towers": towers[:limit], "truncated": len(towers) > limit}
+    return Response(content=dumps(body), media_type="application/json")
+
+@router.get("/towers", response_model=TowerList)
+async def get_towers_in_bbox(
+    request: Request,
+    min_lon: float = Query(..., ge=-180, le=180),
+    min_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180, description="Less than min_lon for a box crossing the antimeridian."),
+    max_lat: float = Query(..., ge=-90, le=90),
+    limit: int = Query(1000, ge=1, le=TOWER_SEARCH_MAX_RESULTS),
+    listing_set_ids: List[str] = Query(..., description="The ListingSets whose towers are searched."),
+    current_user: dict = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session)
+):
+    """
+    Returns the cell towers used by the user's ListingSets inside a bounding
+    box, busiest first, from the CellTower point index. Counts only include
+    those ListingSets. Towers without valid coordinates are not included.
+    """
+    if min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="min_lat must not be greater than max_lat")
+    username = current_user["sub"]
+    listing_set_ids = sorted(set(listing_set_ids))
+
+    async def produce() -> Response:
+        towers = await graph_crud.find_towers_in_bbox(
+            session, username, listing_set_ids, min_lon, min_lat, max_lon, max_lat, limit + 1
+        )
+        return tower_list_response(towers, limit)
+
+    versions = await listings_crud.get_data_versions(session, username, listing_set_ids)
+    key = cache_key("towers", username, min_lon, min_lat, max_lon, max_lat, limit, sorted(versions.items()))
+    return await cached_response(request, key, listing_set_ids, produce)
+
+@router.get("/towers/nearby", response_model=TowerList)
+async def get_towers_nearby(
+    request: Request,
+    longitude: float = Query(..., ge=-180, le=180),
+    latitude: float = Query(..., ge=-90, le=90),
+    radius_m: float = Query(..., gt=0, le=500_000, description="Search radius in metres."),
+    limit: int = Query(1000, ge=1, le=TOWER_SEARCH_MAX_RESULTS),
+    listing_set_ids: List[str] = Query(..., description="The ListingSets whose towers are searched."),
+    current_user: dict = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session)
+):
+    """
+    Returns the cell towers used by the user's ListingSets within `radius_m`
+    metres of a point, nearest first, with their distance, from the CellTower
+    point index. Counts only include those ListingSets.
+    """
+    username = current_user["sub"]
+    listing_set_ids = sorted(set(listing_set_ids))
+
+    async def produce() -> Response:
+        towers = await graph_crud.find_towers_near(
+            session, username, listing_set_ids, longitude, latitude, radius_m, limit + 1
+        )
+        return tower_list_response(towers, limit)
+
+    versions = await listings_crud.get_data_versions(session, username, listing_set_ids)
+    key = cache_key("towers-nearby", username, longitude, latitude, radius_m, limit, sorted(versions.items()))
+    return await cached_response(request, key, listing_set_ids, produce)
+
+@router.post("/trace", response_model=MovementTrace)
+async def get_movement_trace(
+    request: Request,
+    trace_request: TraceRequest,
+    current_user: dict = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session)
+):
+    """
+    Returns the movements of a subscriber in the user's ListingSets as a
+    time-ordered list of stops: consecutive communications through the same
+    tower are merged into one stop with its arrival, departure and event count.
+    """
+    # Stored timestamps are local times without a zone
+    start = trace_request.start.replace(tzinfo=None) if trace_request.start else None
+    end = trace_request.end.replace(tzinfo=None) if trace_request.end else None
+    max_gap_seconds = trace_request.max_gap_minutes * 60 if trace_request.max_gap_minutes else None
+    username = current_user["sub"]
+    listing_set_ids = sorted(set(trace_request.listing_set_ids))
+    phone_number = trace_request.phone_number
+
+    async def produce() -> Response:
+        visits = await graph_crud.get_tower_visits(
+            session,
+            username=username,
+            listing_set_ids=listing_set_ids,
+            phone_number=phone_number,
+            start=start,
+            end=end,
+        )
+        stops = await run_in_threadpool(compress_trace, visits, max_gap_seconds)
+        trace = {"phone_number": phone_number, "stops": stops, "total_events": len(visits["timestamp"])}
+        return Response(content=dumps(trace), media_type="application/json")
+
+    versions = await listings_crud.get_data_versions(session, username, listing_set_ids)
+    key = cache_key(
+        "trace", username, phone_number, start, end, max_gap_seconds, sorted(versions.items()),
+    )
+    return await cached_response(request, key, listing_set_ids, produce)
+
+
+# --- Network analytics over the contact graph of the user's ListingSets ---
+class CentralityMetric(str, Enum):
+    DEGREE = "degree"
+    WEIGHTED_DEGREE = "weighted_degree"
+    PAGERANK = "pagerank"
+    BETWEENNESS = "betweenness"
+    KEY_PLAYER_SCORE = "key_player_score"
+
+async def get_network_metrics(db: AsyncSession, username: str, request: ContactGraphRequest) -> NetworkMetrics:
+    """Computes (or reuses) the metrics of the contact graph selected by `request`."""
+    key = (username, tuple(sorted(set(request.listing_set_ids))), request.filters.model_dump_json())
+    metrics = metrics_cache.get(key)
+    if metrics is None:
+        start, end, event_type = filter_bounds(request.filters)
+        pairs = await graph_crud.get_contact_pairs(
+            db,
+            username=username,
+            listing_set_ids=request.listing_set_ids,
+            start=start,
+            end=end,
+            event_type=event_type,
+        )
+        # Seconds of NumPy/SciPy work on large graphs: keep it off the event loop.
+        # The node-level filters apply as in the contact graph.
+        metrics = await run_in_threadpool(
+            lambda: compute_network_metrics(filter_pairs(pairs, request.filters))
+        )
+        metrics_cache.put(key, metrics)
+    return metrics
+
+def node_metrics(metrics: NetworkMetrics, indexes: np.ndarray) -> List[dict]:
+    return [
+        {
+            "phoneNumber": phone,
+            "degree": degree,
+            "weightedDegree": weighted_degree,
+            "pagerank": rank,
+            "betweenness": betweenness,
+            "community": community,
+            "keyPlayerScore": score,
+        }
+        for phone, degree, weighted_degree, rank, betweenness, community, score in zip(
+            metrics.phones[indexes].tolist(),
+            metrics.degree[indexes].tolist(),
+            metrics.weighted_degree[indexes].tolist(),
+            metrics.pagerank[indexes].tolist(),
+            metrics.betweenness[indexes].tolist(),
+            metrics.community[indexes].tolist(),
+            metrics.key_player_score[indexes].tolist(),
+        )
+    ]
+
+def top_indexes(values: np.ndarray, limit: int) -> np.ndarray:
+    """Indexes of the `limit` largest values, largest first, without a full sort."""
+    if limit < len(values):
+        candidates = np.argpartition(-values, limit)[:limit]
+    else:
+        candidates = np.arange(len(values))
+    return candidates[np.argsort(-values[candidates], kind="stable")]
+
+@router.post("/analytics/centrality", response_model=CentralityResult)
+async def get_centrality(
+    request: ContactGraphRequest,
+    sort_by: CentralityMetric = Query(CentralityMetric.PAGERANK, description="Metric to rank subscribers by."),
+    limit: int = Query(100, ge=1, le=10000, description="Maximum number of subscribers to return."),
+    current_user: dict = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session)
+):
+    """
+    Degree, weighted degree, PageRank, sampled betweenness and community of the
+    subscribers of the user's ListingSets, ranked by one of the metrics.
+    """
+    metrics = await get_network_metrics(session, current_user["sub"], request)
+    indexes = top_indexes(getattr(metrics, sort_by.value).astype(float), limit)
+    return Response(
+        content=dumps({"total_nodes": metrics.num_nodes, "nodes": node_metrics(metrics, indexes)}),
+        media_type="application/json",
+    )
+
+@router.post("/analytics/communities", response_model=CommunitiesResult)
+async def get_communities(
+    request: ContactGraphRequest,
+    limit: int = Query(50, ge=1, le=1000, description="Maximum number of communities to return, largest first."),
+    max_members: int = Query(100, ge=1, le=10000, description="Maximum number of members listed per community."),
+    current_user: dict = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session)
+):
+    """Communities detected in the contact graph of the user's ListingSets, largest first."""
+    metrics = await get_network_metrics(session, current_user["sub"], request)
+    sizes = np.bincount(metrics.community)
+    # Members grouped by community (ids are ordered by size), most central first
+    order = np.lexsort((-metrics.key_player_score, metrics.community))
+    starts = np.concatenate([[0], np.cumsum(sizes)])
+    communities = [
+        {
+            "id": community,
+            "size": int(sizes[community]),
+            "members": metrics.phones[order[starts[community]:starts[community] + min(max_members, sizes[community])]].tolist(),
+        }
+        for community in range(min(limit, len(sizes)))
+    ]
+    return Response(
+        content=dumps({"total_communities": len(sizes), "communities": communities}),
+        media_type="application/json",
+    )
+
+@router.post("/analytics/key-players", response_model=KeyPlayersResult)
+async def get_key_players(
+    request: ContactGraphRequest,
+    top: int = Query(50, ge=1, le=1000, description="Number of key players to return."),
+    current_user: dict = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session)
+):
+    """
+    The subscribers most central to the contact graph of the user's ListingSets,
+    ranked by a composite of PageRank, betweenness and weighted degree.
+    """
+    metrics = await get_network_metrics(session, current_user["sub"], request)
+    indexes = top_indexes(metrics.key_player_score, top)
+    players = [{**player, "rank": rank} for rank, player in enumerate(node_metrics(metrics, indexes), start=1)]
+    return Response(
+        content=dumps({"total_nodes": metrics.num_nodes, "players": players}),
+        media_type="application/json",
+    )
+
+
+# --- Co-location and shared-device detection over the user's ListingSets ---
+@router.post("/analytics/co-location", response_model=CoLocationResult)
+async def get_colocations(
+    request: Request,
+    colocation_request: CoLocationRequest,
+    current_user: dict = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session)
+):
+    """
+    Pairs of subscribers whose communications went through the same cell tower
+    within `window_minutes` of each other, ranked by the number of such
+    co-locations. Events are joined per tower with a sliding time window.
+    """
+    username = current_user["sub"]
+    listing_set_ids = sorted(set(colocation_request.listing_set_ids))
+    # Stored timestamps are local times without a zone
+    start = colocation_request.start.replace(tzinfo=None) if colocation_request.start else None
+    end = colocation_request.end.replace(tzinfo=None) if colocation_request.end else None
+    phone_numbers = sorted(set(colocation_request.phone_numbers))
+
+    async def produce() -> Response:
+        events = await graph_crud.get_tower_events(
+            session, username=username, listing_set_ids=listing_set_ids, start=start, end=end
+        )
+        result = await run_in_threadpool(
+            find_colocations,
+            events,
+            colocation_request.window_minutes * 60,
+            colocation_request.min_events,
+            colocation_request.limit,
+            phone_numbers,
+        )
+        return Response(content=dumps(result), media_type="application/json")
+
+    versions = await listings_crud.get_data_versions(session, username, listing_set_ids)
+    key = cache_key(
+        "co-location", username, start, end, colocation_request.window_minutes, phone_numbers,
+        colocation_request.min_events, colocation_request.limit, sorted(versions.items()),
+    )
+    return await cached_response(request, key, listing_set_ids, produce)
+
+@router.post("/analytics/shared-devices", response_model=SharedDevicesResult)
+async def get_shared_devices(
+    request: Request,
+    device_request: SharedDeviceRequest,
+    current_user: dict = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session)
+):
+    """
+    Pairs of subscribers who made communications from the same device (IMEI),
+    ranked by the number of devices they share.
+    """
+    username = current_user["sub"]
+    listing_set_ids = sorted(set(device_request.listing_set_ids))
+    start = device_request.start.replace(tzinfo=None) if device_request.start else None
+    end = device_request.end.replace(tzinfo=None) if device_request.end else None
+    phone_numbers = sorted(set(device_request.phone_numbers))
+
+    async def produce() -> Response:
+        usage = await graph_crud.get_device_usage(
+            session, username=username, listing_set_ids=listing_set_ids, start=start, end=end
+        )
+        result = await run_in_threadpool(find_shared_devices, usage, device_request.limit, phone_numbers)
+        return Response(content=dumps(result), media_type="application/json")
+
+    versions = await listings_crud.get_data_versions(session, username, listing_set_ids)
+    key = cache_key(
+        "shared-devices", username, start, end, phone_numbers, device_request.limit, sorted(versions.items()),
+    )
+    return await cached_response(request, key, listing_set_ids, produce)
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Annotated, List
-from neo4j import Session
+from neo4j import AsyncSession
 
-from app.db.graph_db import get_db_session
-from app.dependencies import get_current_admin_user
+from app.db.graph_db import get_read_db_session, get_write_db_session
+from app.dependencies import get_current_admin_user, get_cached_user, invalidate_user
 from app.dependencies import get_current_user 
+from app.core.security import PasswordPoolBusy
 from app.crud import user_crud
 # Import the new UserUpdate model
 from app.models.user import User, UserCreate, UserUpdate
@@ -13,28 +14,35 @@ router = APIRouter()
 
 # --- POST and GET / (Unchanged) ---
 @router.post("/", response_model=User, status_code=status.HTTP_201_CREATED)
-def create_new_user(
+async def create_new_user(
     user: UserCreate,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_write_db_session),
     admin_user: dict = Depends(get_current_admin_user)
 ):
-    db_user = user_crud.get_user(db, username=user.username)
+    db_user = await get_cached_user(db, username=user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    return user_crud.create_user(db=db, user=user)
+    try:
+        return await user_crud.create_user(db=db, user=user)
+    except PasswordPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent password operations, please retry",
+            headers={"Retry-After": "1"},
+        )
 
 @router.get("/", response_model=List[User])
-def read_all_users(
-    db: Session = Depends(get_db_session),
+async def read_all_users(
+    db: AsyncSession = Depends(get_read_db_session),
     admin_user: dict = Depends(get_current_admin_user)
 ):
-    return user_crud.get_all_users(db)
+    return await user_crud.get_all_users(db)
 
 # --- NEW ENDPOINTS ---
 
 @router.get("/me", response_model=User)
-def read_current_user(
-    db: Session = Depends(get_db_session),
+async def read_current_user(
+    db: AsyncSession = Depends(get_read_db_session),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -44,51 +52,53 @@ def read_current_user(
     if not username:
         raise HTTPException(status_code=400, detail="Invalid token payload")
 
-    user = user_crud.get_user(db, username=username)
+    user = await get_cached_user(db, username=username)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     return user
 
 @router.get("/{username}", response_model=User)
-def read_user_by_username(
+async def read_user_by_username(
     username: str,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_read_db_session),
     admin_user: dict = Depends(get_current_admin_user)
 ):
     """
     (Admin only) Retrieves a single user by their username.
     """
-    db_user = user_crud.get_user(db, username=username)
+    db_user = await get_cached_user(db, username=username)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 @router.put("/{username}", response_model=User)
-def update_existing_user(
+async def update_existing_user(
     username: str,
     user_update: UserUpdate,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_write_db_session),
     admin_user: dict = Depends(get_current_admin_user)
 ):
     """
     (Admin only) Updates a user's information.
     """
-    updated_user = user_crud.update_user(db, username, user_update)
+    updated_user = await user_crud.update_user(db, username, user_update)
+    invalidate_user(username)
     if updated_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return updated_user
 
 @router.delete("/{username}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_existing_user(
+async def delete_existing_user(
     username: str,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_write_db_session),
     admin_user: dict = Depends(get_current_admin_user)
 ):
     """
     (Admin only) Deletes a user from the system.
     """
-    was_deleted = user_crud.delete_user(db, username)
+    was_deleted = await user_crud.delete_user(db, username)
+    invalidate_user(username)
     if not was_deleted:
         raise HTTPException(status_code=404, detail="User not found")
     return None # Return nothing on success for 204
\ No newline at end of file
@@ -1,96 +1,378 @@
-import csv
-import io
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, BackgroundTasks
-from typing import Annotated, List
-from neo4j import Session
+import hashlib
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from typing import Annotated, AsyncIterator, Dict, List, Optional, Tuple
+from neo4j import AsyncSession
 
 from app.dependencies import get_current_user
-from app.db.graph_db import get_db_session
-from app.crud import listings_crud
+from app.db.graph_db import get_read_db_session, get_write_db_session, db as graph_db
+from app.core.config import (
+    EXPORT_ROW_GROUP_SIZE,
+    JOB_SPOOL_DIR,
+    VISUALIZE_EDGE_LIMIT,
+    VISUALIZE_MAX_EDGES,
+    VISUALIZE_MAX_NODES,
+    VISUALIZE_NODE_LIMIT,
+)
+from app.core.jobs import JobInterrupted, job_queue
+from app.core.graph_serializer import dumps
+from app.core.parquet_export import EXPORT_SCHEMA, ParquetStreamWriter
+from app.core.result_cache import cache_key, cached_response, result_cache
+from app.analytics.contact_graph import build_contact_graph, filter_bounds
+from app.analytics.centrality import metrics_cache
+from app.analytics.snapshot import graph_snapshot
+from app.crud import listings_crud, graph_crud
 from app.models.listings import ListingSet, ListingSetCreate
-from app.models.graph import Graph
-from app.routers.graph import format_graph_response # Reuse our formatter
-from scripts.ingest_data import ingest_listings_data # Import our ingestion function
+from app.models.jobs import IngestionJob, JobStatus
+from app.models.graph import BoundedGraph, ContactGraph, ContactGraphRequest
+from scripts.ingest_data import count_listing_rows, ingest_listings_file, IngestionSummary # Import our ingestion functions
 
 router = APIRouter()
 
-def process_and_ingest_data(db: Session, file_contents: bytes, listing_set_id: str):
-    """Background task to process a CSV file and ingest its data."""
-    # This is a simplified CSV parser. A real app would have more robust error handling.
+# Size of the chunks copied from the upload to the spool file on disk.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Accepted upload formats: spool file extension by file name extension, and by
+# content type for clients that send a meaningful one.
+UPLOAD_EXTENSIONS = {
+    ".csv": ".csv",
+    ".parquet": ".parquet",
+    ".pq": ".parquet",
+    ".arrow": ".arrow",
+    ".arrows": ".arrow",
+    ".feather": ".arrow",
+    ".ipc": ".arrow",
+}
+UPLOAD_CONTENT_TYPES = {
+    "text/csv": ".csv",
+    "application/vnd.apache.parquet": ".parquet",
+    "application/x-parquet": ".parquet",
+    "application/vnd.apache.arrow.file": ".arrow",
+    "application/vnd.apache.arrow.stream": ".arrow",
+}
+
+# Statuses of a previous import of the same file that a re-upload retries.
+RETRYABLE_STATUSES = ("failed", "partial")
+
+def upload_extension(file: UploadFile) -> Optional[str]:
+    """The spool file extension of an upload (".csv", ".parquet" or ".arrow"), or None if unsupported."""
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    return UPLOAD_EXTENSIONS.get(extension) or UPLOAD_CONTENT_TYPES.get(file.content_type)
+
+def spool_upload(file: UploadFile, extension: str = ".csv") -> Tuple[str, int, str]:
+    """
+    Copies the uploaded file into the job spool directory in fixed-size chunks.
+    Returns the path of the spooled file, its number of data rows (for a CSV,
+    an estimate: line count minus the header), used to report the progress of
+    the job, and the SHA-256 of its content.
+    """
+    os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
+    file_path = os.path.join(JOB_SPOOL_DIR, f"{uuid.uuid4()}{extension}")
+    lines = 0
+    digest = hashlib.sha256()
+    with open(file_path, "wb") as spool:
+        while chunk := file.file.read(UPLOAD_CHUNK_SIZE):
+            lines += chunk.count(b"\n")
+            digest.update(chunk)
+            spool.write(chunk)
+    if extension == ".csv":
+        return file_path, max(lines - 1, 0), digest.hexdigest()
+    try:
+        total_rows = count_listing_rows(file_path)
+    except Exception:
+        os.remove(file_path)
+        raise
+    return file_path, total_rows, digest.hexdigest()
+
+def process_and_ingest_data(job: IngestionJob) -> str:
+    """
+    Job handler run by the ingestion workers: streams a spooled CSV, Parquet or Arrow file into
+    the database on the worker's own session, in bounded batches, and keeps the
+    job record and the ListingSet status up to date.
+    A job interrupted by a server shutdown or crash resumes after its last committed batch.
+    Returns the final status of the job: "completed", or "partial" if some rows
+    failed. The job fails if rows failed and none could be ingested.
+    """
+    file_path = job_queue.get_file_path(job.id)
+    listing_set_id = job.listing_set_id
+    started_at = time.monotonic()
+    resume_from = None
+    if job.processed_rows:
+        resume_from = IngestionSummary(
+            listing_set_id=listing_set_id,
+            ingested=job.ingested,
+            skipped=job.skipped,
+            failed=job.failed,
+            duplicates=job.duplicates,
+            errors=list(job.errors),
+        )
+
+    def record_progress(summary: IngestionSummary, listing_set_status: str = "running"):
+        job_queue.update_progress(
+            job.id, summary.ingested, summary.skipped, summary.failed, summary.duplicates, summary.errors
+        )
+        progress = min(100.0, 100.0 * summary.processed / job.total_rows) if job.total_rows else 0.0
+        listings_crud.update_listing_set_status(session, listing_set_id, listing_set_status, progress)
+
+    written = False
+    snapshot_refreshed = False
+
+    def on_progress(summary: IngestionSummary):
+        # Called after each committed batch: the point at which a shutdown can stop the job
+        nonlocal written
+        written = True
+        if job_queue.stopping:
+            record_progress(summary, "pending")
+            raise JobInterrupted(job.id)
+        record_progress(summary)
+
     try:
-        decoded_content = file_contents.decode('utf-8')
-        csv_reader = csv.DictReader(io.StringIO(decoded_content))
-        listings = [row for row in csv_reader]
-        
-        # Call our refactored ingestion function
-        ingest_listings_data(db, listings, listing_set_id)
-    except Exception as e:
-        print(f"Error processing file for ListingSet {listing_set_id}: {e}")
-        # In a real app, you'd update the ListingSet status to "failed" here.
+        with graph_db.get_write_session() as session:
+            listings_crud.update_listing_set_status(session, listing_set_id, "running", 0.0)
+            try:
+                summary = ingest_listings_file(
+                    session, file_path, listing_set_id, on_progress=on_progress, summary=resume_from
+                )
+                record_progress(summary)
+                if summary.failed and not summary.ingested + summary.duplicates:
+                    raise RuntimeError(f"None of the rows could be ingested ({summary.failed} failed)")
+            except JobInterrupted:
+                # Left for a later run (or, if the lease was lost, for the process
+                # that took the job over), which needs the spool file
+                raise
+            except Exception:
+                os.remove(file_path)
+                listings_crud.update_listing_set_status(session, listing_set_id, "failed", 0.0)
+                raise
+            os.remove(file_path)
+            final_status = "partial" if summary.failed else "completed"
+            listings_crud.update_listing_set_status(session, listing_set_id, final_status, 100.0)
+            # Bring the in-memory graph snapshot up to date with the new communications.
+            # Duplicate rows were only linked to this ListingSet and are already in the
+            # snapshot, so merging the whole set would count them twice: reload instead.
+            # So does a resumed job, whose earlier batches may be in a snapshot loaded before this run.
+            if not summary.duplicates and resume_from is None:
+                graph_snapshot.refresh_listing_set(session, listing_set_id, started_at)
+                snapshot_refreshed = True
+    finally:
+        # Batches are committed as they go, so a failed or interrupted job can
+        # still have changed the graph: drop anything cached from before it
+        if written:
+            if not snapshot_refreshed:
+                graph_snapshot.invalidate()
+            metrics_cache.invalidate_listing_set(listing_set_id)
+            result_cache.invalidate_tag(listing_set_id)
+    return final_status
 
 @router.post("/listings/import", status_code=status.HTTP_202_ACCEPTED)
-def import_new_listings(
-    background_tasks: BackgroundTasks,
+async def import_new_listings(
+    response: Response,
     name: Annotated[str, Form()],
     description: Annotated[str, Form()] = "",
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_write_db_session)
 ):
     """
-    Uploads a CSV file of listings, creates a new ListingSet for the user,
-    and starts the data ingestion in the background.
+    Uploads a file of listings (CSV, Parquet or Arrow IPC, with the CSV's
+    column names), creates a new ListingSet for the user,
+    and queues the data ingestion as a job run by the ingestion workers.
+    A file the user already imported is recognized by its hash: it is not
+    imported again, unless that import failed or some of its rows failed
+    ("partial"), in which case it is retried into the same ListingSet; rows
+    that were already ingested are recognized as duplicates.
     """
-    if file.content_type != 'text/csv':
-        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV.")
+    extension = upload_extension(file)
+    if extension is None:
+        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV, Parquet or Arrow file.")
 
-    # 1. Create the ListingSet in the database first
-    listing_set_create = ListingSetCreate(name=name, description=description)
-    new_listing_set = listings_crud.create_listing_set(
-        db, listing_set_create, owner_username=current_user["sub"]
-    )
+    # 1. Spool the upload to disk, hashing it on the way
+    try:
+        file_path, total_rows, file_hash = await run_in_threadpool(spool_upload, file, extension)
+    except ValueError:  # pyarrow.ArrowInvalid
+        raise HTTPException(status_code=400, detail="The file could not be read as a Parquet or Arrow file.")
 
-    # 2. Add the file processing to a background task
-    file_contents = file.file.read()
-    background_tasks.add_task(
-        process_and_ingest_data, db, file_contents, new_listing_set.id
-    )
+    existing = await listings_crud.get_listing_set_by_file_hash(db, current_user["sub"], file_hash)
+    if existing is not None and existing.status not in RETRYABLE_STATUSES:
+        os.remove(file_path)
+        response.status_code = status.HTTP_200_OK
+        return {
+            "message": "This file has already been imported." if existing.status == "completed"
+            else "This file is already being imported.",
+            "listing_set": existing,
+            "job_id": None,
+        }
+
+    # 2. Create the ListingSet, or retry the failed or partial import into the existing one
+    if existing is not None:
+        listing_set = existing
+    else:
+        listing_set_create = ListingSetCreate(name=name, description=description)
+        listing_set = await listings_crud.create_listing_set(
+            db, listing_set_create, owner_username=current_user["sub"], file_hash=file_hash
+        )
+
+    # 3. Queue an ingestion job for the spooled file
+    job = job_queue.enqueue(listing_set.id, current_user["sub"], file_path, total_rows)
 
     return {
-        "message": "File upload successful. Ingestion has started in the background.",
-        "listing_set": new_listing_set
+        "message": "File upload successful. Ingestion has been queued.",
+        "listing_set": listing_set,
+        "job_id": job.id,
     }
 
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+def get_job_status(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Reports the status and progress of one of the current user's ingestion jobs."""
+    job = job_queue.get(job_id)
+    if job is None or job.owner_username != current_user["sub"]:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job.status in ("completed", "partial"):
+        percent_complete = 100.0
+    elif job.total_rows:
+        percent_complete = min(100.0, 100.0 * job.processed_rows / job.total_rows)
+    else:
+        percent_complete = 0.0
+
+    rows_per_second = 0.0
+    if job.started_at:
+        elapsed = ((job.finished_at or datetime.now(timezone.utc)) - job.started_at).total_seconds()
+        if elapsed > 0:
+            rows_per_second = job.processed_rows / elapsed
+
+    return JobStatus(
+        **job.model_dump(),
+        percent_complete=round(percent_complete, 2),
+        rows_per_second=round(rows_per_second, 2),
+    )
+
 @router.get("/listings", response_model=List[ListingSet])
-def get_my_listing_sets(
+async def get_my_listing_sets(
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_read_db_session)
 ):
     """Retrieves all ListingSets owned by the current user."""
-    return listings_crud.get_user_listing_sets(db, owner_username=current_user["sub"])
+    return await listings_crud.get_user_listing_sets(db, owner_username=current_user["sub"])
 
-@router.post("/visualize", response_model=Graph)
-def visualize_data(
+# Every communication of a ListingSet with the values it was imported from.
+EXPORT_QUERY = """
+MATCH (c:Communication)-[:PART_OF]->(:ListingSet {id: $listing_set_id})
+MATCH (caller:Subscriber)-[:INITIATED]->(c)-[:IS_DIRECTED_TO]->(callee:Subscriber)
+OPTIONAL MATCH (c)-[:USED_DEVICE]->(d:Device)
+OPTIONAL MATCH (c)-[:ROUTED_THROUGH]->(t:CellTower)
+RETURN caller.phoneNumber AS caller_num, callee.phoneNumber AS callee_num, c.timestamp AS timestamp,
+       c.type AS type, c.duration AS duration_str, c.durationSeconds AS duration_seconds,
+       d.imei AS imei, t.name AS tower_name, t.longitude AS tower_long, t.latitude AS tower_lat,
+       t.location.longitude AS tower_longitude, t.location.latitude AS tower_latitude
+"""
+
+def _empty_columns() -> Dict[str, list]:
+    return {name: [] for name in EXPORT_SCHEMA.names}
+
+async def stream_listing_set_parquet(listing_set_id: str) -> AsyncIterator[bytes]:
+    """
+    Yields a ListingSet's communications as a Parquet file, one row group of
+    EXPORT_ROW_GROUP_SIZE rows at a time as the driver fetches the records.
+    Like the NDJSON stream of the full graph, it opens its own session and
+    runs as an auto-commit query, since bytes already sent can't be retried.
+    """
+    writer = ParquetStreamWriter()
+    async with graph_db.get_async_read_session() as session:
+        result = await session.run(EXPORT_QUERY, listing_set_id=listing_set_id)
+        columns = _empty_columns()
+        rows = 0
+        async for record in result:
+            for name in EXPORT_SCHEMA.names:
+                columns[name].append(record[name])
+            columns["timestamp"][-1] = record["timestamp"].to_native()
+            rows += 1
+            if rows >= EXPORT_ROW_GROUP_SIZE:
+                # Encoding and compressing a row group takes a while: off the event loop
+                yield await run_in_threadpool(writer.write, columns)
+                columns, rows = _empty_columns(), 0
+        if rows:
+            yield await run_in_threadpool(writer.write, columns)
+    yield writer.close()
+
+@router.get("/listings/{listing_set_id}/export")
+async def export_listing_set(
+    listing_set_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db_session)
+):
+    """
+    Streams the communications of one of the user's ListingSets as a Parquet
+    file, with the columns of the import format (so it can be imported again)
+    plus the communication type, the duration in seconds and the tower coordinates.
+    """
+    if not await listings_crud.get_data_versions(db, current_user["sub"], [listing_set_id]):
+        raise HTTPException(status_code=404, detail="ListingSet not found")
+    return StreamingResponse(
+        stream_listing_set_parquet(listing_set_id),
+        media_type="application/vnd.apache.parquet",
+        headers={"Content-Disposition": f'attachment; filename="{listing_set_id}.parquet"'},
+    )
+
+@router.post("/visualize", response_model=BoundedGraph)
+async def visualize_data(
+    request: Request,
     listing_set_ids: List[str],
+    max_nodes: int = Query(VISUALIZE_MAX_NODES, ge=1, le=VISUALIZE_NODE_LIMIT, description="Maximum number of nodes to return."),
+    max_edges: int = Query(VISUALIZE_MAX_EDGES, ge=1, le=VISUALIZE_EDGE_LIMIT, description="Maximum number of edges to return."),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_read_db_session)
 ):
     """
-    Visualizes the graph data from one or more of the user's specified ListingSets.
+    Visualizes the graph data from one or more of the user's specified ListingSets:
+    each Communication with its caller, callee, device and tower.
+    The response is flagged as truncated if it hit the node or edge cap.
+    Results are cached until data is ingested into one of the sets, and carry an ETag.
+    """
+    username = current_user["sub"]
+    listing_set_ids = sorted(set(listing_set_ids))
+
+    async def produce() -> Response:
+        serializer, truncated = await graph_crud.get_listing_sets_subgraph(
+            db,
+            username=username,
+            listing_set_ids=listing_set_ids,
+            max_nodes=max_nodes,
+            max_edges=max_edges,
+        )
+        return serializer.to_response(truncated=truncated)
+
+    versions = await listings_crud.get_data_versions(db, username, listing_set_ids)
+    key = cache_key("visualize", username, max_nodes, max_edges, sorted(versions.items()))
+    return await cached_response(request, key, listing_set_ids, produce)
+
+@router.post("/contact-graph", response_model=ContactGraph)
+async def get_contact_graph(
+    request: ContactGraphRequest,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db_session)
+):
     """
-    # This query is the core of the security model.
-    # It finds all paths within the communications that are PART_OF the specified
-    # listing sets, but ONLY if the current user OWNS those sets.
-    query = """
-    MATCH (u:User {username: $username})-[:OWNS]->(ls:ListingSet)
-    WHERE ls.id IN $listing_set_ids
-    MATCH p = (c:Communication)-[:PART_OF]->(ls)
-    WITH c
-    MATCH p = (c)<-[*]-(n)
-    RETURN p
+    Returns the subscriber-to-subscriber contact graph of the user's ListingSets,
+    aggregated on the server: one edge per pair of subscribers with its call and
+    SMS counts, durations, active days and link strength.
     """
-    result = db.run(query, username=current_user["sub"], listing_set_ids=listing_set_ids)
-    records = list(result)
-    if not records:
-        return Graph(nodes=[], edges=[])
-    return format_graph_response(records)
\ No newline at end of file
+    start, end, event_type = filter_bounds(request.filters)
+    pairs = await graph_crud.get_contact_pairs(
+        db,
+        username=current_user["sub"],
+        listing_set_ids=request.listing_set_ids,
+        start=start,
+        end=end,
+        event_type=event_type,
+    )
+    contact_graph = await run_in_threadpool(build_contact_graph, pairs, request.filters)
+    return Response(content=dumps(contact_graph), media_type="application/json")
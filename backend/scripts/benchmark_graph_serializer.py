@@ -0,0 +1,122 @@
+"""
+Compares the graph serializer with the previous pydantic-based formatter on
+synthetic path sets shaped like /workbench/visualize results: every
+Communication with its caller, callee, device and tower, returned as many
+overlapping paths.
+
+Usage (from the backend directory):
+    python -m scripts.benchmark_graph_serializer [num_communications] [paths_per_communication]
+"""
+import sys
+import time
+from typing import Any, Dict, List
+
+from neo4j import time as neo4j_time
+
+from app.core.graph_serializer import serialize_paths
+from app.models.graph import Graph, Node, Edge
+
+
+# --- Minimal stand-ins for driver objects ---
+class FakeEntity(dict):
+    def __init__(self, element_id: str, properties: Dict[str, Any]):
+        super().__init__(properties)
+        self.element_id = element_id
+
+class FakeNode(FakeEntity):
+    def __init__(self, element_id: str, label: str, properties: Dict[str, Any]):
+        super().__init__(element_id, properties)
+        self.labels = frozenset([label])
+
+class FakeRelationship(FakeEntity):
+    def __init__(self, element_id: str, rel_type: str, start_node: FakeNode, end_node: FakeNode):
+        super().__init__(element_id, {})
+        self.type = rel_type
+        self.start_node = start_node
+        self.end_node = end_node
+
+class FakePath:
+    def __init__(self, nodes: List[FakeNode], relationships: List[FakeRelationship]):
+        self.nodes = nodes
+        self.relationships = relationships
+
+
+def build_records(num_communications: int, paths_per_communication: int) -> List[Dict[str, FakePath]]:
+    subscribers = [FakeNode(f"s{i}", "Subscriber", {"phoneNumber": f"+2376{i:08d}"}) for i in range(num_communications // 10 + 2)]
+    towers = [FakeNode(f"t{i}", "CellTower", {"name": f"T{i}", "longitude": "9.7", "latitude": "4.0"}) for i in range(50)]
+    records = []
+    for i in range(num_communications):
+        event = FakeNode(f"c{i}", "Communication", {
+            "type": "CALL",
+            "timestamp": neo4j_time.DateTime(2024, 3, 5, 13, 4, i % 60),
+            "duration": "42",
+        })
+        caller = subscribers[i % len(subscribers)]
+        callee = subscribers[(i * 7 + 1) % len(subscribers)]
+        tower = towers[i % len(towers)]
+        initiated = FakeRelationship(f"r{i}a", "INITIATED", caller, event)
+        directed = FakeRelationship(f"r{i}b", "IS_DIRECTED_TO", event, callee)
+        routed = FakeRelationship(f"r{i}c", "ROUTED_THROUGH", event, tower)
+        # The same relationships come back in several overlapping paths.
+        for j in range(paths_per_communication):
+            if j % 2:
+                records.append({"p": FakePath([caller, event, callee], [initiated, directed])})
+            else:
+                records.append({"p": FakePath([caller, event, tower], [initiated, routed])})
+    return records
+
+
+# --- Previous implementation, kept here as the reference ---
+def legacy_convert_properties(props: Dict[str, Any]) -> Dict[str, Any]:
+    converted = {}
+    for key, value in props.items():
+        if isinstance(value, neo4j_time.DateTime):
+            converted[key] = value.to_native().isoformat()
+        else:
+            converted[key] = value
+    return converted
+
+def legacy_format_graph_response(records: List) -> bytes:
+    nodes = []
+    edges = []
+    node_ids = set()
+    for record in records:
+        path = record.get("p")
+        if path is None:
+            continue
+        for node in path.nodes:
+            if node.element_id not in node_ids:
+                nodes.append(Node(
+                    id=node.element_id,
+                    label=list(node.labels)[0],
+                    properties=legacy_convert_properties(dict(node))
+                ))
+                node_ids.add(node.element_id)
+        for edge in path.relationships:
+            edges.append(Edge(
+                id=edge.element_id,
+                source=edge.start_node.element_id,
+                target=edge.end_node.element_id,
+                label=edge.type,
+                properties=legacy_convert_properties(dict(edge))
+            ))
+    graph = Graph(nodes=nodes, edges=edges)
+    # FastAPI re-validated the returned model against response_model=Graph before encoding it.
+    return Graph.model_validate(graph.model_dump()).model_dump_json().encode()
+
+
+def timed(label: str, fn, records) -> bytes:
+    start = time.perf_counter()
+    body = fn(records)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {elapsed * 1000:10.1f} ms  {len(body) / 1e6:8.2f} MB")
+    return body
+
+
+if __name__ == "__main__":
+    num_communications = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    paths_per_communication = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    records = build_records(num_communications, paths_per_communication)
+    print(f"{len(records)} paths over {num_communications} communications")
+    timed("legacy", legacy_format_graph_response, records)
+    timed("serializer", lambda r: serialize_paths(r).to_json(), records)
@@ -1,60 +1,700 @@
-from neo4j import Session
+import csv
+import io
+import multiprocessing
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
 from datetime import datetime
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 
-def ingest_listings_data(db: Session, listings: list, listing_set_id: str):
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from neo4j import Session, ManagedTransaction
+
+from app.core.config import INGEST_BATCH_SIZE, INGEST_PARSE_WORKERS
+
+TIMESTAMP_FORMAT = "%d/%m/%Y %H:%M:%S"
+# MERGE fails on null property values, so rows missing any of these are rejected up front.
+REQUIRED_FIELDS = ("caller_num", "callee_num", "imei", "tower_name")
+# Every column read from an import file: the CSV header names.
+LISTING_FIELDS = (
+    "timestamp_str", "duration_str", "caller_num", "callee_num", "imei", "tower_name", "tower_long", "tower_lat",
+)
+# Import file formats, by spool file extension
+COLUMNAR_FORMATS = {".parquet": "parquet", ".arrow": "arrow"}
+# Only the first errors are kept on the summary so a bad file can't exhaust memory.
+MAX_RECORDED_ERRORS = 100
+# Tower coordinates come as free text; the first number in the field is used.
+COORDINATE_PATTERN = re.compile(r"-?\d+(?:[.,]\d+)?")
+
+# Rows of a batch that are already in the database (from an earlier import of
+# the same data, or a batch committed just before an interruption) are only
+# linked to the ListingSet, and the set is recorded on the CONTACTED edge of
+# their caller and callee (its totals already count them). Returns the natural
+# keys that were found.
+LINK_EXISTING_QUERY = """
+MATCH (ls:ListingSet {id: $listing_set_id})
+UNWIND $keys AS key
+MATCH (event:Communication {key: key})
+MERGE (event)-[:PART_OF]->(ls)
+WITH key, event
+OPTIONAL MATCH (caller:Subscriber)-[:INITIATED]->(event)-[:IS_DIRECTED_TO]->(callee:Subscriber),
+               (caller)-[contact:CONTACTED]->(callee)
+WITH collect(DISTINCT key) AS existing, collect(DISTINCT contact) AS contacts
+FOREACH (contact IN contacts |
+    SET contact.listingSetIds = CASE WHEN $listing_set_id IN coalesce(contact.listingSetIds, [])
+                                     THEN contact.listingSetIds
+                                     ELSE coalesce(contact.listingSetIds, []) + $listing_set_id END
+)
+RETURN existing
+"""
+
+# One round-trip per batch: every row of $rows goes through the same MERGE/CREATE
+# pattern that used to be sent row by row.
+INGEST_BATCH_QUERY = """
+MATCH (ls:ListingSet {id: $listing_set_id})
+UNWIND $rows AS row
+MERGE (caller:Subscriber {phoneNumber: row.caller_num})
+MERGE (callee:Subscriber {phoneNumber: row.callee_num})
+MERGE (device:Device {imei: row.imei})
+MERGE (tower:CellTower {name: row.tower_name})
+ON CREATE SET tower.longitude = row.tower_long, tower.latitude = row.tower_lat
+// Native point for the spatial index, set from the first row with valid coordinates
+SET tower.location = coalesce(
+    tower.location,
+    CASE WHEN row.tower_x IS NULL THEN null ELSE point({longitude: row.tower_x, latitude: row.tower_y}) END
+)
+CREATE (event:Communication {
+    key: row.key,
+    type: CASE WHEN row.is_sms THEN 'SMS' ELSE 'CALL' END,
+    timestamp: row.timestamp,
+    duration: row.duration_str,
+    durationSeconds: row.duration_seconds
+})
+CREATE (caller)-[:INITIATED]->(event)
+CREATE (event)-[:IS_DIRECTED_TO]->(callee)
+CREATE (event)-[:USED_DEVICE]->(device)
+CREATE (event)-[:ROUTED_THROUGH]->(tower)
+CREATE (event)-[:PART_OF]->(ls)
+RETURN count(event) AS created
+"""
+
+# Keeps one aggregated (:Subscriber)-[:CONTACTED]->(:Subscriber) edge per
+# caller/callee pair up to date, so analytical queries can read one hop instead
+# of walking every Communication. $contacts is pre-aggregated per pair in Python,
+# so each edge is touched once per batch.
+UPDATE_CONTACTS_QUERY = """
+UNWIND $contacts AS contact
+MATCH (caller:Subscriber {phoneNumber: contact.caller_num})
+MATCH (callee:Subscriber {phoneNumber: contact.callee_num})
+MERGE (caller)-[r:CONTACTED]->(callee)
+ON CREATE SET r.calls = 0, r.sms = 0, r.totalDuration = 0, r.listingSetIds = []
+SET r.calls = r.calls + contact.calls,
+    r.sms = r.sms + contact.sms,
+    r.totalDuration = r.totalDuration + contact.total_duration,
+    r.firstSeen = CASE WHEN r.firstSeen IS NULL OR contact.first_seen < r.firstSeen
+                       THEN contact.first_seen ELSE r.firstSeen END,
+    r.lastSeen = CASE WHEN r.lastSeen IS NULL OR contact.last_seen > r.lastSeen
+                      THEN contact.last_seen ELSE r.lastSeen END,
+    r.listingSetIds = CASE WHEN $listing_set_id IN r.listingSetIds
+                           THEN r.listingSetIds ELSE r.listingSetIds + $listing_set_id END
+"""
+
+# Recomputes every CONTACTED edge from the Communication nodes, for data
+# ingested before the edges existed or after manual changes to the graph.
+DELETE_CONTACTS_QUERY = """
+MATCH ()-[r:CONTACTED]->()
+CALL { WITH r DELETE r } IN TRANSACTIONS OF 10000 ROWS
+"""
+
+REBUILD_CONTACTS_QUERY = """
+MATCH (caller:Subscriber)
+CALL {
+    WITH caller
+    MATCH (caller)-[:INITIATED]->(c:Communication)-[:IS_DIRECTED_TO]->(callee:Subscriber)
+    OPTIONAL MATCH (c)-[:PART_OF]->(ls:ListingSet)
+    WITH caller, callee,
+         count(CASE WHEN c.type = 'CALL' THEN 1 END) AS calls,
+         count(CASE WHEN c.type = 'SMS' THEN 1 END) AS sms,
+         sum(coalesce(c.durationSeconds, toIntegerOrNull(c.duration), 0)) AS total_duration,
+         min(c.timestamp) AS first_seen,
+         max(c.timestamp) AS last_seen,
+         collect(DISTINCT ls.id) AS listing_set_ids
+    CREATE (caller)-[:CONTACTED {
+        calls: calls, sms: sms, totalDuration: total_duration,
+        firstSeen: first_seen, lastSeen: last_seen, listingSetIds: listing_set_ids
+    }]->(callee)
+} IN TRANSACTIONS OF 1000 ROWS
+"""
+
+
+@dataclass
+class IngestionSummary:
+    """Counters returned by an ingestion run."""
+    listing_set_id: str
+    ingested: int = 0
+    skipped: int = 0
+    failed: int = 0
+    duplicates: int = 0          # Rows already in the database, linked to the ListingSet instead
+    batches: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def processed(self) -> int:
+        """Rows of the file handled so far; an interrupted run resumes after them."""
+        return self.ingested + self.skipped + self.failed + self.duplicates
+
+    def record_error(self, message: str):
+        print(f"  -> {message}")
+        if len(self.errors) < MAX_RECORDED_ERRORS:
+            self.errors.append(message)
+
+
+@dataclass
+class ParsedBatch:
+    """A chunk of raw rows after parsing: the rows ready to write, and what was rejected."""
+    rows: List[dict]
+    skipped: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parses a "dd/mm/YYYY HH:MM:SS" timestamp. Slicing the fixed-width string is
+    several times faster than strptime; anything unusual falls back to strptime.
+    """
+    if len(value) == 19 and value[2] == "/" and value[5] == "/" and value[10] == " ":
+        try:
+            return datetime(
+                int(value[6:10]), int(value[3:5]), int(value[0:2]),
+                int(value[11:13]), int(value[14:16]), int(value[17:19]),
+            )
+        except ValueError:
+            pass
+    return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def parse_duration(value: Optional[str]) -> int:
+    """
+    Converts a call duration ("HH:MM:SS", "MM:SS" or a number of seconds) to
+    seconds. SMS and unparseable values count as 0.
+    """
+    if not value or value == "SMS":
+        return 0
+    try:
+        seconds = 0
+        for part in value.strip().split(":"):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    except ValueError:
+        return 0
+
+
+def parse_coordinate(value: Optional[str], limit: float) -> Optional[float]:
+    """
+    Reads a longitude or latitude from a CSV field: the first number in it
+    ("9.7043", "9,7043", "Long: 9.7043"), if within [-limit, limit].
+    """
+    if not value:
+        return None
+    match = COORDINATE_PATTERN.search(value)
+    if match is None:
+        return None
+    coordinate = float(match.group().replace(",", "."))
+    return coordinate if -limit <= coordinate <= limit else None
+
+
+def parse_location(longitude: Optional[str], latitude: Optional[str]) -> Tuple[Optional[float], Optional[float]]:
+    """(longitude, latitude) as floats, or (None, None) unless both are valid."""
+    x, y = parse_coordinate(longitude, 180.0), parse_coordinate(latitude, 90.0)
+    return (x, y) if x is not None and y is not None else (None, None)
+
+
+def natural_key(caller_num: str, callee_num: str, timestamp: datetime, duration_str: Optional[str], imei: str) -> str:
+    """
+    Identifies a communication by its content, so importing the same row twice
+    is detected. Plain text rather than a hash, so that schema migration 3 can
+    compute the same key in Cypher for data ingested before keys existed.
     """
-    Ingests a list of listing data into the database, linking it to a specific ListingSet.
+    return f"{caller_num}|{callee_num}|{timestamp.isoformat()}|{duration_str or ''}|{imei}"
+
+
+def prepare_row(listing: dict) -> Optional[dict]:
     """
-    print(f"🚀 Starting ingestion for ListingSet ID: {listing_set_id}...")
-    
-    processed_count = 0
-    for i, listing in enumerate(listings):
-        # Add a check to ensure the row is not empty and has the required key.
-        if not listing or not listing.get("timestamp_str"):
-            # --- THIS IS THE IMPROVEMENT ---
-            # Print the problematic row to see what keys were actually found
-            print(f"  -> Skipping empty or invalid row {i+1}. Found keys: {list(listing.keys()) if listing else 'None'}")
-            # ------------------------------
-            continue 
+    Turns a raw CSV row into the parameter dict expected by INGEST_BATCH_QUERY.
+    Rows read from columnar files may carry the timestamp as a datetime.
+    Returns None for empty rows; raises ValueError if the row cannot be parsed.
+    """
+    if not listing or not listing.get("timestamp_str"):
+        return None
+
+    missing = [key for key in REQUIRED_FIELDS if not listing.get(key)]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
 
+    tower_x, tower_y = parse_location(listing.get("tower_long"), listing.get("tower_lat"))
+    timestamp = listing["timestamp_str"]
+    if isinstance(timestamp, datetime):
+        # Stored timestamps are local times without a zone
+        timestamp = timestamp.replace(tzinfo=None)
+    else:
+        timestamp = parse_timestamp(timestamp)
+    return {
+        "key": natural_key(
+            listing["caller_num"], listing["callee_num"], timestamp, listing.get("duration_str"), listing["imei"]
+        ),
+        "caller_num": listing["caller_num"],
+        "callee_num": listing["callee_num"],
+        "imei": listing["imei"],
+        "tower_name": listing["tower_name"],
+        "tower_long": listing.get("tower_long"),
+        "tower_lat": listing.get("tower_lat"),
+        "tower_x": tower_x,
+        "tower_y": tower_y,
+        "is_sms": listing.get("duration_str") == "SMS",
+        "timestamp": timestamp,
+        "duration_str": listing.get("duration_str"),
+        "duration_seconds": parse_duration(listing.get("duration_str")),
+    }
+
+
+def parse_batch(listings: List[dict], first_row: int) -> ParsedBatch:
+    """
+    Parses a chunk of raw rows. `first_row` is the 1-based position of the first
+    row in the file, used in error messages.
+    This runs in the parse worker processes, so it must stay a top-level function.
+    """
+    batch = ParsedBatch(rows=[])
+    for i, listing in enumerate(listings, start=first_row):
         try:
-            timestamp = datetime.strptime(listing["timestamp_str"], "%d/%m/%Y %H:%M:%S")
-            is_sms = listing["duration_str"] == "SMS"
-            
-            query = """
-            MATCH (ls:ListingSet {id: $listing_set_id})
-            MERGE (caller:Subscriber {phoneNumber: $caller_num})
-            MERGE (callee:Subscriber {phoneNumber: $callee_num})
-            MERGE (device:Device {imei: $imei})
-            MERGE (tower:CellTower {name: $tower_name})
-            ON CREATE SET tower.longitude = $tower_long, tower.latitude = $tower_lat
-            CREATE (event:Communication {
-                type: CASE WHEN $is_sms THEN 'SMS' ELSE 'CALL' END,
-                timestamp: $timestamp,
-                duration: $duration_str
-            })
-            CREATE (caller)-[:INITIATED]->(event)
-            CREATE (event)-[:IS_DIRECTED_TO]->(callee)
-            CREATE (event)-[:USED_DEVICE]->(device)
-            CREATE (event)-[:ROUTED_THROUGH]->(tower)
-            CREATE (event)-[:PART_OF]->(ls)
-            """
-            
-            db.run(query, {
-                "listing_set_id": listing_set_id,
-                "caller_num": listing.get("caller_num"),
-                "callee_num": listing.get("callee_num"),
-                "imei": listing.get("imei"),
-                "tower_name": listing.get("tower_name"),
-                "tower_long": listing.get("tower_long"),
-                "tower_lat": listing.get("tower_lat"),
-                "is_sms": is_sms,
-                "timestamp": timestamp,
-                "duration_str": listing.get("duration_str")
-            })
-            processed_count += 1
-            print(f"  -> Ingested record {i+1} (Total processed: {processed_count})")
-        except Exception as e:
-            print(f"  -> FAILED to ingest record {i+1}. Error: {e}")
-
-    print(f"✅ Ingestion complete. Processed {processed_count} valid records.")
\ No newline at end of file
+            row = prepare_row(listing)
+        except (ValueError, TypeError) as e:
+            batch.errors.append(f"FAILED to parse record {i}. Error: {e}")
+            continue
+        if row is None:
+            batch.skipped += 1
+        else:
+            batch.rows.append(row)
+    return batch
+
+
+def iter_parsed_batches(
+    listings: Iterable[dict],
+    batch_size: int = INGEST_BATCH_SIZE,
+    first_row: int = 1,
+) -> Iterator[ParsedBatch]:
+    """
+    Splits raw rows into chunks of `batch_size` and parses them in this
+    process, yielding the batches in order. `first_row` is the position of the
+    first row in the file, for error messages.
+    """
+    listings = iter(listings)
+    for chunk in iter(lambda: list(islice(listings, batch_size)), []):
+        yield parse_batch(chunk, first_row)
+        first_row += len(chunk)
+
+
+@dataclass(frozen=True)
+class CSVChunk:
+    """A byte range of a CSV file holding whole records, read and parsed by a pool worker."""
+    file_path: str
+    start: int
+    end: int
+    fieldnames: Tuple[str, ...]
+    first_row: int
+
+
+class _TrackedLines:
+    """Decoded lines of a binary file, counting the bytes handed out so far."""
+    def __init__(self, f):
+        self._file = f
+        self.position = f.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        line = self._file.readline()
+        if not line:
+            raise StopIteration
+        self.position += len(line)
+        return line.decode("utf-8")
+
+
+def iter_csv_chunks(file_path: str, batch_size: int = INGEST_BATCH_SIZE, skip_rows: int = 0) -> Iterator[CSVChunk]:
+    """
+    Splits a CSV file into byte ranges of `batch_size` records, after the
+    header and the first `skip_rows` records. Boundaries come from the C csv
+    reader pulling one line at a time, so a record with quoted line breaks is
+    never split and records are counted exactly as csv.DictReader counts them
+    (blank lines excluded); no row dict is built here.
+    """
+    with open(file_path, "rb") as f:
+        lines = _TrackedLines(f)
+        reader = csv.reader(lines)
+        fieldnames = next(reader, None)
+        if fieldnames is None:
+            return
+        start = lines.position
+        skipped = pending = 0
+        first_row = skip_rows + 1
+        for record in reader:
+            if not record:
+                continue
+            if skipped < skip_rows:
+                skipped += 1
+                start = lines.position
+                continue
+            pending += 1
+            if pending == batch_size:
+                yield CSVChunk(file_path, start, lines.position, tuple(fieldnames), first_row)
+                first_row += pending
+                start, pending = lines.position, 0
+        if pending:
+            yield CSVChunk(file_path, start, lines.position, tuple(fieldnames), first_row)
+
+
+def parse_csv_chunk(chunk: CSVChunk) -> ParsedBatch:
+    """
+    Reads one chunk of a CSV file and parses its rows.
+    This runs in the parse pool, so it must stay a top-level function.
+    """
+    with open(chunk.file_path, "rb") as f:
+        f.seek(chunk.start)
+        text = f.read(chunk.end - chunk.start).decode("utf-8")
+    listings = list(csv.DictReader(io.StringIO(text, newline=""), fieldnames=chunk.fieldnames))
+    return parse_batch(listings, chunk.first_row)
+
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """
+    The process pool that parses CSV chunks. It is created on first use and
+    shared by every ingestion worker, so INGEST_PARSE_WORKERS caps the parse
+    processes of the whole application.
+    """
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # "spawn" rather than "fork": the API process runs other threads (ingestion
+            # workers, the event loop) that must not be duplicated mid-operation.
+            context = multiprocessing.get_context("spawn")
+            _parse_pool = ProcessPoolExecutor(max_workers=INGEST_PARSE_WORKERS, mp_context=context)
+        return _parse_pool
+
+
+def shutdown_parse_pool():
+    """Stops the parse pool's processes; the next ingestion starts a new pool."""
+    global _parse_pool
+    with _parse_pool_lock:
+        pool, _parse_pool = _parse_pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+def _discard_parse_pool(pool: ProcessPoolExecutor):
+    # A crashed worker breaks the pool for good: drop it so later jobs get a new one.
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is pool:
+            _parse_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_parsed_csv_batches(
+    file_path: str,
+    batch_size: int = INGEST_BATCH_SIZE,
+    skip_rows: int = 0,
+) -> Iterator[ParsedBatch]:
+    """
+    Parses a CSV file on the shared parse pool, yielding the batches in file
+    order. Workers are only handed byte ranges; they read and parse the rows
+    themselves, so only parsed rows cross the process boundary. A few chunks
+    are kept in flight ahead of the consumer, so parsing the next batches
+    overlaps with writing the current one to the database.
+    """
+    pool = get_parse_pool()
+    in_flight = deque()
+    # Bounded read-ahead so memory stays proportional to batch_size, not file size.
+    max_in_flight = INGEST_PARSE_WORKERS * 2
+    try:
+        for chunk in iter_csv_chunks(file_path, batch_size, skip_rows):
+            in_flight.append(pool.submit(parse_csv_chunk, chunk))
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+    except BrokenProcessPool:
+        _discard_parse_pool(pool)
+        raise
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def iter_file_batches(
+    file_path: str,
+    batch_size: int = INGEST_BATCH_SIZE,
+    skip_rows: int = 0,
+    parse_workers: int = INGEST_PARSE_WORKERS,
+) -> Iterator[ParsedBatch]:
+    """
+    Parsed batches of a CSV, Parquet or Arrow file, after its first `skip_rows`
+    rows. CSV files go through the parse pool when there is more than one
+    parse worker. Columnar files are decoded by Arrow a record batch at a time
+    and parsed in this process, which costs less than shipping their rows to
+    the pool.
+    """
+    if parse_workers > 1 and os.path.splitext(file_path)[1] not in COLUMNAR_FORMATS:
+        return iter_parsed_csv_batches(file_path, batch_size, skip_rows)
+    return iter_parsed_batches(islice(iter_listings(file_path), skip_rows, None), batch_size, skip_rows + 1)
+
+
+def iter_csv_listings(file_path: str) -> Iterator[dict]:
+    """
+    Lazily yields the rows of a CSV file on disk, one dict at a time,
+    so only the current batch is ever held in memory.
+    """
+    with open(file_path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def _columnar_listings(batches: Iterable[pa.RecordBatch], schema: pa.Schema) -> Iterator[dict]:
+    """
+    Turns record batches into rows shaped like those of `csv.DictReader`.
+    Columns are converted a whole batch at a time: everything becomes a string
+    as in a CSV (phone numbers or coordinates stored as numbers included),
+    except a timestamp-typed timestamp column, which is kept as datetimes.
+    A "timestamp" column is accepted in place of "timestamp_str", as written
+    by the Parquet export.
+    """
+    names = {name: name for name in schema.names if name in LISTING_FIELDS}
+    if "timestamp_str" not in names and "timestamp" in schema.names:
+        names["timestamp_str"] = "timestamp"
+    missing = [name for name in ("timestamp_str",) + REQUIRED_FIELDS if name not in names]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    for batch in batches:
+        columns = {}
+        for field_name, column_name in names.items():
+            column = batch.column(column_name)
+            if not (field_name == "timestamp_str" and pa.types.is_timestamp(column.type)):
+                column = pc.cast(column, pa.string())
+            columns[field_name] = column.to_pylist()
+        fields = list(columns)
+        for values in zip(*columns.values()):
+            yield dict(zip(fields, values))
+
+
+def _open_arrow(file_path: str):
+    """Opens an Arrow IPC file in either the random-access (file) or the streaming format."""
+    source = pa.memory_map(file_path)
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source)
+
+
+def iter_parquet_listings(file_path: str, batch_size: int = INGEST_BATCH_SIZE) -> Iterator[dict]:
+    """
+    Lazily yields the rows of a Parquet file, reading only the listing columns,
+    `batch_size` rows at a time.
+    """
+    parquet_file = pq.ParquetFile(file_path)
+    schema = parquet_file.schema_arrow
+    columns = [name for name in schema.names if name in LISTING_FIELDS or name == "timestamp"]
+    yield from _columnar_listings(parquet_file.iter_batches(batch_size=batch_size, columns=columns), schema)
+
+
+def iter_arrow_listings(file_path: str) -> Iterator[dict]:
+    """Lazily yields the rows of an Arrow IPC file, one record batch at a time."""
+    reader = _open_arrow(file_path)
+    if isinstance(reader, pa.ipc.RecordBatchFileReader):
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        batches = iter(reader)
+    yield from _columnar_listings(batches, reader.schema)
+
+
+def count_listing_rows(file_path: str) -> int:
+    """Number of rows of a Parquet or Arrow file, from its metadata where there is one."""
+    if COLUMNAR_FORMATS[os.path.splitext(file_path)[1]] == "parquet":
+        return pq.ParquetFile(file_path).metadata.num_rows
+    reader = _open_arrow(file_path)
+    if isinstance(reader, pa.ipc.RecordBatchFileReader):
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    return sum(batch.num_rows for batch in reader)
+
+
+def iter_listings(file_path: str) -> Iterator[dict]:
+    """Lazily yields the rows of a CSV, Parquet or Arrow file, by its extension."""
+    file_format = COLUMNAR_FORMATS.get(os.path.splitext(file_path)[1])
+    if file_format == "parquet":
+        return iter_parquet_listings(file_path)
+    if file_format == "arrow":
+        return iter_arrow_listings(file_path)
+    return iter_csv_listings(file_path)
+
+
+def aggregate_contacts(rows: List[dict]) -> List[dict]:
+    """Sums a batch of prepared rows per (caller, callee) pair, for UPDATE_CONTACTS_QUERY."""
+    contacts = {}
+    for row in rows:
+        key = (row["caller_num"], row["callee_num"])
+        contact = contacts.get(key)
+        if contact is None:
+            contact = contacts[key] = {
+                "caller_num": row["caller_num"],
+                "callee_num": row["callee_num"],
+                "calls": 0,
+                "sms": 0,
+                "total_duration": 0,
+                "first_seen": row["timestamp"],
+                "last_seen": row["timestamp"],
+            }
+        if row["is_sms"]:
+            contact["sms"] += 1
+        else:
+            contact["calls"] += 1
+        contact["total_duration"] += row["duration_seconds"]
+        contact["first_seen"] = min(contact["first_seen"], row["timestamp"])
+        contact["last_seen"] = max(contact["last_seen"], row["timestamp"])
+    return list(contacts.values())
+
+
+def _write_batch(tx: ManagedTransaction, listing_set_id: str, rows: List[dict]) -> Tuple[int, int]:
+    keys = [row["key"] for row in rows]
+    seen = set(tx.run(LINK_EXISTING_QUERY, listing_set_id=listing_set_id, keys=keys).single()["existing"])
+    # Also drops rows repeated within the batch
+    new_rows = []
+    for row in rows:
+        if row["key"] not in seen:
+            seen.add(row["key"])
+            new_rows.append(row)
+    if not new_rows:
+        return 0, len(rows)
+
+    result = tx.run(INGEST_BATCH_QUERY, listing_set_id=listing_set_id, rows=new_rows)
+    record = result.single()
+    # Same transaction: the CONTACTED totals never drift from the events they count.
+    tx.run(UPDATE_CONTACTS_QUERY, listing_set_id=listing_set_id, contacts=aggregate_contacts(new_rows)).consume()
+    return (record["created"] if record else 0), len(rows) - len(new_rows)
+
+
+def write_batch(db: Session, listing_set_id: str, rows: List[dict]) -> Tuple[int, int]:
+    """
+    Writes one batch of prepared rows in an explicit write transaction and
+    returns the number of communications created and of duplicates skipped.
+    `execute_write` retries the whole batch on transient errors (deadlocks,
+    leader switches) so a batch is either fully committed or not at all.
+    """
+    return db.execute_write(_write_batch, listing_set_id, rows)
+
+
+def ingest_parsed_batches(
+    db: Session,
+    batches: Iterable[ParsedBatch],
+    listing_set_id: str,
+    on_progress: Optional[Callable[[IngestionSummary], None]] = None,
+    summary: Optional[IngestionSummary] = None,
+) -> IngestionSummary:
+    """
+    Writes parsed batches to the database, linking them to a specific
+    ListingSet, each through a single UNWIND query; `on_progress` is called
+    with the running summary after every committed batch.
+    Rows already in the database are not created again. `summary` carries on
+    the counters of an interrupted run being resumed.
+    """
+    if summary is None:
+        summary = IngestionSummary(listing_set_id=listing_set_id)
+        print(f"🚀 Starting ingestion for ListingSet ID: {listing_set_id}...")
+    else:
+        print(f"🚀 Resuming ingestion for ListingSet ID: {listing_set_id} after row {summary.processed}...")
+
+    for parsed in batches:
+        summary.skipped += parsed.skipped
+        summary.failed += len(parsed.errors)
+        for error in parsed.errors:
+            summary.record_error(error)
+
+        if parsed.rows:
+            try:
+                created, duplicates = write_batch(db, listing_set_id, parsed.rows)
+                summary.ingested += created
+                summary.duplicates += duplicates
+            except Exception as e:
+                summary.failed += len(parsed.rows)
+                summary.record_error(f"FAILED to ingest batch {summary.batches + 1} ({len(parsed.rows)} rows). Error: {e}")
+        summary.batches += 1
+        print(f"  -> Batch {summary.batches} done (Total ingested: {summary.ingested})")
+        if on_progress:
+            on_progress(summary)
+
+    print(
+        f"✅ Ingestion complete. Ingested {summary.ingested}, skipped {summary.skipped}, "
+        f"duplicates {summary.duplicates}, failed {summary.failed} records."
+    )
+    return summary
+
+
+def ingest_listings_data(
+    db: Session,
+    listings: Iterable[dict],
+    listing_set_id: str,
+    batch_size: int = INGEST_BATCH_SIZE,
+    on_progress: Optional[Callable[[IngestionSummary], None]] = None,
+    summary: Optional[IngestionSummary] = None,
+) -> IngestionSummary:
+    """
+    Ingests raw listing rows, parsed in this process, into the database,
+    linking them to a specific ListingSet.
+    To resume an interrupted run, pass the summary of its last committed
+    batch: the rows it had processed are skipped, and its counters go on.
+    """
+    skip_rows = summary.processed if summary else 0
+    batches = iter_parsed_batches(islice(listings, skip_rows, None), batch_size, skip_rows + 1)
+    return ingest_parsed_batches(db, batches, listing_set_id, on_progress, summary)
+
+
+def ingest_listings_file(
+    db: Session,
+    file_path: str,
+    listing_set_id: str,
+    batch_size: int = INGEST_BATCH_SIZE,
+    on_progress: Optional[Callable[[IngestionSummary], None]] = None,
+    summary: Optional[IngestionSummary] = None,
+    parse_workers: int = INGEST_PARSE_WORKERS,
+) -> IngestionSummary:
+    """
+    Ingests a CSV, Parquet or Arrow file into the database, linking it to a
+    specific ListingSet; CSV files are parsed on the shared parse pool.
+    To resume an interrupted run, pass the summary of its last committed
+    batch: the rows it had processed are skipped without being parsed, and
+    its counters go on.
+    """
+    skip_rows = summary.processed if summary else 0
+    batches = iter_file_batches(file_path, batch_size, skip_rows, parse_workers)
+    return ingest_parsed_batches(db, batches, listing_set_id, on_progress, summary)
+
+
+def rebuild_contacted_edges(db: Session):
+    """
+    Drops and recomputes every CONTACTED edge from the Communication nodes.
+    Uses batched auto-commit transactions, so it must not run inside a transaction.
+    """
+    print("🧹 Deleting existing CONTACTED edges...")
+    db.run(DELETE_CONTACTS_QUERY).consume()
+    print("🔁 Rebuilding CONTACTED edges from communications...")
+    summary = db.run(REBUILD_CONTACTS_QUERY).consume()
+    print(f"✅ Rebuilt {summary.counters.relationships_created} CONTACTED edges.")
@@ -0,0 +1,16 @@
+"""
+Rebuilds the aggregated CONTACTED edges between subscribers from the
+Communication nodes already in the database.
+
+Usage (from the backend directory):
+    python -m scripts.rebuild_contacts
+"""
+from app.db.graph_db import db
+from scripts.ingest_data import rebuild_contacted_edges
+
+if __name__ == "__main__":
+    try:
+        with db.get_session() as session:
+            rebuild_contacted_edges(session)
+    finally:
+        db.close()